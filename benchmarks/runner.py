@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+"""
+benchmarks of the client operations (sync and async) against an in-process
+fake keycloak server, reporting ops/sec, p50/p99 latency and allocations per call
+
+    python -m benchmarks                    # compare with the stored baseline
+    python -m benchmarks decode --save      # update the baseline of decode
+
+timings depend on the machine, the baseline should be refreshed (--save) on the
+machine used for the comparison, allocations are comparable everywhere
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from keycloak import AsyncClient, Client
+from keycloak.testing import FakeKeycloak
+
+BASELINE = os.path.join(os.path.dirname(os.path.realpath(__file__)), "baseline.json")
+OPERATIONS = (
+    "login",
+    "callback",
+    "fetch_userinfo",
+    "pat",
+    "ticket",
+    "rpt",
+    "introspect",
+    "find_resources",
+    "refresh_tokens",
+    "decode",
+)
+ALLOCATION_SAMPLES = 50
+
+
+@dataclass
+class Result:
+    operation: str
+    mode: str
+    ops_per_sec: float
+    p50_us: float
+    p99_us: float
+    alloc_kib: float
+
+    @property
+    def key(self) -> str:
+        return f"{self.mode}.{self.operation}"
+
+
+def percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[round(q * (len(ordered) - 1))]
+
+
+def summarize(
+    operation: str, mode: str, latencies: List[float], elapsed: float, allocs: List
+) -> Result:
+    return Result(
+        operation=operation,
+        mode=mode,
+        ops_per_sec=len(latencies) / elapsed,
+        p50_us=percentile(latencies, 0.50) * 1e6,
+        p99_us=percentile(latencies, 0.99) * 1e6,
+        alloc_kib=sum(allocs) / len(allocs) / 1024,
+    )
+
+
+def measure(
+    operation: str, call: Callable, iterations: int, warmup: int, rounds: int
+) -> Result:
+    for _ in range(warmup):
+        call()
+    # the fastest round is kept, the slower ones are mostly scheduling noise
+    best: Tuple[float, List[float]] = (float("inf"), [])
+    for _ in range(rounds):
+        latencies = []
+        start = time.perf_counter()
+        for _ in range(iterations):
+            began = time.perf_counter()
+            call()
+            latencies.append(time.perf_counter() - began)
+        best = min(best, (time.perf_counter() - start, latencies))
+    # peak memory allocated by a single call, tracing is kept out of the timings
+    allocs = []
+    tracemalloc.start()
+    for _ in range(min(iterations, ALLOCATION_SAMPLES)):
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        call()
+        allocs.append(tracemalloc.get_traced_memory()[1] - current)
+    tracemalloc.stop()
+    return summarize(operation, "sync", best[1], best[0], allocs)
+
+
+async def ameasure(
+    operation: str,
+    call: Callable[[], Awaitable],
+    iterations: int,
+    warmup: int,
+    rounds: int,
+) -> Result:
+    for _ in range(warmup):
+        await call()
+    best: Tuple[float, List[float]] = (float("inf"), [])
+    for _ in range(rounds):
+        latencies = []
+        start = time.perf_counter()
+        for _ in range(iterations):
+            began = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - began)
+        best = min(best, (time.perf_counter() - start, latencies))
+    allocs = []
+    tracemalloc.start()
+    for _ in range(min(iterations, ALLOCATION_SAMPLES)):
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        await call()
+        allocs.append(tracemalloc.get_traced_memory()[1] - current)
+    tracemalloc.stop()
+    return summarize(operation, "async", best[1], best[0], allocs)
+
+
+def fake_keycloak() -> FakeKeycloak:
+    resources = [
+        {
+            "_id": f"resource-{x}",
+            "name": f"resource-{x}",
+            "uris": [f"/resources/{x}"],
+            "resource_scopes": [{"name": "view"}],
+        }
+        for x in range(50)
+    ]
+    return FakeKeycloak(users={"user": "password"}, resources=resources)
+
+
+def sync_operations(fake: FakeKeycloak) -> Dict[str, Callable[[], Any]]:
+    kc = Client(username="user", password="password", transport=fake.transport)
+    access_token = kc.access_token
+    rpt = kc.rpt(access_token)["access_token"]
+    resources = kc.find_resources(access_token)[:10]
+    return {
+        "login": kc.login,
+        "callback": lambda: kc.callback(fake.authorize()),
+        "fetch_userinfo": lambda: kc.fetch_userinfo(access_token),
+        "pat": kc.pat,
+        "ticket": lambda: kc.ticket(resources, access_token),
+        "rpt": lambda: kc.rpt(access_token),
+        "introspect": lambda: kc.introspect(rpt),
+        "find_resources": lambda: kc.find_resources(access_token),
+        "refresh_tokens": kc.refresh_tokens,
+        "decode": lambda: kc.decode(access_token),
+    }
+
+
+async def async_operations(
+    fake: FakeKeycloak,
+) -> Dict[str, Callable[[], Awaitable]]:
+    kc = AsyncClient(
+        username="user", password="password", transport=fake.async_transport
+    )
+    access_token = await kc.access_token
+    rpt = (await kc.rpt(access_token))["access_token"]
+    resources = (await kc.find_resources(access_token))[:10]
+    return {
+        "login": kc.login,
+        "callback": lambda: kc.callback(fake.authorize()),
+        "fetch_userinfo": lambda: kc.fetch_userinfo(access_token),
+        "pat": kc.pat,
+        "ticket": lambda: kc.ticket(resources, access_token),
+        "rpt": lambda: kc.rpt(access_token),
+        "introspect": lambda: kc.introspect(rpt),
+        "find_resources": lambda: kc.find_resources(access_token),
+        "refresh_tokens": kc.refresh_tokens,
+        "decode": lambda: kc.decode(access_token),
+    }
+
+
+def run_sync(fake: FakeKeycloak, operations: List[str], **options: int) -> List:
+    calls = sync_operations(fake)
+    return [measure(x, calls[x], **options) for x in operations]
+
+
+async def run_async(fake: FakeKeycloak, operations: List[str], **options: int) -> List:
+    calls = await async_operations(fake)
+    return [await ameasure(x, calls[x], **options) for x in operations]
+
+
+def load_baseline(path: str) -> Dict:
+    try:
+        with open(path) as stream:
+            return json.load(stream)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(path: str, results: List[Result]) -> None:
+    baseline = load_baseline(path)
+    for result in results:
+        baseline[result.key] = {
+            k: round(v, 1) if isinstance(v, float) else v
+            for k, v in asdict(result).items()
+        }
+    with open(path, "w") as stream:
+        json.dump(dict(sorted(baseline.items())), stream, indent=2)
+        stream.write("\n")
+
+
+def regressions(results: List[Result], baseline: Dict, threshold: float) -> List[str]:
+    """operations slower or allocating more than the baseline by over `threshold`"""
+    found = []
+    for result in results:
+        reference = baseline.get(result.key)
+        if reference is None:
+            continue
+        if result.ops_per_sec < reference["ops_per_sec"] * (1 - threshold):
+            found.append(f"{result.key}: ops/sec {reference['ops_per_sec']:.0f}")
+        if result.alloc_kib > reference["alloc_kib"] * (1 + threshold):
+            found.append(f"{result.key}: alloc KiB {reference['alloc_kib']:.1f}")
+    return found
+
+
+def report(results: List[Result], baseline: Dict) -> str:
+    lines = [
+        f"{'operation':<24}{'ops/sec':>10}{'p50 us':>10}{'p99 us':>10}"
+        f"{'alloc KiB':>11}{'vs base':>9}"
+    ]
+    for result in results:
+        reference: Optional[Dict] = baseline.get(result.key)
+        delta = (
+            f"{result.ops_per_sec / reference['ops_per_sec'] - 1:+.0%}"
+            if reference
+            else "-"
+        )
+        lines.append(
+            f"{result.key:<24}{result.ops_per_sec:>10.0f}{result.p50_us:>10.0f}"
+            f"{result.p99_us:>10.0f}{result.alloc_kib:>11.1f}{delta:>9}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="benchmark the client operations against a fake keycloak server",
+    )
+    parser.add_argument("operations", nargs="*", help=", ".join(OPERATIONS))
+    parser.add_argument("--mode", choices=("sync", "async", "both"), default="both")
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save", action="store_true", help="update the baseline")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.5,
+        help="relative slowdown or allocation growth reported as a regression",
+    )
+    args = parser.parse_args(argv)
+    unknown = set(args.operations) - set(OPERATIONS)
+    if unknown:
+        parser.error(f"unknown operations: {', '.join(sorted(unknown))}")
+    operations = args.operations or list(OPERATIONS)
+
+    fake = fake_keycloak()
+    fake.configure()
+    options = {
+        "iterations": args.iterations,
+        "warmup": args.warmup,
+        "rounds": args.rounds,
+    }
+    results = []
+    if args.mode in ("sync", "both"):
+        results += run_sync(fake, operations, **options)
+    if args.mode in ("async", "both"):
+        results += asyncio.run(run_async(fake, operations, **options))
+
+    baseline = load_baseline(args.baseline)
+    print(report(results, baseline))
+    if args.save:
+        save_baseline(args.baseline, results)
+        return 0
+    found = regressions(results, baseline, args.threshold)
+    for regression in found:
+        print(f"regression in {regression}", file=sys.stderr)
+    return 1 if found else 0
@@ -1,54 +1,33 @@
 # -*- coding: utf-8 -*-
+import importlib
+from typing import TYPE_CHECKING, Any, List
 
-from keycloak.core.asynchronous.authentication import AsyncAuthenticationMixin
-from keycloak.core.asynchronous.authorization import AsyncAuthorizationMixin
-from keycloak.core.asynchronous.resource import AsyncResourceMixin
-from keycloak.core.asynchronous.token import AsyncTokenMixin
-from keycloak.core.authentication import AuthenticationMixin
-from keycloak.core.authorization import AuthorizationMixin
-from keycloak.core.resource import ResourceMixin
-from keycloak.core.token import TokenMixin
-from keycloak.utils import Singleton
-
-
-class Client(
-    AuthenticationMixin,
-    AuthorizationMixin,
-    TokenMixin,
-    ResourceMixin,
-    metaclass=Singleton,
-):
-    """
-    Python client to interact with the rest APIs provided by the keycloak server
-    """
-
-    def __init__(
-        self,
-        callback_uri: str = "http://localhost/kc/callback",
-        username: str = None,
-        password: str = None,
-    ) -> None:
-        self.callback_uri = callback_uri
-        self.username = username
-        self.password = password
-
-
-class AsyncClient(
-    AsyncAuthenticationMixin,
-    AsyncAuthorizationMixin,
-    AsyncTokenMixin,
-    AsyncResourceMixin,
-    metaclass=Singleton,
-):
-    def __init__(
-        self,
-        callback_uri: str = "http://localhost/kc/callback",
-        username: str = None,
-        password: str = None,
-    ) -> None:
-        self.callback_uri = callback_uri
-        self.username = username
-        self.password = password
-
-
-__all__ = ["Client", "AsyncClient"]
+if TYPE_CHECKING:  # pragma: no cover
+    from keycloak.core.asynchronous.client import AsyncClient
+    from keycloak.core.asynchronous.registry import AsyncRegistry
+    from keycloak.core.client import Client
+    from keycloak.core.registry import Registry
+
+# the clients are imported on first access, so that `import keycloak` stays cheap
+# and only the stack (sync or async) actually used gets loaded
+_lazy = {
+    "Client": "keycloak.core.client",
+    "AsyncClient": "keycloak.core.asynchronous.client",
+    "Registry": "keycloak.core.registry",
+    "AsyncRegistry": "keycloak.core.asynchronous.registry",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _lazy:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_lazy[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(_lazy))
+
+
+__all__ = ["Client", "AsyncClient", "Registry", "AsyncRegistry"]
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+import logging
+import threading
+import time
+from typing import Dict, List
+
+import httpx
+
+from .constants import Defaults, Logger
+from .exceptions import CircuitOpenError
+
+log = logging.getLogger(Logger.name)
+
+
+def unavailable(error: BaseException) -> bool:
+    """
+    returns true if the error means the keycloak server could not answer,
+    as opposed to a request rejected by a healthy server
+    """
+    if isinstance(error, httpx.HTTPStatusError):
+        return failed(error.response.status_code)
+    return isinstance(error, (httpx.TransportError, CircuitOpenError))
+
+
+# status codes sent by a failing or overloaded server
+FAILURE_STATUSES = frozenset([429, *range(500, 600)])
+
+
+def failed(status: int) -> bool:
+    """returns true if the status code is sent by a failing or overloaded server"""
+    return status in FAILURE_STATUSES
+
+
+class Circuit:
+    """state of the calls to a single endpoint"""
+
+    def __init__(self) -> None:
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probed_at = 0.0
+
+    @property
+    def open(self) -> bool:
+        return self.opened_at > 0
+
+
+class CircuitBreaker:
+    """
+    circuit breaker suspending the calls to the keycloak endpoints (one circuit per
+    operation) after `threshold` consecutive failed calls, so that a degraded server
+    is not hammered and the callers fail fast instead of waiting for a timeout, a
+    call is failed once its retries are exhausted
+
+    once `reset_timeout` seconds have elapsed a single probe call is let through,
+    the circuit is closed again if it succeeds and re-opened otherwise
+
+    >>> from keycloak import Client
+    >>> from keycloak.breaker import CircuitBreaker
+    >>> kc = Client(circuit_breaker=CircuitBreaker(threshold=10, reset_timeout=60))
+    >>> kc = Client(circuit_breaker=CircuitBreaker(threshold=0))  # disable the breaker
+
+    :param threshold: consecutive failures opening the circuit, 0 to disable
+    :param reset_timeout: seconds before a probe call is let through
+    """
+
+    def __init__(
+        self,
+        threshold: int = Defaults.breaker_threshold,
+        reset_timeout: float = Defaults.breaker_reset_timeout,
+    ) -> None:
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._circuits: Dict[str, Circuit] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def open_circuits(self) -> List[str]:
+        """operations whose calls are currently suspended"""
+        return [name for name, x in self._circuits.items() if x.open]
+
+    def check(self, operation: str) -> None:
+        """
+        method to be called before sending a request
+
+        :param operation: name of the operation eg: pat, rpt, introspect
+        :raises CircuitOpenError: if the calls are suspended
+        """
+        circuit = self._circuits.get(operation)
+        if not self.threshold or circuit is None or not circuit.open:
+            return
+        with self._lock:
+            if not circuit.open:
+                return
+            now = time.monotonic()
+            # a probe never completed (eg: cancelled) is replaced after reset_timeout
+            since = max(circuit.opened_at, circuit.probed_at)
+            retry_in = since + self.reset_timeout - now
+            if retry_in > 0:
+                raise CircuitOpenError(operation, retry_in)
+            log.debug(f"Probing {operation} after the circuit was opened")
+            circuit.probed_at = now
+
+    def record(self, operation: str, success: bool) -> None:
+        """
+        method to be called with the outcome of every request
+
+        :param operation: name of the operation eg: pat, rpt, introspect
+        :param success: false if the server failed to answer
+        """
+        if not self.threshold:
+            return
+        circuit = self._circuits.get(operation)
+        if success and (circuit is None or not (circuit.failures or circuit.open)):
+            return
+        with self._lock:
+            circuit = self._circuits.setdefault(operation, Circuit())
+            circuit.probed_at = 0.0
+            if success:
+                if circuit.open:
+                    log.info(f"Circuit closed for {operation}")
+                circuit.failures = 0
+                circuit.opened_at = 0.0
+                return
+            circuit.failures += 1
+            if circuit.open or circuit.failures >= self.threshold:
+                if not circuit.open:
+                    log.warning(f"Circuit opened for {operation}")
+                circuit.opened_at = time.monotonic()
+
+    def reset(self) -> None:
+        """close every circuit"""
+        with self._lock:
+            self._circuits.clear()
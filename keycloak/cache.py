@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Sequence
+
+from .constants import Defaults
+from .utils import digest
+
+
+class TTLCache:
+    """
+    thread safe LRU cache bounded to `maxsize` entries,
+    every entry expires at its own deadline (unix timestamp) and can be kept
+    a little longer (stale) to be used when the keycloak server is unavailable
+    """
+
+    def __init__(self, maxsize: int = Defaults.cache_size) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        value associated with the key, expired entries are evicted on access
+
+        :param key: cache key
+        :param default: value returned on cache miss
+        :returns: cached value or default
+        """
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                value, expires_at, stale_until = item
+                now = time.time()
+                if expires_at > now:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                if stale_until <= now:
+                    del self._data[key]
+            self.misses += 1
+            return default
+
+    def get_stale(self, key: Hashable, default: Any = None) -> Any:
+        """
+        value associated with the key, including the expired entries
+        still within their stale deadline
+
+        :param key: cache key
+        :param default: value returned if the entry is missing
+        :returns: cached value or default
+        """
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[2] <= time.time():
+                return default
+            return item[0]
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        expires_at: float,
+        stale_until: Optional[float] = None,
+    ) -> None:
+        """
+        store the value until `expires_at`, evicting the least recently used
+        entries when the cache is full
+
+        :param key: cache key
+        :param value: value to be cached
+        :param expires_at: unix timestamp after which the entry is expired
+        :param stale_until: unix timestamp after which the entry is discarded,
+            defaults to `expires_at`
+        """
+        stale_until = max(expires_at, stale_until or expires_at)
+        if stale_until <= time.time():
+            return
+        with self._lock:
+            self._data[key] = (value, expires_at, stale_until)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        """remove the entry associated with the key"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """remove all the entries and reset the counters"""
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+def introspection_expiry(result: Dict, ttl: float, negative_ttl: float) -> float:
+    """
+    deadline (unix timestamp) until which an introspection result can be reused,
+    active tokens are cached for at most `ttl` seconds and never beyond their expiry,
+    inactive tokens are cached for `negative_ttl` seconds
+    """
+    now = time.time()
+    if not result.get("active"):
+        return now + negative_ttl
+    return min(float(result.get("exp", "inf")), now + ttl)
+
+
+def introspection_stale_until(result: Dict) -> float:
+    """
+    deadline (unix timestamp) until which an active introspection result can be
+    used when the keycloak server is unavailable, never beyond the token expiry
+    """
+    return float(result.get("exp", 0)) if result.get("active") else 0.0
+
+
+def rpt_key(access_token: str, audience: str, permissions: Sequence[str]) -> Hashable:
+    """
+    cache key of a requesting party token, the permissions are order insensitive
+    """
+    return digest(access_token), audience, tuple(sorted(set(permissions)))
+
+
+def decision_key(
+    subject: str, audience: str, resource: str, scope: Optional[str]
+) -> Hashable:
+    """cache key of an authorization decision"""
+    return subject, audience, resource, scope
+
+
+def rpt_expiry(result: Dict, skew: float) -> float:
+    """
+    deadline (unix timestamp) until which a requesting party token can be reused,
+    `skew` seconds before the token expires
+    """
+    return time.time() + float(result.get("expires_in", 0)) - skew
@@ -1,15 +1,23 @@
 # -*- coding: utf-8 -*-
+import asyncio
 import json
 import logging
 import os
+import threading
+import weakref
 from dataclasses import dataclass, fields
-from typing import Dict, List
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
-import requests
+import httpx
 from cached_property import cached_property
 
+from .breaker import unavailable
 from .constants import Defaults, EnvVar, FileMode, Logger
-from .utils import Singleton
+from .core.transport import TransportMixin
+from .snapshot import Snapshot
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .core.asynchronous.transport import AsyncTransportMixin
 
 log = logging.getLogger(Logger.name)
 
@@ -71,7 +79,57 @@ class Uma2(DataClassMixin):
         return self.resource_registration_endpoint
 
 
-class Config(metaclass=Singleton):
+class Config(TransportMixin):
+    """
+    configuration of a keycloak client: the client settings (read from the settings
+    file unless given) and the discovery documents of its realm, loaded lazily
+
+    the shared configuration `keycloak.config.config` is used by default, the
+    clients of a `keycloak.Registry` get their own, the documents are fetched using
+    the connection pool of the client owning the configuration (see `attach`)
+
+    :param client: client settings, read from the settings file if missing
+    :param snapshot: snapshot file shared with other configurations
+    :param namespace: prefix of the documents stored in the snapshot
+    """
+
+    _revalidation: Optional[threading.Thread] = None
+    _owner: Optional["weakref.ReferenceType[TransportMixin]"] = None
+    _loading: Optional["asyncio.Task[None]"] = None
+    namespace: str = ""
+
+    def __init__(
+        self, client: Client = None, snapshot: Snapshot = None, namespace: str = ""
+    ) -> None:
+        if client is not None:
+            vars(self)["client"] = client
+        if snapshot is not None:
+            vars(self)["snapshot"] = snapshot
+        self.namespace = namespace
+
+    def attach(self, owner: TransportMixin) -> None:
+        """
+        share the connection pool of the client owning this configuration instead of
+        opening a second one, the first client attached owns the configuration
+
+        :param owner: client owning this configuration
+        """
+        if self._owner is None or self._owner() is None:
+            self._owner = weakref.ref(owner)
+
+    @property
+    def http(self) -> httpx.Client:
+        """
+        connection pool of the owning client, a pool of its own without an owner or
+        when given a transport of its own
+
+        :returns: httpx.Client
+        """
+        owner = self._owner() if self._owner is not None else None
+        if self.pool is None and self.transport is None and owner is not None:
+            return owner.http
+        return super().http
+
     @property
     def settings_file(self) -> str:
         log.debug("Lookup settings file in the env vars")
@@ -94,12 +152,17 @@ class Config(metaclass=Singleton):
             + "/.well-known/openid-configuration"
         )
 
+    def fetch(self, endpoint: str) -> Dict:
+        response = self.request("discovery", "get", endpoint)
+        response.raise_for_status()
+        return response.json()
+
     @cached_property
     def openid(self) -> OpenId:
-        log.debug("Loading openid config using well-known endpoint")
-        response = requests.get(self.openid_endpoint)
-        response.raise_for_status()
-        data = response.json()
+        data = self.from_snapshot("openid")
+        if data is None:
+            log.debug("Loading openid config using well-known endpoint")
+            data = self.load("openid", self.openid_endpoint)
         return OpenId(**data)
 
     @property
@@ -114,11 +177,161 @@ class Config(metaclass=Singleton):
 
     @cached_property
     def uma2(self) -> Uma2:
-        log.debug("Loading uma2 config using well-known endpoint")
-        response = requests.get(self.uma_endpoint)
-        response.raise_for_status()
-        data = response.json()
+        data = self.from_snapshot("uma2")
+        if data is None:
+            log.debug("Loading uma2 config using well-known endpoint")
+            data = self.load("uma2", self.uma_endpoint)
         return Uma2(**data)
 
+    @property
+    def documents(self) -> List[Tuple[str, str, type]]:
+        return [
+            ("openid", self.openid_endpoint, OpenId),
+            ("uma2", self.uma_endpoint, Uma2),
+        ]
+
+    @cached_property
+    def snapshot(self) -> Optional[Snapshot]:
+        path = os.getenv(EnvVar.keycloak_snapshot)
+        if not path:
+            return None
+        log.debug(f"Using snapshot file {path}")
+        ttl = float(os.getenv(EnvVar.keycloak_snapshot_ttl, Defaults.snapshot_ttl))
+        return Snapshot(path, ttl)
+
+    def from_snapshot(self, name: str) -> Optional[Dict]:
+        """
+        document stored in the snapshot file (if enabled and still valid),
+        the documents are revalidated in the background once loaded from the snapshot
+
+        :param name: name of the document eg: openid, uma2, jwks
+        :returns: dictionary or None
+        """
+        entry = self.snapshot_entry(name)
+        if entry is None:
+            return None
+        log.debug(f"Loading {name} config from the snapshot")
+        self.revalidate()
+        return entry[0]
+
+    def load(self, name: str, endpoint: str) -> Dict:
+        """
+        fetch the document and store it in the snapshot, while the keycloak server
+        is unavailable the expired copy from the snapshot is used and revalidated
+        in the background
+
+        :param name: name of the document eg: openid, uma2
+        :param endpoint: url of the document
+        :returns: dictionary
+        """
+        try:
+            data = self.fetch(endpoint)
+        except Exception as ex:
+            data = self.from_stale_snapshot(name, ex)
+            if data is None:
+                raise
+            return data
+        self.save_snapshot(name, data)
+        return data
+
+    def from_stale_snapshot(self, name: str, error: BaseException) -> Optional[Dict]:
+        if not unavailable(error):
+            return None
+        entry = self.snapshot_entry(name, stale=True)
+        if entry is None:
+            return None
+        log.warning(f"Keycloak unavailable, using the expired {name} config")
+        self.revalidate()
+        return entry[0]
+
+    def snapshot_entry(
+        self, name: str, stale: bool = False
+    ) -> Optional[Tuple[Any, float]]:
+        """
+        document stored in the snapshot under the namespace of this configuration
+
+        :param name: name of the document eg: openid, uma2, jwks
+        :param stale: return the document even if expired
+        :returns: document and the number of seconds it remains valid or None
+        """
+        if self.snapshot is None:
+            return None
+        return self.snapshot.get(self.namespace + name, stale)
+
+    def save_snapshot(self, name: str, data: Dict) -> None:
+        if self.snapshot is not None:
+            self.snapshot.put(self.namespace + name, data)
+
+    def revalidate(self) -> None:
+        """re-fetch the discovery documents in a background thread, one at a time"""
+        if self._revalidation is None or not self._revalidation.is_alive():
+            self._revalidation = threading.Thread(target=self._revalidate, daemon=True)
+            self._revalidation.start()
+
+    def _revalidate(self) -> None:
+        for name, endpoint, cls in self.documents:
+            try:
+                data = self.fetch(endpoint)
+            except Exception:
+                log.exception(f"Unable to revalidate {name} config")
+                continue
+            vars(self)[name] = cls(**data)
+            self.save_snapshot(name, data)
+
+    async def aload(self, client: "AsyncTransportMixin") -> None:
+        """
+        load the discovery documents without blocking the event loop,
+        the documents not loaded yet are fetched concurrently and only once, the
+        coroutines calling `aload` meanwhile wait for the same fetch
+
+        :param client: async client used to fetch the documents
+        """
+        if all(x[0] in vars(self) for x in self.documents):
+            return
+        task = self._loading
+        if (
+            task is None
+            or task.done()
+            or task.get_loop() is not asyncio.get_running_loop()
+        ):
+            task = asyncio.ensure_future(self._aload(client))
+            self._loading = task
+        # a cancelled caller doesn't cancel the fetch awaited by the others
+        await asyncio.shield(task)
+
+    async def _aload(self, client: "AsyncTransportMixin") -> None:
+        missing = []
+        for name, endpoint, cls in self.documents:
+            if name in vars(self):
+                continue
+            data = self.from_snapshot(name)
+            if data is None:
+                missing.append((name, endpoint, cls))
+            else:
+                vars(self)[name] = cls(**data)
+        if not missing:
+            return
+
+        async def fetch(endpoint: str) -> Dict:
+            response = await client.request("discovery", "get", endpoint)
+            response.raise_for_status()
+            return response.json()
+
+        names = ", ".join(x[0] for x in missing)
+        log.debug(f"Loading {names} config using well-known endpoints")
+        results = await asyncio.gather(
+            *[fetch(x[1]) for x in missing], return_exceptions=True
+        )
+        for (name, _, cls), data in zip(missing, results):
+            if isinstance(data, BaseException):
+                stale = self.from_stale_snapshot(name, data)
+                if stale is None:
+                    raise data
+                data = stale
+            else:
+                self.save_snapshot(name, data)
+            # populate the cached properties, the sync accessors won't block anymore
+            vars(self)[name] = cls(**data)
+
 
 config: Config = Config()
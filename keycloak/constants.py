@@ -11,18 +11,48 @@ class Defaults:
     """constants associated with default values"""
 
     keycloak_settings = "keycloak.json"
+    timeout = 5.0
+    max_connections = 100
+    max_keepalive_connections = 20
+    keepalive_expiry = 5.0
+    concurrency = 10
+    page_size = 100
+    jwks_ttl = 300.0
+    jwks_min_refresh_interval = 10.0
+    cache_size = 10000
+    token_cache_skew = 5.0
+    token_refresh_ahead = 10.0
+    introspection_cache_ttl = 300.0
+    introspection_negative_ttl = 5.0
+    snapshot_ttl = 3600.0
+    retries = 3
+    retry_backoff = 0.1
+    retry_max_backoff = 5.0
+    retry_after_limit = 30.0
+    retry_budget = 10.0
+    retry_budget_ratio = 0.1
+    breaker_threshold = 5
+    breaker_reset_timeout = 30.0
+    jwks_stale_ttl = 3600.0
+    registry_size = 64
+    token_store_size = 10000
+    token_store_locks = 64
+    decision_cache_ttl = 60.0
 
 
 class EnvVar:
     """constants associated with env vars"""
 
     keycloak_settings = "KEYCLOAK_SETTINGS"
+    keycloak_snapshot = "KEYCLOAK_SNAPSHOT"
+    keycloak_snapshot_ttl = "KEYCLOAK_SNAPSHOT_TTL"
 
 
 class FileMode:
     """constants associated with file mode"""
 
     read_only = "r"
+    write_only = "w"
 
 
 class TokenType:
@@ -36,6 +66,8 @@ class Headers:
     """constants associated with headers"""
 
     authorization = "Authorization"
+    cache_control = "Cache-Control"
+    retry_after = "Retry-After"
 
 
 class GrantTypes:
@@ -44,6 +76,7 @@ class GrantTypes:
     password = "password"
     authorization_code = "authorization_code"
     client_credentials = "client_credentials"
+    refresh_token = "refresh_token"
     uma_ticket = "urn:ietf:params:oauth:grant-type:uma-ticket"
 
 
@@ -53,6 +86,21 @@ class ResponseTypes:
     code = "code"
 
 
+class UmaResponseModes:
+    """constants associated with the response modes of the uma grant"""
+
+    decision = "decision"
+    permissions = "permissions"
+
+
+class EnforcementModes:
+    """constants associated with the enforcement modes of the policy enforcer"""
+
+    enforcing = "ENFORCING"
+    permissive = "PERMISSIVE"
+    disabled = "DISABLED"
+
+
 class TokenTypeHints:
     """constants associated with token type hints"""
 
@@ -4,21 +4,18 @@ from typing import Dict, Tuple
 from urllib.parse import urlencode
 from uuid import uuid4
 
-import httpx
-
-from keycloak.config import config
 from keycloak.constants import GrantTypes, Logger, ResponseTypes
+from keycloak.core.asynchronous.transport import AsyncTransportMixin
 from keycloak.utils import auth_header, handle_exceptions
 
 log = logging.getLogger(Logger.name)
 
 
-class AsyncAuthenticationMixin:
+class AsyncAuthenticationMixin(AsyncTransportMixin):
     """
     This class includes the methods to interact with the authentication flow
     """
 
-    _userinfo: Dict = {}
     callback_uri = "http://localhost/kc/callback"
 
     async def login(self, scopes: Tuple = ("openid",)) -> Tuple:
@@ -61,17 +58,18 @@ class AsyncAuthenticationMixin:
 
         :returns: endpoint url and state
         """
+        await self.discover()
         state = uuid4().hex
         arguments = urlencode(
             {
                 "state": state,
-                "client_id": config.client.client_id,
+                "client_id": self.config.client.client_id,
                 "response_type": ResponseTypes.code,
                 "scope": " ".join(scopes),
                 "redirect_uri": self.callback_uri,
             }
         )
-        return f"{config.openid.authorization_endpoint}?{arguments}", state
+        return f"{self.config.openid.authorization_endpoint}?{arguments}", state
 
     @handle_exceptions
     async def callback(self, code: str) -> Dict:
@@ -122,18 +120,20 @@ class AsyncAuthenticationMixin:
         :param code: code send by the keycloak server
         :returns: dictionary
         """
+        await self.discover()
         payload = {
             "code": code,
             "grant_type": GrantTypes.authorization_code,
             "redirect_uri": self.callback_uri,
-            "client_id": config.client.client_id,
-            "client_secret": config.client.client_secret,
+            "client_id": self.config.client.client_id,
+            "client_secret": self.config.client.client_secret,
         }
         log.debug("Retrieving user tokens from server")
-        async with httpx.AsyncClient() as client:
-            response = await client.post(config.openid.token_endpoint, data=payload)
-            log.debug("User tokens retrieved successfully")
-            return response.json()
+        response = await self.request(
+            "callback", "post", self.config.openid.token_endpoint, data=payload
+        )
+        log.debug("User tokens retrieved successfully")
+        return response.json()
 
     @handle_exceptions
     async def fetch_userinfo(self, access_token: str = None) -> Dict:
@@ -150,20 +150,24 @@ class AsyncAuthenticationMixin:
         :param access_token: access token of the client or user
         :returns: dicttionary
         """
+        await self.discover()
         access_token = access_token or await self.access_token  # type: ignore
         headers = auth_header(access_token)
         log.debug("Retrieving user info from server")
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                config.openid.userinfo_endpoint, headers=headers
-            )
-            log.debug("User info retrieved successfully")
-            return response.json()
+        response = await self.request(
+            "fetch_userinfo",
+            "get",
+            self.config.openid.userinfo_endpoint,
+            headers=headers,
+        )
+        log.debug("User info retrieved successfully")
+        return response.json()
 
     @property
     async def userinfo(self) -> Dict:
         """
-        user information available within the server
+        user information available within the server, fetched on every access since
+        the tokens (and so the user) may change in between
 
         >>> import asyncio
         >>> from keycloak import AsyncClient
@@ -174,22 +178,24 @@ class AsyncAuthenticationMixin:
 
         :returns: dictionary
         """
-        if not self._userinfo:
-            self._userinfo = await self.fetch_userinfo()
-        return self._userinfo
+        return await self.fetch_userinfo()
 
     async def logout(self, access_token: str = None, refresh_token: str = None) -> None:
+        await self.discover()
         access_token = access_token or await self.access_token  # type: ignore
         refresh_token = refresh_token or await self.refresh_token  # type: ignore
         payload = {
-            "client_id": config.client.client_id,
-            "client_secret": config.client.client_secret,
+            "client_id": self.config.client.client_id,
+            "client_secret": self.config.client.client_secret,
             "refresh_token": refresh_token,
         }
         headers = auth_header(access_token)
         log.debug("Logging out user from server")
-        async with httpx.AsyncClient() as client:
-            await client.post(
-                config.openid.end_session_endpoint, data=payload, headers=headers
-            )
-            log.debug("User logged out successfully")
+        await self.request(
+            "logout",
+            "post",
+            self.config.openid.end_session_endpoint,
+            data=payload,
+            headers=headers,
+        )
+        log.debug("User logged out successfully")
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+import logging
+from types import TracebackType
+from typing import Dict, Optional, Type
+
+import httpx
+
+from keycloak.config import Config
+from keycloak.constants import Logger
+from keycloak.core.asynchronous.client import AsyncClient
+from keycloak.registry import BaseRegistry
+
+log = logging.getLogger(Logger.name)
+
+
+class AsyncRegistry(BaseRegistry[AsyncClient]):
+    """
+    registry of the async clients of several keycloak realms sharing one connection
+    pool, see `keycloak.registry.BaseRegistry`
+
+    >>> from keycloak import AsyncRegistry
+    >>> async with AsyncRegistry(maxsize=100) as registry:
+    >>>     registry.register("http://localhost:8080/auth", "acme", "api", "secret")
+    >>>     kc = registry.get("http://localhost:8080/auth", "acme", "api")
+    >>>     await kc.introspect(token)
+    >>>
+
+    `AsyncClient()` remains the client configured by the settings file, the clients
+    of a registry are independent of it
+    """
+
+    _pool: httpx.AsyncClient = None  # type: ignore
+
+    @property
+    def pool(self) -> httpx.AsyncClient:
+        """connection pool shared by the clients, re-opened after `aclose`"""
+        if self._pool is None or self._pool.is_closed:
+            log.debug("Opening shared connection pool")
+            self._pool = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=self.limits,
+                http2=self.http2,
+                transport=self.transport,
+            )
+        return self._pool
+
+    def create(self, config: Config, settings: Dict) -> AsyncClient:
+        options = {**self.options, **settings}
+        del options["client_secret"]
+        client = AsyncClient.create(config=config, pool=self.pool, **options)
+        # the documents are fetched by `discover` using the shared pool, the sync
+        # fallback of the configuration keeps its own pool (the transport of the
+        # registry is asynchronous)
+        config.timeout = self.timeout
+        config.retry_policy = client.retry_policy
+        config.circuit_breaker = client.circuit_breaker
+        return client
+
+    def evict(self, client: AsyncClient) -> None:
+        # the shared pool is left open
+        client.cancel_refresh()
+        client.config.close()
+
+    async def aclose(self) -> None:
+        """method to drop the clients and close the shared connection pool"""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            self.evict(client)
+        if self._pool is not None and not self._pool.is_closed:
+            log.debug("Closing shared connection pool")
+            await self._pool.aclose()
+
+    async def __aenter__(self) -> "AsyncRegistry":
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        await self.aclose()
@@ -1,17 +1,20 @@
 # -*- coding: utf-8 -*-
+import asyncio
 import logging
-from typing import Dict, List
+from typing import AsyncIterator, Dict, List, Optional
 
-import httpx
+from cached_property import threaded_cached_property
 
-from keycloak.config import config
-from keycloak.constants import Logger
+from keycloak.constants import Defaults, Logger
+from keycloak.core.asynchronous.transport import AsyncTransportMixin
+from keycloak.exceptions import ResourceFetchError
+from keycloak.matcher import PathMatcher
 from keycloak.utils import auth_header, handle_exceptions
 
 log = logging.getLogger(Logger.name)
 
 
-class AsyncResourceMixin:
+class AsyncResourceMixin(AsyncTransportMixin):
     """
     This class consists of methods that can be used to manage resources
     """
@@ -36,11 +39,52 @@ class AsyncResourceMixin:
             self._resources = await self.find_resources()
         return self._resources
 
+    @threaded_cached_property
+    def path_matcher(self) -> PathMatcher:
+        """
+        matcher of the request paths compiled from the `paths` of the policy enforcer
+        settings, the uris of the resources are added by `refresh_paths`
+
+        :returns: PathMatcher
+        """
+        settings = getattr(self.config.client, "policy_enforcer", None)
+        return PathMatcher.from_settings(settings)
+
+    async def refresh_paths(self, access_token: str = None) -> None:
+        """
+        method to index the uris of the resources in `path_matcher`, only the
+        resources changed since the last call are re-indexed
+
+        >>> import asyncio
+        >>> from keycloak import AsyncClient
+        >>> kc = AsyncClient()
+        >>> asyncio.run(kc.refresh_paths())
+        >>> kc.path_matcher.match("/albums/42", "DELETE")
+        PathMatch(config=PathConfig(path='/albums/{id}', name='Album', ...), scopes=['delete'], params={'id': '42'})
+        >>>
+
+        :param access_token: access token to be used
+        """
+        self.path_matcher.update_resources(await self.find_resources(access_token))
+
     @handle_exceptions
-    async def find_resources(self, access_token: str = None) -> List:
+    async def find_resources(
+        self,
+        access_token: str = None,
+        page_size: int = Defaults.page_size,
+        concurrency: int = Defaults.concurrency,
+    ) -> List:
         """
         fetch resources from keycloak server
 
+        the full representations are listed in pages of `page_size` using the
+        `deep` mode of the resource set endpoint, if the server responds with
+        resource ids instead (deep mode not supported) the details are fetched
+        concurrently, at most `concurrency` requests are in flight at any time and
+        the results keep the server order, if some of them fail `ResourceFetchError`
+        is raised carrying the resources retrieved successfully and the errors keyed
+        by resource id
+
         >>> import asyncio
         >>> from keycloak import AsyncClient
         >>> kc= AsyncClient()
@@ -49,15 +93,170 @@ class AsyncResourceMixin:
         >>>
 
         :param access_token: access token to be used
+        :param page_size: number of resources to be retrieved per request
+        :param concurrency: maximum number of concurrent requests
         :returns: list
         """
+        await self.discover()
         access_token = access_token or await self.access_token  # type: ignore
-        headers = auth_header(access_token)
         log.debug("Retrieving resources from keycloak")
-        async with httpx.AsyncClient() as client:
-            response = await client.get(config.uma2.resource_endpoint, headers=headers)
-            log.debug("Resources retrieved successfully")
-            return [await self.find_resource(x, access_token) for x in response.json()]  # type: ignore
+        resources: List = []
+        page: List = []
+        first = 0
+        while True:
+            last_page = page
+            page = await self.find_resource_page(first, page_size, access_token)
+            # stop when the last page is reached or the server ignores paging
+            if page == last_page:
+                break
+            resources.extend(page)
+            if len(page) != page_size:
+                break
+            first += page_size
+        log.debug("Resources retrieved successfully")
+        resource_ids = [x for x in resources if isinstance(x, str)]
+        if resource_ids:
+            log.debug("Deep listing not supported, retrieving resource details")
+            return await self.find_resources_by_id(
+                resource_ids, access_token, concurrency
+            )
+        return resources
+
+    @handle_exceptions
+    async def find_resource_page(
+        self,
+        first: int = 0,
+        page_size: int = Defaults.page_size,
+        access_token: str = None,
+        filters: Dict = None,
+    ) -> List:
+        """
+        fetch a page of the resources (full representations, or ids when the `deep`
+        mode is not supported by the server)
+
+        :param first: index of the first resource
+        :param page_size: maximum number of resources
+        :param access_token: access token to be used
+        :param filters: query parameters eg: name, uri, owner, type
+        :returns: list
+        """
+        await self.discover()
+        access_token = access_token or await self.access_token  # type: ignore
+        headers = auth_header(access_token)
+        params = {**(filters or {}), "deep": "true", "first": first, "max": page_size}
+        response = await self.request(
+            "find_resources",
+            "get",
+            self.config.uma2.resource_endpoint,
+            headers=headers,
+            params=params,
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def aiter_resources(
+        self,
+        access_token: str = None,
+        page_size: int = Defaults.page_size,
+        concurrency: int = Defaults.concurrency,
+        name: Optional[str] = None,
+        uri: Optional[str] = None,
+        owner: Optional[str] = None,
+        type: Optional[str] = None,
+    ) -> AsyncIterator[Dict]:
+        """
+        iterate over the resources page by page instead of listing the entire
+        resource set, the next page is fetched in the background while the current
+        one is consumed, the resources can be filtered by the server
+
+        >>> from keycloak import AsyncClient
+        >>> kc = AsyncClient()
+        >>> async for resource in kc.aiter_resources(type="urn:python-client:resources:default"):
+        ...     print(resource["name"])
+        default Resource
+        >>>
+
+        :param access_token: access token to be used
+        :param page_size: number of resources to be retrieved per request
+        :param concurrency: maximum number of concurrent requests for the details
+        :param name: name of the resources
+        :param uri: uri of the resources
+        :param owner: owner of the resources
+        :param type: type of the resources
+        :returns: async iterator
+        """
+        await self.discover()
+        access_token = access_token or await self.access_token  # type: ignore
+        filters = {"name": name, "uri": uri, "owner": owner, "type": type}
+        filters = {k: v for k, v in filters.items() if v is not None}
+        last_page: Optional[List] = None
+        first = 0
+        loop = asyncio.get_running_loop()
+        task = loop.create_task(
+            self.find_resource_page(first, page_size, access_token, filters)
+        )
+        try:
+            while True:
+                page = await task
+                # stop when the last page is reached or the server ignores paging
+                if page == last_page:
+                    return
+                more = len(page) == page_size
+                if more:
+                    first += page_size
+                    task = loop.create_task(
+                        self.find_resource_page(first, page_size, access_token, filters)
+                    )
+                resources = page
+                resource_ids = [x for x in page if isinstance(x, str)]
+                if resource_ids:
+                    resources = await self.find_resources_by_id(
+                        resource_ids, access_token, concurrency
+                    )
+                for resource in resources:
+                    yield resource
+                if not more:
+                    return
+                last_page = page
+        finally:
+            task.cancel()
+
+    async def find_resources_by_id(
+        self,
+        resource_ids: List,
+        access_token: str = None,
+        concurrency: int = Defaults.concurrency,
+    ) -> List:
+        """
+        fetch the details of the given resources concurrently, at most `concurrency`
+        requests are in flight at any time and the results keep the given order,
+        if some of them fail `ResourceFetchError` is raised carrying the resources
+        retrieved successfully and the errors keyed by resource id
+
+        :param resource_ids: ids of the resources
+        :param access_token: access token to be used
+        :param concurrency: maximum number of concurrent requests
+        :returns: list
+        """
+        access_token = access_token or await self.access_token  # type: ignore
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(resource_id: str) -> Dict:
+            async with semaphore:
+                return await self.find_resource(resource_id, access_token)
+
+        results = await asyncio.gather(
+            *[fetch(x) for x in resource_ids], return_exceptions=True
+        )
+        errors = {
+            resource_id: result
+            for resource_id, result in zip(resource_ids, results)
+            if isinstance(result, BaseException)
+        }
+        resources = [x for x in results if not isinstance(x, BaseException)]
+        if errors:
+            raise ResourceFetchError(resources, errors)
+        return resources
 
     @handle_exceptions
     async def find_resource(self, resource_id: str, access_token: str = None) -> Dict:
@@ -75,11 +274,12 @@ class AsyncResourceMixin:
         :param access_token: access token to be used
         :returns: list
         """
+        await self.discover()
         access_token = access_token or await self.access_token  # type: ignore
         headers = auth_header(access_token)
-        endpoint = f"{config.uma2.resource_endpoint}/{resource_id}"
+        endpoint = f"{self.config.uma2.resource_endpoint}/{resource_id}"
         log.debug("Retrieving resource from keycloak")
-        async with httpx.AsyncClient() as client:
-            response = await client.get(endpoint, headers=headers)
-            log.debug("Resource retrieved successfully")
-            return response.json()
+        response = await self.request("find_resource", "get", endpoint, headers=headers)
+        response.raise_for_status()
+        log.debug("Resource retrieved successfully")
+        return response.json()
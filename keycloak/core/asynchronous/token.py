@@ -1,23 +1,51 @@
 # -*- coding: utf-8 -*-
+import asyncio
 import logging
-from typing import Dict, List
+import time
+from typing import Dict, List, Optional, Tuple
 
 import httpx
-from cached_property import cached_property
+from cached_property import threaded_cached_property
 from jose import jwt
 
-from keycloak.config import OpenId, config
-from keycloak.constants import Logger
-from keycloak.utils import basic_auth, handle_exceptions
+from keycloak import instrumentation
+from keycloak.breaker import unavailable
+from keycloak.cache import TTLCache
+from keycloak.config import OpenId
+from keycloak.constants import Defaults, GrantTypes, Logger
+from keycloak.core.asynchronous.transport import AsyncTransportMixin
+from keycloak.jwks import AsyncJWKSManager, KeySet
+from keycloak.permissions import PermissionSet
+from keycloak.store import (
+    MemoryTokenStore,
+    TokenStore,
+    record_expired,
+    record_expiry,
+    token_record,
+)
+from keycloak.utils import basic_auth, digest, handle_exceptions, max_age
 
 log = logging.getLogger(Logger.name)
 
 
-class AsyncTokenMixin:
+class AsyncTokenMixin(AsyncTransportMixin):
     """This class consists of methods that can be user to perform JWT operations"""
 
     _tokens: Dict = {}
+    _tokens_expire_at: float = 0.0
+    _refresh_token_expires_at: float = 0.0
+    _tokens_renewed_at: float = float("-inf")
+    _refresh_task: asyncio.Task = None  # type: ignore
+    _jwks_revalidation: asyncio.Task = None  # type: ignore
     openid: OpenId = None  # type: ignore
+    auto_refresh: bool = False
+    token_refresh_ahead: float = Defaults.token_refresh_ahead
+    jwks_ttl: float = Defaults.jwks_ttl
+    jwks_min_refresh_interval: float = Defaults.jwks_min_refresh_interval
+    jwks_stale_ttl: float = Defaults.jwks_stale_ttl
+    token_cache_size: int = 0
+    token_store_size: int = Defaults.token_store_size
+    token_cache_skew: float = Defaults.token_cache_skew
 
     @property
     async def tokens(self) -> Dict:
@@ -33,14 +61,180 @@ class AsyncTokenMixin:
 
         :returns: dictionary
         """
-        if not self._tokens:
-            self._tokens = await self.pat(self.username, self.password)  # type: ignore
+        if not self._tokens or self.tokens_expired:
+            await self.renew_tokens()
         return self._tokens
 
     @tokens.setter
-    async def tokens(self, val: Dict) -> None:
+    def tokens(self, val: Dict) -> None:
         """setter for tokens"""
+        now = time.monotonic()
+        expires_in = float(val.get("expires_in") or 0)
+        refresh_expires_in = float(val.get("refresh_expires_in") or 0)
         self._tokens = val
+        self._tokens_expire_at = now + expires_in if expires_in else 0.0
+        self._refresh_token_expires_at = (
+            now + refresh_expires_in if refresh_expires_in else float("inf")
+        )
+        if self.auto_refresh and expires_in:
+            self.schedule_refresh(
+                max(expires_in - self.token_refresh_ahead, expires_in / 2)
+            )
+
+    @property
+    def tokens_expired(self) -> bool:
+        """
+        whether the access token has expired,
+        tokens without a known lifetime never expire
+
+        :returns: boolean
+        """
+        return (
+            bool(self._tokens_expire_at) and time.monotonic() >= self._tokens_expire_at
+        )
+
+    @threaded_cached_property
+    def tokens_lock(self) -> asyncio.Lock:
+        """lock ensuring that only one renewal of the tokens is in flight"""
+        return asyncio.Lock()
+
+    @threaded_cached_property
+    def token_store(self) -> TokenStore:
+        """
+        store of the tokens of the users of the application keyed by session id or
+        subject, bounded to `token_store_size` users unless replaced by an external
+        store, see `keycloak.store`
+
+        :returns: TokenStore
+        """
+        return MemoryTokenStore(self.token_store_size)
+
+    @threaded_cached_property
+    def token_store_locks(self) -> List[asyncio.Lock]:
+        """locks ensuring that only one renewal of the tokens of a user is in flight"""
+        return [asyncio.Lock() for _ in range(Defaults.token_store_locks)]
+
+    def save_tokens(self, key: str, tokens: Dict) -> None:
+        """
+        method to store the tokens of a user eg: the tokens returned by `callback`
+
+        >>> from keycloak import AsyncClient
+        >>> kc = AsyncClient()
+        >>> kc.save_tokens(session_id, await kc.callback(code))
+
+        :param key: session id or subject
+        :param tokens: tokens returned by keycloak
+        """
+        record = token_record(tokens)
+        self.token_store.set(key, record, record_expiry(record))
+
+    async def load_tokens(self, key: str) -> Optional[Dict]:
+        """
+        tokens of a user, the access token is renewed using the refresh token once
+        expired and concurrent renewals for the same user are coalesced
+
+        >>> import asyncio
+        >>> from keycloak import AsyncClient
+        >>> kc = AsyncClient()
+        >>> asyncio.run(kc.load_tokens(session_id))
+        {'access_token': 'eyJhbGciOiJSUzI1NiIsInR5cCIgOiAiSldUIiwia2lkIiA6ICJLRG9qblhUaF90Z0dzeWtDM1g4VjJfaEY3TU0zZlZpa1B6T2VDX2RiLWx3In0...', 'expires_in': 60, ...}
+        >>>
+
+        :param key: session id or subject
+        :returns: dictionary or None if the user is unknown or has to log in again
+        """
+        record = self.token_store.get(key)
+        if record is not None and record_expired(record, self.token_cache_skew):
+            locks = self.token_store_locks
+            async with locks[hash(key) % len(locks)]:
+                record = await self.renew_stored_tokens(key)
+        return None if record is None else record["tokens"]
+
+    async def renew_stored_tokens(self, key: str) -> Optional[Dict]:
+        record = self.token_store.get(key)
+        # renewed by a concurrent call while waiting for the lock
+        if record is None or not record_expired(record, self.token_cache_skew):
+            return record
+        refresh_token = record["tokens"].get("refresh_token")
+        if not refresh_token or record_expiry(record) <= time.time():
+            self.token_store.delete(key)
+            return None
+        try:
+            tokens = await self.refresh(refresh_token)
+        except httpx.HTTPStatusError as ex:
+            if unavailable(ex):
+                raise
+            # the refresh token was revoked or the session ended
+            self.token_store.delete(key)
+            return None
+        record = token_record(tokens)
+        self.token_store.set(key, record, record_expiry(record))
+        return record
+
+    def discard_tokens(self, key: str) -> None:
+        """method to remove the tokens of a user eg: on logout"""
+        self.token_store.delete(key)
+
+    async def renew_tokens(self) -> None:
+        """
+        method to renew the tokens of the client/user, the refresh token is used while
+        it is valid, otherwise new tokens are requested (password or client_credentials
+        grant), concurrent calls are coalesced into a single request
+
+        >>> import asyncio
+        >>> from keycloak import AsyncClient
+        >>> kc = AsyncClient()
+        >>> asyncio.run(kc.renew_tokens())
+        """
+        since = time.monotonic()
+        async with self.tokens_lock:
+            if self._tokens and self._tokens_renewed_at >= since:
+                return
+            try:
+                refresh_token = self._tokens.get("refresh_token")
+                if refresh_token and since < self._refresh_token_expires_at:
+                    try:
+                        await self.refresh_tokens()
+                        return
+                    except Exception:
+                        log.debug("Unable to refresh tokens, requesting new tokens")
+                self.tokens = await self.pat(self.username, self.password)  # type: ignore
+            finally:
+                self._tokens_renewed_at = time.monotonic()
+
+    def schedule_refresh(self, delay: float) -> None:
+        """
+        method to renew the tokens in a background task after `delay` seconds,
+        callers keep using the current tokens in the meantime
+
+        :param delay: seconds to wait before the renewal
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            log.debug("No running event loop, token refresh not scheduled")
+            return
+        self.cancel_refresh()
+        log.debug(f"Scheduling token refresh in {delay} seconds")
+        self._refresh_task = loop.create_task(self._background_refresh(delay))
+
+    def cancel_refresh(self) -> None:
+        """method to cancel the scheduled renewal of the tokens"""
+        task = self._refresh_task
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
+        self._refresh_task = None  # type: ignore
+
+    async def _background_refresh(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        try:
+            await self.renew_tokens()
+        except Exception:
+            log.exception("Background token refresh failed")
+
+    async def aclose(self) -> None:
+        self.cancel_refresh()
+        await super().aclose()
 
     @property
     async def access_token(self) -> str:
@@ -110,7 +304,6 @@ class AsyncTokenMixin:
         tokens = await self.tokens
         return tokens["token_type"]
 
-    @handle_exceptions
     async def refresh_tokens(self) -> None:
         """
         method to refresh expired access token using refresh token
@@ -120,21 +313,91 @@ class AsyncTokenMixin:
         >>> kc= AsyncClient()
         >>> asyncio.run(await kc.refresh_tokens())
         """
-        headers = basic_auth(config.client.client_id, config.client.client_secret)
+        self.tokens = await self.refresh(self._tokens["refresh_token"])
+
+    @handle_exceptions
+    async def refresh(self, refresh_token: str) -> Dict:
+        """
+        method to exchange a refresh token for new tokens
+
+        >>> import asyncio
+        >>> from keycloak import AsyncClient
+        >>> kc = AsyncClient()
+        >>> asyncio.run(kc.refresh(refresh_token))
+        {'access_token': 'eyJhbGciOiJSUzI1NiIsInR5cCIgOiAiSldUIiwia2lkIiA6ICJLRG9qblhUaF90Z0dzeWtDM1g4VjJfaEY3TU0zZlZpa1B6T2VDX2RiLWx3In0...', 'expires_in': 60, ...}
+        >>>
+
+        :param refresh_token: refresh token of the client/user
+        :returns: dictionary
+        """
+        await self.discover()
+        headers = basic_auth(
+            self.config.client.client_id, self.config.client.client_secret
+        )
         payload = {
-            "client_id": config.client.client_id,
-            "grant_type": "refresh_token",
-            "refresh_token": self._tokens["refresh_token"],
+            "client_id": self.config.client.client_id,
+            "grant_type": GrantTypes.refresh_token,
+            "refresh_token": refresh_token,
         }
         log.debug("Refreshing tokens")
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                config.uma2.token_endpoint, data=payload, headers=headers
-            )
-            log.debug("Tokens refreshed successfully")
-            self._tokens = response.json()
+        response = await self.request(
+            "refresh_tokens",
+            "post",
+            self.config.uma2.token_endpoint,
+            data=payload,
+            headers=headers,
+        )
+        response.raise_for_status()
+        log.debug("Tokens refreshed successfully")
+        return response.json()
+
+    @handle_exceptions
+    async def fetch_jwks(self) -> Tuple[List, Optional[float]]:
+        """
+        retrieve the signing keys/JWKs from the keycloak server
+
+        :returns: list of keys and their max-age (if advertised by the server)
+        """
+        await self.discover()
+        log.debug("Fectching JWK keys")
+        response = await self.request("fetch_jwks", "get", self.config.openid.jwks_uri)
+        response.raise_for_status()
+        data = response.json()
+        self.config.save_snapshot("jwks", data["keys"])
+        return data["keys"], max_age(response.headers)
+
+    @threaded_cached_property
+    def jwks_manager(self) -> AsyncJWKSManager:
+        """
+        manager keeping the signing keys up to date, the keys are re-fetched after
+        `jwks_ttl` seconds (or the max-age advertised by the server) and when a token
+        refers to an unknown kid, the expired keys remain in use while re-fetched
+        in the background for at most `jwks_stale_ttl` seconds
+
+        when a snapshot file is configured the keys stored in it are used right away
+        and revalidated in a background task
+
+        :returns: AsyncJWKSManager
+        """
+        manager = AsyncJWKSManager(
+            self.fetch_jwks,
+            self.jwks_ttl,
+            self.jwks_min_refresh_interval,
+            self.jwks_stale_ttl,
+        )
+        entry = self.config.snapshot_entry("jwks")
+        if entry is not None:
+            log.debug("Loading JWK keys from the snapshot")
+            manager.seed(entry[0], min(entry[1], self.jwks_ttl))
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                log.debug("No running event loop, JWK keys not revalidated")
+            else:
+                self._jwks_revalidation = loop.create_task(manager.refresh())
+        return manager
 
-    @cached_property
+    @property
     async def jwks(self) -> List:
         """
         list of signing keys/JWKs used by the keycloak server
@@ -148,16 +411,46 @@ class AsyncTokenMixin:
 
         :returns: list
         """
-        log.debug("Fectching JWK keys")
-        async with httpx.AsyncClient() as client:
-            response = await client.get(config.openid.jwks_uri)
-            data = response.json()
-            return data["keys"]
+        keyset = await self.keyset
+        return keyset.jwks
+
+    @property
+    async def keyset(self) -> KeySet:
+        """
+        signing keys of the keycloak server parsed into key objects indexed by kid
+
+        >>> import asyncio
+        >>> from keycloak import AsyncClient
+        >>> kc = AsyncClient()
+        >>> keyset = asyncio.run(kc.keyset)
+        >>> keyset.get('KDojnXTh_tgGsykC3X8V2_hF7MM3fVikPzOeC_db-lw', 'RS256')
+        <jose.backends.cryptography_backend.CryptographyRSAKey object at 0x7f8e5c1b2d90>
+        >>>
+
+        :returns: KeySet
+        """
+        return await self.jwks_manager.get_keyset()
+
+    @threaded_cached_property
+    def token_cache(self) -> Optional[TTLCache]:
+        """
+        cache of the verified tokens keyed by token digest, entries are evicted
+        `token_cache_skew` seconds before the token expires,
+        disabled unless `token_cache_size` is set
+
+        :returns: TTLCache or None
+        """
+        if self.token_cache_size:
+            return TTLCache(self.token_cache_size)
+        return None
 
     async def decode(self, token: str) -> Dict:
         """
         decode given json web token (jwt)
 
+        when `token_cache_size` is set, the claims of the verified tokens are cached
+        until shortly before they expire and repeated calls skip the signature check
+
         >>> import asyncio
         >>> from keycloak import AsyncClient
         >>> kc= AsyncClient()
@@ -168,9 +461,131 @@ class AsyncTokenMixin:
         :param token: jwt to be decoded eg:access_token or refresh_token
         :returns: dictionary
         """
+        await self.discover()
+        cache = self.token_cache
+        if cache is not None:
+            token_digest = digest(token)
+            claims = cache.get(token_digest)
+            instrumentation.record_cache("decode", "miss" if claims is None else "hit")
+            if claims is not None:
+                return dict(claims)
+
+        claims = await self.verify(token, self.config.client.client_id)
+
+        if cache is not None and "exp" in claims:
+            expires_at = float(claims["exp"]) - self.token_cache_skew
+            cache.set(token_digest, dict(claims), expires_at)
+        return claims
+
+    async def verify(self, token: str, audience: Optional[str] = None) -> Dict:
+        """
+        verify the signature, issuer and expiry of the given jwt with the JWKS,
+        the audience is only checked when given and the claims are not cached
+
+        :param token: jwt to be verified
+        :param audience: expected audience, None to skip the audience check
+        :returns: dictionary
+        """
+        await self.discover()
+        options: Dict = {"audience": audience}
+        if audience is None:
+            options["options"] = {"verify_aud": False}
+        header = jwt.get_unverified_header(token)
+        alg = header.get("alg")
+        key = await self.jwks_manager.get_key(header.get("kid"), alg)
         return jwt.decode(
             token,
-            await self.jwks,  # type: ignore
-            issuer=config.openid.issuer,
-            audience=config.client.client_id,
+            key or await self.jwks,
+            algorithms=alg,
+            issuer=self.config.openid.issuer,
+            **options,
         )
+
+    async def subject(self, token: str) -> str:
+        """
+        subject of the given access token, verified like `decode` except for the
+        audience since the access tokens of the users often name this client in
+        the `azp` claim only
+
+        when `token_cache_size` is set, the subject is cached until shortly before
+        the token expires
+
+        >>> import asyncio
+        >>> from keycloak import AsyncClient
+        >>> kc = AsyncClient()
+        >>> asyncio.run(kc.subject(access_token))
+        '6ba08443-3881-40e7-af43-10b7196b02fd'
+        >>>
+
+        :param token: access token of the user
+        :returns: str
+        """
+        cache = self.token_cache
+        if cache is not None:
+            key = (digest(token), "sub")
+            subject = cache.get(key)
+            if subject is not None:
+                return subject
+
+        claims = await self.verify(token)
+
+        if cache is not None and "exp" in claims:
+            expires_at = float(claims["exp"]) - self.token_cache_skew
+            cache.set(key, claims["sub"], expires_at)
+        return claims["sub"]
+
+    async def rpt_permissions(self, rpt: str) -> PermissionSet:
+        """
+        permissions granted by the requesting party token (RPT), read from its
+        `authorization.permissions` claim once the token is verified with the JWKS,
+        unlike `introspect` no call is sent to keycloak
+
+        when `token_cache_size` is set, the indexed permissions are cached along with
+        the claims until shortly before the token expires
+
+        >>> import asyncio
+        >>> from keycloak import AsyncClient
+        >>> kc = AsyncClient(token_cache_size=10000)
+        >>> rpt = asyncio.run(kc.rpt(access_token))["access_token"]
+        >>> asyncio.run(kc.rpt_permissions(rpt)).allows("Default Resource")
+        True
+        >>>
+
+        :param rpt: requesting party token
+        :returns: PermissionSet
+        """
+        cache = self.token_cache
+        if cache is not None:
+            key = (digest(rpt), "permissions")
+            granted = cache.get(key)
+            if granted is not None:
+                return granted
+
+        claims = await self.decode(rpt)
+        granted = PermissionSet(claims.get("authorization", {}).get("permissions", []))
+
+        if cache is not None and "exp" in claims:
+            expires_at = float(claims["exp"]) - self.token_cache_skew
+            cache.set(key, granted, expires_at)
+        return granted
+
+    async def has_permission(
+        self, rpt: str, resource: str, scope: Optional[str] = None
+    ) -> bool:
+        """
+        whether the requesting party token (RPT) grants the resource or one of its
+        scopes, evaluated locally, see `rpt_permissions`
+
+        >>> import asyncio
+        >>> from keycloak import AsyncClient
+        >>> kc = AsyncClient(token_cache_size=10000)
+        >>> asyncio.run(kc.has_permission(rpt, "Default Resource", "view"))
+        False
+        >>>
+
+        :param rpt: requesting party token
+        :param resource: id or name of the resource
+        :param scope: name of the scope, None for the resource itself
+        :returns: boolean
+        """
+        return (await self.rpt_permissions(rpt)).allows(resource, scope)
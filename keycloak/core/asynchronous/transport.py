@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import logging
+from types import TracebackType
+from typing import TYPE_CHECKING, Any, Optional, Type, Union
+
+import httpx
+
+from keycloak import instrumentation
+from keycloak.breaker import CircuitBreaker, failed
+from keycloak.constants import Defaults, Logger
+from keycloak.retry import RetryPolicy
+
+if TYPE_CHECKING:  # pragma: no cover
+    from keycloak.config import Config
+
+log = logging.getLogger(Logger.name)
+
+
+class AsyncTransportMixin:
+    """
+    This class manages the pooled http connections used to talk to the keycloak server
+    """
+
+    _http: httpx.AsyncClient = None  # type: ignore
+    timeout: Union[float, httpx.Timeout] = Defaults.timeout
+    limits: httpx.Limits = httpx.Limits(
+        max_connections=Defaults.max_connections,
+        max_keepalive_connections=Defaults.max_keepalive_connections,
+        keepalive_expiry=Defaults.keepalive_expiry,
+    )
+    http2: bool = False
+    retry_policy: RetryPolicy = RetryPolicy()
+    circuit_breaker: CircuitBreaker = CircuitBreaker()
+    # connection pool shared with other clients, never closed by this one
+    pool: Optional[httpx.AsyncClient] = None
+    # configuration (client settings and discovery documents), set by the clients
+    config: "Config"
+    transport: Optional[httpx.AsyncBaseTransport] = None
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        """
+        long lived http client shared by every coroutine talking to the keycloak server,
+        with http2 enabled the requests are multiplexed over a single connection
+
+        >>> from keycloak import AsyncClient
+        >>> kc = AsyncClient()
+        >>> kc.http
+        <httpx.AsyncClient object at 0x7f0d1c2b5f10>
+        >>>
+
+        :returns: httpx.AsyncClient
+        """
+        if self.pool is not None:
+            return self.pool
+        if self._http is None or self._http.is_closed:
+            log.debug("Opening connection pool")
+            self._http = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=self.limits,
+                http2=self.http2,
+                transport=self.transport,
+            )
+        return self._http
+
+    async def request(
+        self,
+        operation: str,
+        method: str,
+        url: str,
+        cache: Optional[str] = None,
+        **kwargs: Any,
+    ) -> httpx.Response:
+        """
+        method to send a request to the keycloak server using the pooled client,
+        the failed calls are retried according to `retry_policy`, the calls to a
+        failing endpoint are suspended by `circuit_breaker` (recording the outcome of
+        the call once, after the retries) and the listeners registered in
+        `keycloak.instrumentation` are notified once the call completes
+
+        >>> import asyncio
+        >>> from keycloak import AsyncClient
+        >>> kc = AsyncClient()
+        >>> asyncio.run(kc.request("fetch_jwks", "get", "http://localhost:8080/auth/realms/master/protocol/openid-connect/certs"))
+        <Response [200 OK]>
+        >>>
+
+        :param operation: name of the operation reported to the listeners
+        :param method: http method in lowercase eg: get, post
+        :param url: url of the endpoint
+        :param cache: cache lookup result reported to the listeners
+        :returns: httpx.Response
+        """
+        event = instrumentation.start(operation, method, url, cache)
+        send = getattr(self.http, method)
+        retries = 0
+        while True:
+            try:
+                self.circuit_breaker.check(operation)
+                response = await send(url, **kwargs)
+            except Exception as ex:
+                delay = self.retry_policy.delay(operation, method, retries, error=ex)
+                if delay is None:
+                    # the breaker counts calls, not the attempts of a call
+                    if isinstance(ex, httpx.TransportError):
+                        self.circuit_breaker.record(operation, success=False)
+                    instrumentation.finish(event, error=ex, retries=retries)
+                    raise
+            else:
+                delay = self.retry_policy.delay(operation, method, retries, response)
+                if delay is None:
+                    success = not failed(response.status_code)
+                    self.circuit_breaker.record(operation, success)
+                    instrumentation.finish(event, response, retries=retries)
+                    return response
+                await response.aclose()
+            retries += 1
+            log.warning(f"Retrying {operation} in {delay:.2f} seconds")
+            await asyncio.sleep(delay)
+
+    async def discover(self) -> None:
+        """
+        method to load the openid and uma2 discovery documents using the pooled client,
+        the documents are fetched concurrently and only once
+
+        >>> import asyncio
+        >>> from keycloak import AsyncClient
+        >>> kc = AsyncClient()
+        >>> asyncio.run(kc.discover())
+        """
+        await self.config.aload(self)
+
+    async def aclose(self) -> None:
+        """
+        method to close the pooled connections,
+        the pool will be re-opened on the next request
+
+        >>> import asyncio
+        >>> from keycloak import AsyncClient
+        >>> kc = AsyncClient()
+        >>> asyncio.run(kc.aclose())
+        """
+        if self._http is not None and not self._http.is_closed:
+            log.debug("Closing connection pool")
+            await self._http.aclose()
+
+    async def __aenter__(self) -> "AsyncTransportMixin":
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        await self.aclose()
@@ -4,21 +4,18 @@ from typing import Dict, Tuple
 from urllib.parse import urlencode
 from uuid import uuid4
 
-import httpx
-
-from keycloak.config import config
 from keycloak.constants import GrantTypes, Logger, ResponseTypes
+from keycloak.core.transport import TransportMixin
 from keycloak.utils import auth_header, handle_exceptions
 
 log = logging.getLogger(Logger.name)
 
 
-class AuthenticationMixin:
+class AuthenticationMixin(TransportMixin):
     """
     This class includes the methods to interact with the authentication flow
     """
 
-    _userinfo: Dict = {}
     callback_uri = "http://localhost/kc/callback"
 
     def login(self, scopes: Tuple = ("openid",)) -> Tuple:
@@ -53,13 +50,13 @@ class AuthenticationMixin:
         arguments = urlencode(
             {
                 "state": state,
-                "client_id": config.client.client_id,
+                "client_id": self.config.client.client_id,
                 "response_type": ResponseTypes.code,
                 "scope": " ".join(scopes),
                 "redirect_uri": self.callback_uri,
             }
         )
-        return f"{config.openid.authorization_endpoint}?{arguments}", state
+        return f"{self.config.openid.authorization_endpoint}?{arguments}", state
 
     @handle_exceptions
     def callback(self, code: str) -> Dict:
@@ -103,11 +100,13 @@ class AuthenticationMixin:
             "code": code,
             "grant_type": GrantTypes.authorization_code,
             "redirect_uri": self.callback_uri,
-            "client_id": config.client.client_id,
-            "client_secret": config.client.client_secret,
+            "client_id": self.config.client.client_id,
+            "client_secret": self.config.client.client_secret,
         }
         log.debug("Retrieving user tokens from server")
-        response = httpx.post(config.openid.token_endpoint, data=payload)
+        response = self.request(
+            "callback", "post", self.config.openid.token_endpoint, data=payload
+        )
         response.raise_for_status()
         log.debug("User tokens retrieved successfully")
         return response.json()
@@ -130,7 +129,12 @@ class AuthenticationMixin:
         access_token = access_token or self.access_token  # type: ignore
         headers = auth_header(access_token)
         log.debug("Retrieving user info from server")
-        response = httpx.get(config.openid.userinfo_endpoint, headers=headers)
+        response = self.request(
+            "fetch_userinfo",
+            "get",
+            self.config.openid.userinfo_endpoint,
+            headers=headers,
+        )
         response.raise_for_status()
         log.debug("User info retrieved successfully")
         return response.json()
@@ -138,7 +142,8 @@ class AuthenticationMixin:
     @property
     def userinfo(self) -> Dict:
         """
-        user information available within the server
+        user information available within the server, fetched on every access since
+        the tokens (and so the user) may change in between
 
         >>>
         >>> from keycloak import Client
@@ -149,22 +154,24 @@ class AuthenticationMixin:
 
         :returns: dictionary
         """
-        if not self._userinfo:
-            self._userinfo = self.fetch_userinfo()
-        return self._userinfo
+        return self.fetch_userinfo()
 
     def logout(self, access_token: str = None, refresh_token: str = None) -> None:
         access_token = access_token or self.access_token  # type: ignore
         refresh_token = refresh_token or self.refresh_token  # type: ignore
         payload = {
-            "client_id": config.client.client_id,
-            "client_secret": config.client.client_secret,
+            "client_id": self.config.client.client_id,
+            "client_secret": self.config.client.client_secret,
             "refresh_token": refresh_token,
         }
         headers = auth_header(access_token)
         log.debug("Logging out user from server")
-        response = httpx.post(
-            config.openid.end_session_endpoint, data=payload, headers=headers
+        response = self.request(
+            "logout",
+            "post",
+            self.config.openid.end_session_endpoint,
+            data=payload,
+            headers=headers,
         )
         response.raise_for_status()
         log.debug("User logged out successfully")
@@ -1,25 +1,86 @@
 # -*- coding: utf-8 -*-
 import logging
+import time
 from dataclasses import asdict
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple
 
-import httpx
+from cached_property import threaded_cached_property
+from jose.exceptions import JWTError
 
-from keycloak.config import config
-from keycloak.constants import GrantTypes, Logger, TokenType, TokenTypeHints
-from keycloak.utils import auth_header, basic_auth, handle_exceptions
+from keycloak import instrumentation
+from keycloak.breaker import unavailable
+from keycloak.cache import (
+    TTLCache,
+    decision_key,
+    introspection_expiry,
+    introspection_stale_until,
+    rpt_expiry,
+    rpt_key,
+)
+from keycloak.constants import (
+    Defaults,
+    GrantTypes,
+    Logger,
+    TokenType,
+    TokenTypeHints,
+    UmaResponseModes,
+)
+from keycloak.core.transport import TransportMixin
+from keycloak.permissions import Permission, PermissionSet, permission_param
+from keycloak.utils import auth_header, basic_auth, digest, handle_exceptions
 
 log = logging.getLogger(Logger.name)
 
 
-class AuthorizationMixin:
+class AuthorizationMixin(TransportMixin):
     """
     collection of methods to interact with the authorization api
     see https://www.keycloak.org/docs/latest/authorization_services/ for details
     """
 
-    _ticket: Dict = None  # type: ignore
-    _rpt: Dict = {}
+    rpt_cache_size: int = 0
+    rpt_cache_skew: float = Defaults.token_cache_skew
+    introspection_cache_size: int = 0
+    introspection_cache_ttl: float = Defaults.introspection_cache_ttl
+    introspection_negative_ttl: float = Defaults.introspection_negative_ttl
+    decision_cache_size: int = 0
+    decision_cache_ttl: float = Defaults.decision_cache_ttl
+
+    @threaded_cached_property
+    def rpt_cache(self) -> Optional[TTLCache]:
+        """
+        cache of the requesting party tokens keyed by access token digest,
+        audience and permissions, disabled unless `rpt_cache_size` is set
+
+        :returns: TTLCache or None
+        """
+        if self.rpt_cache_size:
+            return TTLCache(self.rpt_cache_size)
+        return None
+
+    @threaded_cached_property
+    def introspection_cache(self) -> Optional[TTLCache]:
+        """
+        cache of the introspection results keyed by token digest,
+        disabled unless `introspection_cache_size` is set
+
+        :returns: TTLCache or None
+        """
+        if self.introspection_cache_size:
+            return TTLCache(self.introspection_cache_size)
+        return None
+
+    @threaded_cached_property
+    def decision_cache(self) -> Optional[TTLCache]:
+        """
+        cache of the authorization decisions keyed by subject, audience, resource
+        and scope, disabled unless `decision_cache_size` is set
+
+        :returns: TTLCache or None
+        """
+        if self.decision_cache_size:
+            return TTLCache(self.decision_cache_size)
+        return None
 
     @staticmethod
     def payload_for_client() -> Dict:
@@ -49,9 +110,8 @@ class AuthorizationMixin:
         else:
             return {}
 
-    @staticmethod
     @handle_exceptions
-    def pat(username: str = None, password: str = None) -> Dict:
+    def pat(self, username: str = None, password: str = None) -> Dict:
         """
         retrieve protection api token (PAT),
         see `docs <https://www.keycloak.org/docs/latest/authorization_services/#_service_protection_whatis_obtain_pat>`__ for more details
@@ -68,13 +128,21 @@ class AuthorizationMixin:
 
         :returns: dictionary
         """
-        headers = basic_auth(config.client.client_id, config.client.client_secret)
+        headers = basic_auth(
+            self.config.client.client_id, self.config.client.client_secret
+        )
         payload = (
             AuthorizationMixin.payload_for_user(username, password)
             or AuthorizationMixin.payload_for_client()
         )
         log.debug("Retrieving PAT from server")
-        response = httpx.post(config.uma2.token_endpoint, data=payload, headers=headers)
+        response = self.request(
+            "pat",
+            "post",
+            self.config.uma2.token_endpoint,
+            data=payload,
+            headers=headers,
+        )
         response.raise_for_status()
         return response.json()
 
@@ -104,19 +172,32 @@ class AuthorizationMixin:
             for x in resources
         ]
         log.debug("Retrieving permission ticket from keycloak")
-        response = httpx.post(
-            config.uma2.permission_endpoint, json=payload, headers=headers
+        response = self.request(
+            "ticket",
+            "post",
+            self.config.uma2.permission_endpoint,
+            json=payload,
+            headers=headers,
         )
         response.raise_for_status()
         log.debug("Permission ticket retrieved successfully")
         return response.json()
 
     @handle_exceptions
-    def rpt(self, access_token: str) -> Dict:
+    def rpt(
+        self,
+        access_token: str,
+        audience: str = None,
+        permissions: Sequence[str] = (),
+    ) -> Dict:
         """
         retrieve request party token (RPT)
         see `docs <https://www.keycloak.org/docs/latest/authorization_services/#_service_rpt_overview>`__ for more details
 
+        when `rpt_cache_size` is set, the tokens are reused for the same access token,
+        audience and permissions until `rpt_cache_skew` seconds before they expire,
+        or until they expire while the keycloak server is unavailable
+
         >>>
         >>> form keycloak import Client
         >>> kc = Client(username='myuser', password='*****')
@@ -129,27 +210,148 @@ class AuthorizationMixin:
         >>>
 
         :param access_token: access token to be used
+        :param audience: client id of the resource server, defaults to this client
+        :param permissions: permissions to be requested eg: `resource#scope`
+
+        :returns: dictionary
+        """
+        audience = audience or self.config.client.client_id
+        cache, lookup = self.rpt_cache, None
+        if cache is not None:
+            key = rpt_key(access_token, audience, permissions)
+            result = cache.get(key)
+            if result is not None:
+                instrumentation.record_cache("rpt", "hit")
+                return dict(result)
+            lookup = "miss"
+
+        payload: Dict = {"grant_type": GrantTypes.uma_ticket, "audience": audience}
+        if permissions:
+            payload["permission"] = list(permissions)
+        headers = auth_header(access_token, TokenType.bearer)
+        log.debug("Retrieving RPT from keycloak")
+        try:
+            response = self.request(
+                "rpt",
+                "post",
+                self.config.uma2.token_endpoint,
+                cache=lookup,
+                data=payload,
+                headers=headers,
+            )
+            response.raise_for_status()
+        except Exception as ex:
+            stale = cache.get_stale(key) if cache is not None else None
+            if stale is None or not unavailable(ex):
+                raise
+            log.warning("Keycloak unavailable, using the cached RPT")
+            instrumentation.record_cache("rpt", "stale")
+            return dict(stale)
+        log.debug("RPT retrieved successfully")
+        result = response.json()
+
+        if cache is not None:
+            expires_at = rpt_expiry(result, self.rpt_cache_skew)
+            cache.set(key, dict(result), expires_at, rpt_expiry(result, 0))
+        return result
+
+    @handle_exceptions
+    def check_permissions(
+        self,
+        access_token: str,
+        permissions: Sequence[Permission],
+        audience: str = None,
+        decision_cache: Optional[TTLCache] = None,
+    ) -> Dict[Permission, bool]:
+        """
+        evaluate several permissions of the user in a single call, using the uma grant
+        with the `permissions` response mode instead of a ticket and an RPT
+
+        when `decision_cache_size` is set, the decisions are cached per subject for
+        `decision_cache_ttl` seconds and only the permissions missing from the cache
+        are sent to keycloak, the subject is read from the verified access token
+        (signature, issuer and expiry, see `subject`), the tokens failing the
+        verification are left to keycloak
+
+        >>> from keycloak import Client
+        >>> kc = Client(decision_cache_size=10000)
+        >>> kc.check_permissions(access_token, [("Album", "view"), ("Album", "delete")])
+        {('Album', 'view'): True, ('Album', 'delete'): False}
+        >>>
+
+        :param access_token: access token of the user
+        :param permissions: resources (id or name) and scopes, None for the resource
+        :param audience: client id of the resource server, defaults to this client
+        :param decision_cache: cache to be used instead of `decision_cache`
 
         :returns: dictionary
         """
+        audience = audience or self.config.client.client_id
+        decisions: Dict[Permission, bool] = {}
+        missing = list(dict.fromkeys(permissions))
+        if not missing:
+            return decisions
+        if decision_cache is None:
+            decision_cache = self.decision_cache
+        cache, lookup = decision_cache, None
+        if cache is not None:
+            try:
+                subject = self.subject(access_token)  # type: ignore
+            except JWTError:
+                cache = None
+        if cache is not None:
+            for permission in missing:
+                decision = cache.get(decision_key(subject, audience, *permission))
+                if decision is not None:
+                    decisions[permission] = decision
+            missing = [x for x in missing if x not in decisions]
+            if not missing:
+                instrumentation.record_cache("check_permissions", "hit")
+                return decisions
+            lookup = "miss"
+
         payload = {
             "grant_type": GrantTypes.uma_ticket,
-            "audience": config.client.client_id,
+            "audience": audience,
+            "response_mode": UmaResponseModes.permissions,
+            "permission": [permission_param(x) for x in missing],
         }
         headers = auth_header(access_token, TokenType.bearer)
-        log.debug("Retrieving RPT from keycloak")
-        response = httpx.post(config.uma2.token_endpoint, data=payload, headers=headers)
-        response.raise_for_status()
-        log.debug("RPT retrieved successfully")
-        return response.json()
+        log.debug(f"Evaluating {len(missing)} permission(s)")
+        response = self.request(
+            "check_permissions",
+            "post",
+            self.config.uma2.token_endpoint,
+            cache=lookup,
+            data=payload,
+            headers=headers,
+        )
+        # keycloak answers 403 when none of the permissions is granted
+        if response.status_code == 403:
+            granted = PermissionSet([])
+        else:
+            response.raise_for_status()
+            granted = PermissionSet(response.json())
+
+        expires_at = time.time() + self.decision_cache_ttl
+        for permission in missing:
+            decisions[permission] = granted.allows(*permission)
+            if cache is not None:
+                key = decision_key(subject, audience, *permission)
+                cache.set(key, decisions[permission], expires_at)
+        return decisions
 
-    @staticmethod
     @handle_exceptions
-    def introspect(rpt: str) -> Dict:
+    def introspect(self, rpt: str) -> Dict:
         """
         introspect the request party token (RPT)
         see `docs <https://www.keycloak.org/docs/latest/authorization_services/#_service_protection_token_introspection>`__ for more details
 
+        when `introspection_cache_size` is set, the results are reused until the token
+        expires (at most `introspection_cache_ttl` seconds), inactive tokens are
+        remembered for `introspection_negative_ttl` seconds, while the keycloak server
+        is unavailable the expired results are used until the token expires
+
         >>>
          >>> form keycloak import Client
         >>> kc = Client(username='myuser', password='*****')
@@ -164,12 +366,44 @@ class AuthorizationMixin:
 
         :returns: dictionary
         """
+        cache, lookup = self.introspection_cache, None
+        if cache is not None:
+            rpt_digest = digest(rpt)
+            result = cache.get(rpt_digest)
+            if result is not None:
+                instrumentation.record_cache("introspect", "hit")
+                return dict(result)
+            lookup = "miss"
+
         payload = {"token_type_hint": TokenTypeHints.rpt, "token": rpt}
-        headers = basic_auth(config.client.client_id, config.client.client_secret)
-        log.debug("Introspecting RPT token")
-        response = httpx.post(
-            config.uma2.introspection_endpoint, data=payload, headers=headers
+        headers = basic_auth(
+            self.config.client.client_id, self.config.client.client_secret
         )
-        response.raise_for_status()
+        log.debug("Introspecting RPT token")
+        try:
+            response = self.request(
+                "introspect",
+                "post",
+                self.config.uma2.introspection_endpoint,
+                cache=lookup,
+                data=payload,
+                headers=headers,
+            )
+            response.raise_for_status()
+        except Exception as ex:
+            stale = cache.get_stale(rpt_digest) if cache is not None else None
+            if stale is None or not unavailable(ex):
+                raise
+            log.warning("Keycloak unavailable, using the cached introspection result")
+            instrumentation.record_cache("introspect", "stale")
+            return dict(stale)
         log.debug("RPT introspected successfully")
-        return response.json()
+        result = response.json()
+
+        if cache is not None:
+            expires_at = introspection_expiry(
+                result, self.introspection_cache_ttl, self.introspection_negative_ttl
+            )
+            stale_until = introspection_stale_until(result)
+            cache.set(rpt_digest, dict(result), expires_at, stale_until)
+        return result
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+from typing import Optional, Union
+
+import httpx
+
+from keycloak.breaker import CircuitBreaker
+from keycloak.config import Config, config
+from keycloak.constants import Defaults
+from keycloak.core.authentication import AuthenticationMixin
+from keycloak.core.authorization import AuthorizationMixin
+from keycloak.core.resource import ResourceMixin
+from keycloak.core.token import TokenMixin
+from keycloak.core.transport import TransportMixin
+from keycloak.retry import RetryPolicy
+from keycloak.store import TokenStore
+from keycloak.utils import Singleton
+
+
+class Client(
+    AuthenticationMixin,
+    AuthorizationMixin,
+    TokenMixin,
+    ResourceMixin,
+    TransportMixin,
+    metaclass=Singleton,
+):
+    """
+    Python client to interact with the rest APIs provided by the keycloak server
+
+    >>> from keycloak import Client
+    >>> with Client(timeout=10.0, http2=True) as kc:
+    >>>     kc.fetch_userinfo()
+    >>>
+
+    :param callback_uri: uri to which keycloak redirects after login
+    :param username: username to be used
+    :param password: password to be used
+    :param timeout: timeout (in seconds) applied to the requests sent to keycloak
+    :param limits: connection pool limits
+    :param http2: enable http/2 (requires ``httpx[http2]``)
+    :param token_cache_size: number of verified tokens to be cached by `decode`
+    :param auto_refresh: renew the tokens in the background before they expire
+    :param introspection_cache_size: number of introspection results to be cached
+    :param rpt_cache_size: number of requesting party tokens to be cached by `rpt`
+    :param decision_cache_size: number of decisions to be cached by `check_permissions`
+    :param transport: custom httpx transport eg: a mock server for tests
+    :param retry_policy: policy applied to the failed calls, see `keycloak.retry`
+    :param circuit_breaker: breaker suspending the calls to a failing endpoint
+    :param config: client settings and discovery documents, defaults to the shared
+        configuration read from the settings file, fetched using the pool of the
+        first client attached to it
+    :param pool: connection pool shared with other clients
+    :param token_store: store of the tokens of the users, see `keycloak.store`
+    :param token_store_size: number of users kept by the default in-memory store
+    """
+
+    config: Config = config
+
+    def __init__(
+        self,
+        callback_uri: str = "http://localhost/kc/callback",
+        username: str = None,
+        password: str = None,
+        timeout: Union[float, httpx.Timeout] = Defaults.timeout,
+        limits: httpx.Limits = TransportMixin.limits,
+        http2: bool = False,
+        token_cache_size: int = 0,
+        auto_refresh: bool = False,
+        introspection_cache_size: int = 0,
+        rpt_cache_size: int = 0,
+        decision_cache_size: int = 0,
+        transport: Optional[httpx.BaseTransport] = None,
+        retry_policy: RetryPolicy = None,
+        circuit_breaker: CircuitBreaker = None,
+        config: Config = None,
+        pool: Optional[httpx.Client] = None,
+        token_store: Optional[TokenStore] = None,
+        token_store_size: int = Defaults.token_store_size,
+    ) -> None:
+        self.callback_uri = callback_uri
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.limits = limits
+        self.http2 = http2
+        self.token_cache_size = token_cache_size
+        self.auto_refresh = auto_refresh
+        self.introspection_cache_size = introspection_cache_size
+        self.rpt_cache_size = rpt_cache_size
+        self.decision_cache_size = decision_cache_size
+        self.transport = transport
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        if config is not None:
+            self.config = config
+        # the discovery documents are fetched using the pool of this client
+        self.config.attach(self)
+        self.pool = pool
+        if token_store is not None:
+            self.token_store = token_store
+        self.token_store_size = token_store_size
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+import logging
+from types import TracebackType
+from typing import Dict, Optional, Type
+
+import httpx
+
+from keycloak.config import Config
+from keycloak.constants import Logger
+from keycloak.core.client import Client
+from keycloak.registry import BaseRegistry
+
+log = logging.getLogger(Logger.name)
+
+
+class Registry(BaseRegistry[Client]):
+    """
+    registry of the clients of several keycloak realms sharing one connection pool,
+    see `keycloak.registry.BaseRegistry`
+
+    >>> from keycloak import Registry
+    >>> with Registry(maxsize=100, token_cache_size=1000) as registry:
+    >>>     registry.register("http://localhost:8080/auth", "acme", "api", "secret")
+    >>>     kc = registry.get("http://localhost:8080/auth", "acme", "api")
+    >>>     kc.introspect(token)
+    >>>
+
+    `Client()` remains the client configured by the settings file, the clients of
+    a registry are independent of it
+    """
+
+    _pool: httpx.Client = None  # type: ignore
+
+    @property
+    def pool(self) -> httpx.Client:
+        """connection pool shared by the clients, re-opened after `close`"""
+        if self._pool is None or self._pool.is_closed:
+            log.debug("Opening shared connection pool")
+            self._pool = httpx.Client(
+                timeout=self.timeout,
+                limits=self.limits,
+                http2=self.http2,
+                transport=self.transport,
+            )
+        return self._pool
+
+    def create(self, config: Config, settings: Dict) -> Client:
+        options = {**self.options, **settings}
+        del options["client_secret"]
+        client = Client.create(config=config, pool=self.pool, **options)
+        config.pool = self.pool
+        config.retry_policy = client.retry_policy
+        config.circuit_breaker = client.circuit_breaker
+        return client
+
+    def evict(self, client: Client) -> None:
+        # the shared pool is left open
+        client.close()
+
+    def close(self) -> None:
+        """method to drop the clients and close the shared connection pool"""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            self.evict(client)
+        if self._pool is not None and not self._pool.is_closed:
+            log.debug("Closing shared connection pool")
+            self._pool.close()
+
+    def __enter__(self) -> "Registry":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
@@ -1,18 +1,21 @@
 # -*- coding: utf-8 -*-
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Dict, List
+from typing import Dict, Iterator, List, Optional
 
-import httpx
+from cached_property import threaded_cached_property
 
-from keycloak.config import config
-from keycloak.constants import Logger
+from keycloak.constants import Defaults, Logger
+from keycloak.core.transport import TransportMixin
+from keycloak.exceptions import ResourceFetchError
+from keycloak.matcher import PathMatcher
 from keycloak.utils import auth_header, handle_exceptions
 
 log = logging.getLogger(Logger.name)
 
 
-class ResourceMixin:
+class ResourceMixin(TransportMixin):
     """
     This class consists of methods that can be used to manage resources
     """
@@ -36,11 +39,48 @@ class ResourceMixin:
             self._resources = self.find_resources()
         return self._resources
 
+    @threaded_cached_property
+    def path_matcher(self) -> PathMatcher:
+        """
+        matcher of the request paths compiled from the `paths` of the policy enforcer
+        settings, the uris of the resources are added by `refresh_paths`
+
+        :returns: PathMatcher
+        """
+        settings = getattr(self.config.client, "policy_enforcer", None)
+        return PathMatcher.from_settings(settings)
+
+    def refresh_paths(self, access_token: str = None) -> None:
+        """
+        method to index the uris of the resources in `path_matcher`, only the
+        resources changed since the last call are re-indexed
+
+        >>> from keycloak import Client
+        >>> kc = Client()
+        >>> kc.refresh_paths()
+        >>> kc.path_matcher.match("/albums/42", "DELETE")
+        PathMatch(config=PathConfig(path='/albums/{id}', name='Album', ...), scopes=['delete'], params={'id': '42'})
+        >>>
+
+        :param access_token: access token to be used
+        """
+        self.path_matcher.update_resources(self.find_resources(access_token))
+
     @handle_exceptions
-    def find_resources(self, access_token: str = None) -> Dict:
+    def find_resources(
+        self,
+        access_token: str = None,
+        page_size: int = Defaults.page_size,
+        concurrency: int = Defaults.concurrency,
+    ) -> List:
         """
         fetch resources from keycloak server
 
+        the full representations are listed in pages of `page_size` using the
+        `deep` mode of the resource set endpoint, if the server responds with
+        resource ids instead (deep mode not supported) the details are fetched
+        using a pool of `concurrency` threads
+
         >>> from keycloak import Client
         >>> kc = Client()
         >>> kc.find_resources()
@@ -48,15 +88,163 @@ class ResourceMixin:
         >>>
 
         :param access_token: access token to be used
+        :param page_size: number of resources to be retrieved per request
+        :param concurrency: number of threads used to fetch the resource details
         :returns: list
         """
         access_token = access_token or self.access_token  # type: ignore
-        headers = auth_header(access_token)
         log.debug("Retrieving resources from keycloak")
-        response = httpx.get(config.uma2.resource_endpoint, headers=headers)
-        response.raise_for_status()
+        resources: List = []
+        page: List = []
+        first = 0
+        while True:
+            last_page = page
+            page = self.find_resource_page(first, page_size, access_token)
+            # stop when the last page is reached or the server ignores paging
+            if page == last_page:
+                break
+            resources.extend(page)
+            if len(page) != page_size:
+                break
+            first += page_size
         log.debug("Resources retrieved successfully")
-        return [self.find_resource(x, access_token) for x in response.json()]  # type: ignore
+        resource_ids = [x for x in resources if isinstance(x, str)]
+        if resource_ids:
+            log.debug("Deep listing not supported, retrieving resource details")
+            return self.find_resources_by_id(resource_ids, access_token, concurrency)
+        return resources
+
+    @handle_exceptions
+    def find_resource_page(
+        self,
+        first: int = 0,
+        page_size: int = Defaults.page_size,
+        access_token: str = None,
+        filters: Dict = None,
+    ) -> List:
+        """
+        fetch a page of the resources (full representations, or ids when the `deep`
+        mode is not supported by the server)
+
+        :param first: index of the first resource
+        :param page_size: maximum number of resources
+        :param access_token: access token to be used
+        :param filters: query parameters eg: name, uri, owner, type
+        :returns: list
+        """
+        access_token = access_token or self.access_token  # type: ignore
+        headers = auth_header(access_token)
+        params = {**(filters or {}), "deep": "true", "first": first, "max": page_size}
+        response = self.request(
+            "find_resources",
+            "get",
+            self.config.uma2.resource_endpoint,
+            headers=headers,
+            params=params,
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def iter_resources(
+        self,
+        access_token: str = None,
+        page_size: int = Defaults.page_size,
+        concurrency: int = Defaults.concurrency,
+        name: Optional[str] = None,
+        uri: Optional[str] = None,
+        owner: Optional[str] = None,
+        type: Optional[str] = None,
+    ) -> Iterator[Dict]:
+        """
+        iterate over the resources page by page instead of listing the entire
+        resource set, the next page is fetched in the background while the current
+        one is consumed, the resources can be filtered by the server
+
+        >>> from keycloak import Client
+        >>> kc = Client()
+        >>> for resource in kc.iter_resources(type="urn:python-client:resources:default"):
+        ...     print(resource["name"])
+        Default Resource
+        >>>
+
+        :param access_token: access token to be used
+        :param page_size: number of resources to be retrieved per request
+        :param concurrency: number of threads used to fetch the resource details
+        :param name: name of the resources
+        :param uri: uri of the resources
+        :param owner: owner of the resources
+        :param type: type of the resources
+        :returns: iterator
+        """
+        access_token = access_token or self.access_token  # type: ignore
+        filters = {"name": name, "uri": uri, "owner": owner, "type": type}
+        filters = {k: v for k, v in filters.items() if v is not None}
+        last_page: Optional[List] = None
+        first = 0
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(
+                self.find_resource_page, first, page_size, access_token, filters
+            )
+            while True:
+                page = future.result()
+                # stop when the last page is reached or the server ignores paging
+                if page == last_page:
+                    return
+                more = len(page) == page_size
+                if more:
+                    first += page_size
+                    future = executor.submit(
+                        self.find_resource_page, first, page_size, access_token, filters
+                    )
+                resource_ids = [x for x in page if isinstance(x, str)]
+                if resource_ids:
+                    yield from self.find_resources_by_id(
+                        resource_ids, access_token, concurrency
+                    )
+                else:
+                    yield from page
+                if not more:
+                    return
+                last_page = page
+
+    def find_resources_by_id(
+        self,
+        resource_ids: List,
+        access_token: str = None,
+        concurrency: int = Defaults.concurrency,
+    ) -> List:
+        """
+        fetch the details of the given resources using a pool of threads,
+        if some of them fail `ResourceFetchError` is raised carrying the resources
+        retrieved successfully and the errors keyed by resource id
+
+        >>> from keycloak import Client
+        >>> kc = Client()
+        >>> kc.find_resources_by_id(['bb6a777f-a17b-4555-b035-a6ce12a1fd21'])
+        [{'name': 'Default Resource', 'type': 'urn:python-client:resources:default', 'owner': {'id': 'd74cc555-d46c-4ef8-8a30-ceb2b91d8823'}, 'ownerManagedAccess': False, 'attributes': {}, '_id': 'bb6a777f-a17b-4555-b035-a6ce12a1fd21', 'uris': ['/*'], 'resource_scopes': []}]
+        >>>
+
+        :param resource_ids: ids of the resources
+        :param access_token: access token to be used
+        :param concurrency: number of threads to be used
+        :returns: list
+        """
+        access_token = access_token or self.access_token  # type: ignore
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [
+                executor.submit(self.find_resource, x, access_token)
+                for x in resource_ids
+            ]
+        resources: List = []
+        errors: Dict = {}
+        for resource_id, future in zip(resource_ids, futures):
+            if future.exception():
+                errors[resource_id] = future.exception()
+            else:
+                resources.append(future.result())
+        if errors:
+            raise ResourceFetchError(resources, errors)
+        return resources
 
     @handle_exceptions
     def find_resource(self, resource_id: str, access_token: str = None) -> Dict:
@@ -74,9 +262,9 @@ class ResourceMixin:
         """
         access_token = access_token or self.access_token  # type: ignore
         headers = auth_header(access_token)
-        endpoint = f"{config.uma2.resource_endpoint}/{resource_id}"
+        endpoint = f"{self.config.uma2.resource_endpoint}/{resource_id}"
         log.debug("Retrieving resource from keycloak")
-        response = httpx.get(endpoint, headers=headers)
+        response = self.request("find_resource", "get", endpoint, headers=headers)
         response.raise_for_status()
         log.debug("Resource retrieved successfully")
         return response.json()
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+from cached_property import threaded_cached_property
+
+from .cache import TTLCache
+from .constants import Defaults, EnforcementModes, Logger
+from .matcher import PathMatch, PathMatcher
+from .permissions import Permission
+
+log = logging.getLogger(Logger.name)
+
+
+def rejected(error: Exception) -> bool:
+    """returns true if keycloak rejected the access token (expired or revoked)"""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code == 401
+    return False
+
+
+class PolicyEnforcer:
+    """
+    policy enforcer of the middlewares, resolving the resource and scopes required
+    by a request from the `policy-enforcer` settings and evaluating them with
+    `check_permissions`, the decisions are cached per user (in a cache of the
+    enforcer, the client is left untouched) so that keycloak is only called on a
+    cache miss
+
+    the enforcement mode of the matching path (or the global mode for the paths
+    not configured) decides what happens to the request
+
+    * `ENFORCING`: the request is denied unless every permission is granted, the
+      paths not configured are denied
+    * `PERMISSIVE`: the permissions are evaluated but the denials are only logged,
+      the paths not configured are allowed
+    * `DISABLED`: the request is neither authenticated nor authorized, the global
+      `DISABLED` mode turns the enforcer off
+
+    >>> from keycloak import Client
+    >>> from keycloak.enforcer import PolicyEnforcer
+    >>> enforcer = PolicyEnforcer(Client())
+    >>> enforcer.authorize(access_token, "/albums/42", "DELETE")
+    False
+    >>>
+
+    :param kc: client evaluating the permissions
+    :param settings: `policy-enforcer` settings, defaults to the client settings
+    """
+
+    def __init__(self, kc: Any, settings: Optional[Dict] = None) -> None:
+        self.kc = kc
+        self._settings = settings
+
+    @threaded_cached_property
+    def settings(self) -> Dict:
+        if self._settings is not None:
+            return self._settings
+        return getattr(self.kc.config.client, "policy_enforcer", None) or {}
+
+    @threaded_cached_property
+    def matcher(self) -> PathMatcher:
+        """matcher of the paths, shared with the client for its own settings"""
+        if self._settings is None:
+            return self.kc.path_matcher
+        return PathMatcher.from_settings(self._settings)
+
+    @threaded_cached_property
+    def mode(self) -> str:
+        """enforcement mode of the paths not configured"""
+        mode = self.settings.get("enforcement-mode", EnforcementModes.enforcing)
+        return mode.upper()
+
+    @property
+    def enabled(self) -> bool:
+        """false when the `policy-enforcer` settings are missing or empty"""
+        return bool(self.settings) and self.mode != EnforcementModes.disabled
+
+    @threaded_cached_property
+    def decision_cache(self) -> Optional[TTLCache]:
+        """cache of the decisions, None while the enforcer is disabled"""
+        if self.enabled:
+            return TTLCache(Defaults.cache_size)
+        return None
+
+    def resolve(self, path: str, method: str) -> Tuple[str, Optional[PathMatch]]:
+        """
+        enforcement mode and path configuration of a request
+
+        :param path: path of the request
+        :param method: http method of the request
+        :returns: tuple
+        """
+        match = self.matcher.match(path, method)
+        if match is None:
+            return self.mode, None
+        return match.config.enforcement_mode, match
+
+    def disabled(self, path: str, method: str) -> bool:
+        """returns true if the request is let through without authentication"""
+        if not self.enabled:
+            return False
+        return self.resolve(path, method)[0] == EnforcementModes.disabled
+
+    @staticmethod
+    def permissions(resource: str, scopes: Sequence[str]) -> List[Permission]:
+        """permissions required by a path, the resource as a whole without scopes"""
+        permissions: List[Permission] = [(resource, x) for x in scopes]
+        return permissions or [(resource, None)]
+
+    def decide(
+        self, mode: str, match: Optional[PathMatch], decisions: Dict[Permission, bool]
+    ) -> bool:
+        if all(decisions.values()):
+            return True
+        path = match.config.path if match else None
+        if mode == EnforcementModes.permissive:
+            log.info(f"Permission denied for {path}, allowed by the permissive mode")
+            return True
+        log.debug(f"Permission denied for {path}")
+        return False
+
+    def authorize(self, access_token: str, path: str, method: str) -> Optional[bool]:
+        """
+        method to authorize a request of an authenticated user
+
+        :param access_token: access token of the user
+        :param path: path of the request
+        :param method: http method of the request
+        :returns: bool, None if the access token was rejected
+        """
+        if not self.enabled:
+            return True
+        mode, match = self.resolve(path, method)
+        if mode == EnforcementModes.disabled:
+            return True
+        resource = match.resource if match else None
+        if match is None or resource is None:
+            return self.decide(mode, match, {(path, None): False})
+        try:
+            decisions = self.kc.check_permissions(
+                access_token,
+                self.permissions(resource, match.scopes),
+                decision_cache=self.decision_cache,
+            )
+        except Exception as ex:
+            if rejected(ex):
+                return None
+            raise
+        return self.decide(mode, match, decisions)
+
+
+class AsyncPolicyEnforcer(PolicyEnforcer):
+    """
+    policy enforcer of the asynchronous middlewares
+
+    >>> from keycloak import AsyncClient
+    >>> from keycloak.enforcer import AsyncPolicyEnforcer
+    >>> enforcer = AsyncPolicyEnforcer(AsyncClient())
+    >>> await enforcer.authorize(access_token, "/albums/42", "DELETE")
+    False
+    >>>
+
+    :param kc: asynchronous client evaluating the permissions
+    :param settings: `policy-enforcer` settings, defaults to the client settings
+    """
+
+    async def authorize(  # type: ignore
+        self, access_token: str, path: str, method: str
+    ) -> Optional[bool]:
+        """
+        method to authorize a request of an authenticated user
+
+        :param access_token: access token of the user
+        :param path: path of the request
+        :param method: http method of the request
+        :returns: bool, None if the access token was rejected
+        """
+        if not self.enabled:
+            return True
+        mode, match = self.resolve(path, method)
+        if mode == EnforcementModes.disabled:
+            return True
+        resource = match.resource if match else None
+        if match is None or resource is None:
+            return self.decide(mode, match, {(path, None): False})
+        try:
+            decisions = await self.kc.check_permissions(
+                access_token,
+                self.permissions(resource, match.scopes),
+                decision_cache=self.decision_cache,
+            )
+        except Exception as ex:
+            if rejected(ex):
+                return None
+            raise
+        return self.decide(mode, match, decisions)
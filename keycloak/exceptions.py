@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from typing import Dict, List
+
+
+class ResourceFetchError(Exception):
+    """raised when the details of some of the resources could not be retrieved"""
+
+    def __init__(self, resources: List, errors: Dict) -> None:
+        self.resources = resources
+        self.errors = errors
+        super().__init__(
+            f"Failed to retrieve {len(errors)} resource(s): {', '.join(errors)}"
+        )
+
+
+class CircuitOpenError(Exception):
+    """raised when the calls to a keycloak endpoint are suspended by the circuit breaker"""
+
+    def __init__(self, operation: str, retry_in: float) -> None:
+        self.operation = operation
+        self.retry_in = retry_in
+        super().__init__(
+            f"Circuit open for {operation}, retrying in {retry_in:.1f} seconds"
+        )
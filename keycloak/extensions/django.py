@@ -1,17 +1,19 @@
 # -*- coding: utf-8 -*-
 import json
-from typing import Callable
+from typing import Callable, Dict, Optional
 
 from django.conf import settings
 from django.http import HttpRequest, HttpResponse, HttpResponseRedirect
 
 from keycloak import Client
+from keycloak.enforcer import PolicyEnforcer
 
 
 class AuthenticationMiddleware:
     def __init__(self, get_response: Callable):
         self.get_response = get_response
         self.kc = Client(self.callback_url)
+        self.enforcer = PolicyEnforcer(self.kc, self.policy_enforcer)
 
     @property
     def login_redirect_uri(self) -> str:
@@ -32,6 +34,10 @@ class AuthenticationMiddleware:
     def callback_url(self) -> str:
         return settings.KEYCLOAK_CALLBACK_URL
 
+    @property
+    def policy_enforcer(self) -> Optional[Dict]:
+        return getattr(settings, "KEYCLOAK_POLICY_ENFORCER", None)
+
     def callback(self, request: HttpRequest) -> HttpResponse:
 
         # validate state
@@ -58,6 +64,21 @@ class AuthenticationMiddleware:
         request.session["state"] = state
         return HttpResponseRedirect(url)
 
+    def enforce(self, request: HttpRequest) -> Optional[HttpResponse]:
+        """Policy enforcement, returns the response of a denied request"""
+        if not self.enforcer.enabled:
+            return None
+        tokens = json.loads(request.session.get("tokens", "{}"))
+        access_token = tokens.get("access_token", "")
+        granted = self.enforcer.authorize(access_token, request.path, request.method)
+        if granted is None:
+            request.session.pop("tokens", None)
+            request.session.pop("user", None)
+            return self.login(request)
+        if not granted:
+            return HttpResponse("Forbidden", status=403)
+        return None
+
     def logout(self, request: HttpRequest) -> HttpResponse:
 
         if "tokens" in request.session:
@@ -86,10 +107,14 @@ class AuthenticationMiddleware:
         elif request.path == self.logout_redirect_uri:
             return self.get_response(request)
 
+        # unprotected request
+        elif self.enforcer.disabled(request.path, request.method):
+            return self.get_response(request)
+
         # unauthorized request
         elif "user" not in request.session:
             return self.login(request)
 
         # authorized request
         else:
-            return self.get_response(request)
+            return self.enforce(request) or self.get_response(request)
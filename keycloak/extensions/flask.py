@@ -1,12 +1,13 @@
 # -*- coding: utf-8 -*-
 import json
-from typing import Any, Callable, Dict
+from typing import Any, Callable, Dict, Optional
 
 from flask import Config, Flask, Request, redirect
 from flask.sessions import SessionInterface
 from werkzeug.wrappers import Response
 
 from .. import Client
+from ..enforcer import PolicyEnforcer
 
 
 class ProxyApp:
@@ -38,6 +39,7 @@ class AuthenticationMiddleware:
         login_redirect_uri: str = "/",
         logout_uri: str = "/kc/logout",
         logout_redirect_uri: str = "/",
+        policy_enforcer: Optional[Dict] = None,
     ) -> None:
         self.app = app
         self.config = config
@@ -47,6 +49,7 @@ class AuthenticationMiddleware:
         self.logout_uri = logout_uri
         self.logout_redirect_uri = logout_redirect_uri
         self.kc = Client(callback_url)
+        self.enforcer = PolicyEnforcer(self.kc, policy_enforcer)
         self.proxy_app = ProxyApp(config)
 
     def _response(
@@ -76,6 +79,10 @@ class AuthenticationMiddleware:
         elif request.path == self.logout_redirect_uri:
             return self.app(environ, start_response)
 
+        # unprotected request
+        elif self.enforcer.disabled(request.path, request.method):
+            return self.app(environ, start_response)
+
         # unauthorized request
         elif "user" not in session:
             response = self.login(session)
@@ -83,6 +90,9 @@ class AuthenticationMiddleware:
 
         # authorized request
         else:
+            response = self.enforce(session, request)
+            if response is not None:
+                return self._response(environ, start_response, session, response)
             return self.app(environ, start_response)
 
     def login(self, session: Dict) -> Response:
@@ -91,6 +101,21 @@ class AuthenticationMiddleware:
         session["state"] = state
         return redirect(url)
 
+    def enforce(self, session: Dict, request: Request) -> Optional[Response]:
+        """Policy enforcement, returns the response of a denied request"""
+        if not self.enforcer.enabled:
+            return None
+        tokens = json.loads(session.get("tokens", "{}"))
+        access_token = tokens.get("access_token", "")
+        granted = self.enforcer.authorize(access_token, request.path, request.method)
+        if granted is None:
+            session.pop("tokens", None)
+            session.pop("user", None)
+            return self.login(session)
+        if not granted:
+            return Response("Forbidden", status=403)
+        return None
+
     def callback(self, session: Dict, request: Request) -> Response:
         """Authentication callback handler"""
 
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+from opentelemetry import trace
+from opentelemetry.trace import SpanKind, Status, StatusCode, TracerProvider
+
+from keycloak.instrumentation import Event
+
+
+class OpenTelemetryListener:
+    """
+    instrumentation listener recording the keycloak calls as client spans,
+    the spans are children of the span active when the call was made
+
+    >>> from keycloak import instrumentation
+    >>> from keycloak.extensions.opentelemetry import OpenTelemetryListener
+    >>> instrumentation.add_listener(OpenTelemetryListener())
+
+    :param tracer_provider: provider of the tracer, defaults to the global one
+    """
+
+    def __init__(self, tracer_provider: TracerProvider = None):
+        self.tracer = trace.get_tracer("keycloak", tracer_provider=tracer_provider)
+
+    def __call__(self, event: Event) -> None:
+        if event.method is None:
+            # no request was sent, the lookup is recorded on the active span
+            trace.get_current_span().add_event(
+                "keycloak.cache",
+                {"keycloak.operation": event.operation, "keycloak.cache": event.cache},
+            )
+            return
+
+        start = int(event.started * 1e9)
+        span = self.tracer.start_span(
+            f"keycloak {event.operation}",
+            kind=SpanKind.CLIENT,
+            start_time=start,
+            attributes={
+                "keycloak.operation": event.operation,
+                "http.request.method": event.method,
+                "url.full": event.endpoint,
+                "http.response.body.size": event.bytes,
+                "http.request.resend_count": event.retries,
+            },
+        )
+        if event.cache is not None:
+            span.set_attribute("keycloak.cache", event.cache)
+        if event.status is not None:
+            span.set_attribute("http.response.status_code", event.status)
+        if event.error is not None:
+            span.record_exception(event.error)
+            span.set_status(Status(StatusCode.ERROR, str(event.error)))
+        elif event.status is not None and event.status >= 400:
+            span.set_status(Status(StatusCode.ERROR))
+        span.end(end_time=start + int(event.duration * 1e9))
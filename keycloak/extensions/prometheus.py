@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+from typing import Sequence
+
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Histogram
+
+from keycloak.instrumentation import Event
+
+
+class PrometheusListener:
+    """
+    instrumentation listener exporting the keycloak calls as prometheus metrics
+
+    >>> from keycloak import instrumentation
+    >>> from keycloak.extensions.prometheus import PrometheusListener
+    >>> instrumentation.add_listener(PrometheusListener())
+
+    :param namespace: prefix of the metric names
+    :param registry: registry the metrics are registered with
+    :param buckets: buckets of the request duration histogram (seconds)
+    """
+
+    def __init__(
+        self,
+        namespace: str = "keycloak_client",
+        registry: CollectorRegistry = REGISTRY,
+        buckets: Sequence[float] = Histogram.DEFAULT_BUCKETS,
+    ):
+        self.duration = Histogram(
+            "request_duration_seconds",
+            "Duration of the requests sent to the keycloak server",
+            ["operation", "method", "status"],
+            namespace=namespace,
+            registry=registry,
+            buckets=buckets,
+        )
+        self.bytes = Counter(
+            "response_bytes",
+            "Size of the responses received from the keycloak server",
+            ["operation"],
+            namespace=namespace,
+            registry=registry,
+        )
+        self.retries = Counter(
+            "request_retries",
+            "Requests retried after a failure",
+            ["operation"],
+            namespace=namespace,
+            registry=registry,
+        )
+        self.cache = Counter(
+            "cache_lookups",
+            "Lookups of the client side caches",
+            ["operation", "result"],
+            namespace=namespace,
+            registry=registry,
+        )
+
+    def __call__(self, event: Event) -> None:
+        if event.cache is not None:
+            self.cache.labels(event.operation, event.cache).inc()
+        if event.method is None:
+            return
+        status = "error" if event.status is None else str(event.status)
+        self.duration.labels(event.operation, event.method, status).observe(
+            event.duration
+        )
+        self.bytes.labels(event.operation).inc(event.bytes)
+        if event.retries:
+            self.retries.labels(event.operation).inc(event.retries)
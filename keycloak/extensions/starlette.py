@@ -1,13 +1,14 @@
 # -*- coding: utf-8 -*-
 import json
-from typing import Any
+from typing import Any, Dict, Optional
 
 from starlette.endpoints import HTTPEndpoint
 from starlette.requests import Request
 from starlette.responses import PlainTextResponse, RedirectResponse, Response
-from starlette.types import ASGIApp, Receive, Scope, Send
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from keycloak import AsyncClient
+from keycloak.enforcer import AsyncPolicyEnforcer
 
 
 class EndpointHandler(HTTPEndpoint):
@@ -80,6 +81,7 @@ class AuthenticationMiddleware:
         login_redirect_uri: str = "/",
         logout_uri: str = "/kc/logout",
         logout_redirect_uri: str = "/",
+        policy_enforcer: Optional[Dict] = None,
     ) -> None:
         self.app = app
         self.callback_url = callback_url
@@ -87,6 +89,7 @@ class AuthenticationMiddleware:
         self.logout_uri = logout_uri
         self.logout_redirect_uri = logout_redirect_uri
         self.kc = AsyncClient(callback_url)
+        self.enforcer = AsyncPolicyEnforcer(self.kc, policy_enforcer)
 
     @staticmethod
     def get_url(request: Request) -> str:
@@ -96,8 +99,59 @@ class AuthenticationMiddleware:
     def is_http(scope: Any) -> bool:
         return scope["type"] == "http"
 
+    @staticmethod
+    def is_lifespan(scope: Any) -> bool:
+        return scope["type"] == "lifespan"
+
+    async def login(self, request: Request) -> Response:
+        """redirect to the keycloak login page, see `Login`"""
+        url, state = await self.kc.login()
+        request.session["state"] = state
+        return RedirectResponse(url)
+
+    async def enforce(self, request: Request) -> Optional[Response]:
+        """policy enforcement, returns the response of a denied request"""
+        if not self.enforcer.enabled:
+            return None
+        tokens = json.loads(request.session.get("tokens", "{}"))
+        access_token = tokens.get("access_token", "")
+        granted = await self.enforcer.authorize(
+            access_token, request.url.path, request.method
+        )
+        if granted is None:
+            request.session.pop("tokens", None)
+            request.session.pop("user", None)
+            return await self.login(request)
+        if not granted:
+            return PlainTextResponse("Forbidden", status_code=403)
+        return None
+
+    async def lifespan(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """
+        open the connection pool and load the discovery documents on startup,
+        close the connection pool on shutdown
+        """
+
+        async def _receive() -> Message:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await self.kc.discover()  # opens the connection pool
+            return message
+
+        async def _send(message: Message) -> None:
+            if message["type"] == "lifespan.shutdown.complete":
+                await self.kc.aclose()
+            await send(message)
+
+        await self.app(scope, _receive, _send)
+
     async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
 
+        # handle lifespan events
+        if self.is_lifespan(scope):
+            await self.lifespan(scope, receive, send)
+            return
+
         # handle http requests
         if self.is_http(scope):
             request = Request(scope, receive)
@@ -129,6 +183,11 @@ class AuthenticationMiddleware:
                 await self.app(scope, receive, send)
                 return
 
+            # handle unprotected requests
+            elif self.enforcer.disabled(request.url.path, request.method):
+                await self.app(scope, receive, send)
+                return
+
             # handle unauthorized requests
             elif "user" not in request.session:
                 await Login(
@@ -142,6 +201,10 @@ class AuthenticationMiddleware:
 
             # handle authorized requests
             else:
+                response = await self.enforce(request)
+                if response is not None:
+                    await response(scope, receive, send)
+                    return
                 await self.app(scope, receive, send)
                 return
 
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Optional, Tuple
+
+import httpx
+
+from .constants import Logger
+
+log = logging.getLogger(Logger.name)
+
+
+@dataclass
+class Event:
+    """
+    details of a call sent to the keycloak server, or of a lookup served by a cache
+
+    :param operation: name of the client method eg: pat, introspect, rpt
+    :param method: http method, None for cache lookups
+    :param endpoint: url of the endpoint, None for cache lookups
+    :param status: http status code, None if no response was received
+    :param bytes: size of the response body
+    :param duration: time taken in seconds
+    :param started: unix timestamp of the start of the call
+    :param retries: number of retries before the final response
+    :param cache: `hit`, `miss` or `stale` for the operations backed by a cache
+    :param error: exception raised while sending the request
+    """
+
+    operation: str
+    method: Optional[str] = None
+    endpoint: Optional[str] = None
+    status: Optional[int] = None
+    bytes: int = 0
+    duration: float = 0.0
+    started: float = 0.0
+    retries: int = 0
+    cache: Optional[str] = None
+    error: Optional[BaseException] = None
+    clock: float = field(default=0.0, repr=False, compare=False)
+
+
+Listener = Callable[[Event], None]
+
+# replaced (never mutated) so that emit can iterate without a lock
+_listeners: Tuple[Listener, ...] = ()
+
+
+def add_listener(listener: Listener) -> None:
+    """
+    register a callable to be notified for every keycloak call
+
+    >>> from keycloak import instrumentation
+    >>> instrumentation.add_listener(print)
+
+    :param listener: callable accepting an `Event`
+    """
+    global _listeners
+    if listener not in _listeners:
+        _listeners = _listeners + (listener,)
+
+
+def remove_listener(listener: Listener) -> None:
+    """method to unregister a listener, unknown listeners are ignored"""
+    global _listeners
+    _listeners = tuple(x for x in _listeners if x != listener)
+
+
+def enabled() -> bool:
+    """
+    returns true if any listener is registered, the events are neither timed
+    nor created otherwise
+    """
+    return bool(_listeners)
+
+
+def emit(event: Event) -> None:
+    """
+    method to notify the listeners, the errors raised by a listener are logged
+    and never interrupt the call being measured
+    """
+    for listener in _listeners:
+        try:
+            listener(event)
+        except Exception:
+            log.exception("Instrumentation listener failed:")
+
+
+def start(
+    operation: str, method: str, endpoint: str, cache: Optional[str] = None
+) -> Optional[Event]:
+    """event of a call being sent, None (nothing is measured) without listeners"""
+    if not _listeners:
+        return None
+    return Event(
+        operation,
+        method.upper(),
+        endpoint,
+        started=time.time(),
+        cache=cache,
+        clock=time.perf_counter(),
+    )
+
+
+def finish(
+    event: Optional[Event],
+    response: httpx.Response = None,
+    error: BaseException = None,
+    retries: int = 0,
+) -> None:
+    """method to complete the event returned by `start` and notify the listeners"""
+    if event is None:
+        return
+    event.duration = time.perf_counter() - event.clock
+    event.retries = retries
+    event.error = error
+    if response is not None:
+        event.status = response.status_code
+        event.bytes = len(response.content)
+    emit(event)
+
+
+def record_cache(operation: str, result: str) -> None:
+    """
+    method to notify the listeners about a cache lookup
+
+    :param operation: name of the cached operation eg: decode, introspect, rpt
+    :param result: `hit`, `miss` or `stale` (expired entry used during an outage)
+    """
+    if _listeners:
+        emit(Event(operation, cache=result))
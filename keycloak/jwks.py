@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from jose import jwk
+from jose.exceptions import JWKError
+
+from .constants import Defaults, Logger
+
+log = logging.getLogger(Logger.name)
+
+
+class KeySet:
+    """
+    signing keys of the keycloak server, parsed once and indexed by kid and algorithm
+    so that verifying a token does not re-construct the public keys
+    """
+
+    def __init__(self, jwks: List) -> None:
+        self.jwks = jwks
+        self._index: Dict = {
+            x.get("kid"): x for x in jwks if x.get("use", "sig") == "sig"
+        }
+        self._keys: Dict = {}
+        for kid, data in self._index.items():
+            if "alg" in data:
+                self.get(kid, data["alg"])
+
+    def __contains__(self, kid: Optional[str]) -> bool:
+        return kid in self._index
+
+    def get(self, kid: Optional[str], alg: str) -> Any:
+        """
+        key object for the given kid and algorithm
+
+        :param kid: key id from the token header
+        :param alg: algorithm from the token header
+        :returns: key object or None
+        """
+        key = self._keys.get((kid, alg))
+        if key is not None:
+            return key
+        data = self._index.get(kid)
+        if data is None or data.get("alg", alg) != alg:
+            return None
+        try:
+            key = jwk.construct(data, alg)
+        except JWKError:
+            log.debug(f"Unable to construct key {kid} for {alg}")
+            return None
+        self._keys[(kid, alg)] = key
+        return key
+
+
+class BaseJWKSManager:
+    """
+    keeps the signing keys of the keycloak server up to date,
+    the keys are re-fetched once they expire (ttl or cache-control max-age) or when
+    a token refers to an unknown kid, kid misses trigger at most one refresh per
+    `min_refresh_interval` and concurrent refreshes are coalesced into one request
+
+    expired keys are used for at most `stale_ttl` more seconds while they are
+    re-fetched in the background, so that the tokens are not kept waiting
+    """
+
+    def __init__(
+        self,
+        fetch: Callable,
+        ttl: float = Defaults.jwks_ttl,
+        min_refresh_interval: float = Defaults.jwks_min_refresh_interval,
+        stale_ttl: float = 0.0,
+    ) -> None:
+        self.fetch = fetch
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval
+        self.stale_ttl = stale_ttl
+        self._keyset: Optional[KeySet] = None
+        self._expires_at = 0.0
+        self._attempted_at = float("-inf")
+
+    @property
+    def expired(self) -> bool:
+        return self._keyset is None or time.monotonic() >= self._expires_at
+
+    @property
+    def stale(self) -> bool:
+        """true if the expired keys can be used while they are re-fetched"""
+        return (
+            self._keyset is not None
+            and time.monotonic() < self._expires_at + self.stale_ttl
+        )
+
+    @property
+    def throttled(self) -> bool:
+        return time.monotonic() - self._attempted_at < self.min_refresh_interval
+
+    def invalidate(self) -> None:
+        """force the keys to be re-fetched on the next lookup"""
+        self._expires_at = 0.0
+
+    def seed(self, jwks: List, ttl: float) -> None:
+        """use the keys retrieved elsewhere (eg: a snapshot) for `ttl` seconds"""
+        self._update(jwks, ttl)
+
+    def _coalesced(self, since: float) -> bool:
+        # another caller refreshed the keys while this one was waiting
+        return self._keyset is not None and self._attempted_at >= since
+
+    def _update(self, jwks: List, ttl: Optional[float]) -> KeySet:
+        self._keyset = KeySet(jwks)
+        self._expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        return self._keyset
+
+    def _keep_stale(self) -> KeySet:
+        log.exception("Unable to refresh JWK keys, using the cached keys")
+        self._expires_at = time.monotonic() + self.min_refresh_interval
+        return self._keyset  # type: ignore
+
+
+class JWKSManager(BaseJWKSManager):
+    """synchronous JWKS manager, `fetch` returns the keys and their max-age"""
+
+    def __init__(
+        self,
+        fetch: Callable[[], Tuple[List, Optional[float]]],
+        ttl: float = Defaults.jwks_ttl,
+        min_refresh_interval: float = Defaults.jwks_min_refresh_interval,
+        stale_ttl: float = 0.0,
+    ) -> None:
+        super().__init__(fetch, ttl, min_refresh_interval, stale_ttl)
+        self._lock = threading.Lock()
+        self._revalidation: Optional[threading.Thread] = None
+        self._revalidation_lock = threading.Lock()
+
+    def refresh(self) -> KeySet:
+        """
+        re-fetch the keys, callers waiting for an in-flight refresh reuse its result
+
+        :returns: KeySet
+        """
+        since = time.monotonic()
+        with self._lock:
+            if self._coalesced(since):
+                return self._keyset  # type: ignore
+            try:
+                return self._update(*self.fetch())
+            except Exception:
+                if self._keyset is None:
+                    raise
+                return self._keep_stale()
+            finally:
+                self._attempted_at = time.monotonic()
+
+    def revalidate(self) -> None:
+        """re-fetch the keys in a background thread, the current keys remain in use"""
+        with self._revalidation_lock:
+            if self._revalidation is None or not self._revalidation.is_alive():
+                self._revalidation = threading.Thread(target=self.refresh, daemon=True)
+                self._revalidation.start()
+
+    def get_keyset(self) -> KeySet:
+        """
+        current key set, refreshed when expired (in the background while stale)
+
+        :returns: KeySet
+        """
+        if self.expired:
+            if not self.stale:
+                return self.refresh()
+            self.revalidate()
+        return self._keyset  # type: ignore
+
+    def get_key(self, kid: Optional[str], alg: str) -> Any:
+        """
+        key object for the given kid and algorithm,
+        an unknown kid triggers a rate limited refresh
+
+        :param kid: key id from the token header
+        :param alg: algorithm from the token header
+        :returns: key object or None
+        """
+        keyset = self.get_keyset()
+        key = keyset.get(kid, alg)
+        if key is None and kid not in keyset and not self.throttled:
+            log.debug(f"Unknown kid {kid}, refreshing JWK keys")
+            key = self.refresh().get(kid, alg)
+        return key
+
+
+class AsyncJWKSManager(BaseJWKSManager):
+    """asynchronous JWKS manager, `fetch` is a coroutine function"""
+
+    def __init__(
+        self,
+        fetch: Callable[[], Awaitable[Tuple[List, Optional[float]]]],
+        ttl: float = Defaults.jwks_ttl,
+        min_refresh_interval: float = Defaults.jwks_min_refresh_interval,
+        stale_ttl: float = 0.0,
+    ) -> None:
+        super().__init__(fetch, ttl, min_refresh_interval, stale_ttl)
+        self._lock = asyncio.Lock()
+        self._revalidation: Optional[asyncio.Task] = None
+
+    async def refresh(self) -> KeySet:
+        """
+        re-fetch the keys, coroutines waiting for an in-flight refresh reuse its result
+
+        :returns: KeySet
+        """
+        since = time.monotonic()
+        async with self._lock:
+            if self._coalesced(since):
+                return self._keyset  # type: ignore
+            try:
+                return self._update(*await self.fetch())
+            except Exception:
+                if self._keyset is None:
+                    raise
+                return self._keep_stale()
+            finally:
+                self._attempted_at = time.monotonic()
+
+    def revalidate(self) -> None:
+        """re-fetch the keys in a background task, the current keys remain in use"""
+        if self._revalidation is None or self._revalidation.done():
+            loop = asyncio.get_running_loop()
+            self._revalidation = loop.create_task(self.refresh())
+
+    async def get_keyset(self) -> KeySet:
+        """
+        current key set, refreshed when expired (in the background while stale)
+
+        :returns: KeySet
+        """
+        if self.expired:
+            if not self.stale:
+                return await self.refresh()
+            self.revalidate()
+        return self._keyset  # type: ignore
+
+    async def get_key(self, kid: Optional[str], alg: str) -> Any:
+        """
+        key object for the given kid and algorithm,
+        an unknown kid triggers a rate limited refresh
+
+        :param kid: key id from the token header
+        :param alg: algorithm from the token header
+        :returns: key object or None
+        """
+        keyset = await self.get_keyset()
+        key = keyset.get(kid, alg)
+        if key is None and kid not in keyset and not self.throttled:
+            log.debug(f"Unknown kid {kid}, refreshing JWK keys")
+            key = (await self.refresh()).get(kid, alg)
+        return key
@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .constants import EnforcementModes
+
+# patterns ending at a node: priority, configuration and names of the `{name}`
+# segments, the lowest priority wins
+Entry = Tuple[int, "PathConfig", Tuple[Optional[str], ...]]
+
+# priorities of the paths, the policy enforcer settings override the resource uris
+CONFIGURED = 0
+RESOURCE = 1
+
+
+@dataclass
+class PathConfig:
+    """
+    path (or uri pattern of a resource) protected by the policy enforcer and the
+    permission it requires, `{name}` and `*` match a single segment and a trailing
+    `*` matches the remainder of the path
+
+    :param path: path pattern eg: /albums/{id}, /static/*
+    :param name: name of the resource
+    :param resource_id: id of the resource
+    :param methods: scopes required per http method
+    :param scopes: scopes required by the other methods
+    :param enforcement_mode: `ENFORCING`, `PERMISSIVE` or `DISABLED`
+    """
+
+    path: str
+    name: Optional[str] = None
+    resource_id: Optional[str] = None
+    methods: Dict[str, List[str]] = field(default_factory=dict)
+    scopes: List[str] = field(default_factory=list)
+    enforcement_mode: str = EnforcementModes.enforcing
+
+    @property
+    def resource(self) -> Optional[str]:
+        """id (or name) of the resource to be granted"""
+        return self.resource_id or self.name
+
+    def scopes_for(self, method: str) -> List[str]:
+        return self.methods.get(method.upper(), self.scopes)
+
+    @classmethod
+    def from_settings(cls, data: Dict) -> "PathConfig":
+        """path of the `policy-enforcer` settings of the keycloak.json file"""
+        methods = {
+            x["method"].upper(): list(x.get("scopes", []))
+            for x in data.get("methods", [])
+        }
+        return cls(
+            path=data["path"],
+            name=data.get("name"),
+            resource_id=data.get("id"),
+            methods=methods,
+            scopes=list(data.get("scopes", [])),
+            enforcement_mode=data.get(
+                "enforcement-mode", EnforcementModes.enforcing
+            ).upper(),
+        )
+
+
+@dataclass
+class PathMatch:
+    """
+    path configuration matching a request
+
+    :param config: matching path configuration
+    :param scopes: scopes required by the request method
+    :param params: values of the `{name}` segments
+    """
+
+    config: PathConfig
+    scopes: List[str]
+    params: Dict[str, str]
+
+    @property
+    def resource(self) -> Optional[str]:
+        return self.config.resource
+
+
+class Node:
+    __slots__ = ("literals", "param", "entries", "tail")
+
+    def __init__(self) -> None:
+        self.literals: Dict[str, Node] = {}
+        self.param: Optional[Node] = None
+        # patterns ending at this node, and patterns ending with a wildcard, both
+        # replaced (never mutated) so that they can be read without the lock
+        self.entries: Dict[Tuple, Entry] = {}
+        self.tail: Dict[Tuple, Entry] = {}
+
+
+def segments(path: str) -> List[str]:
+    return [x for x in path.split("?", 1)[0].split("/") if x]
+
+
+def param_name(segment: str) -> Optional[str]:
+    if segment.startswith("{") and segment.endswith("}"):
+        return segment[1:-1]
+    return None
+
+
+class PathMatcher:
+    """
+    index of the protected paths compiled into a trie of path segments, a request
+    path is matched in time proportional to its number of segments, the literal
+    segments take precedence over the `{name}` segments, which take precedence over
+    the trailing wildcards
+
+    the paths of the policy enforcer settings override the uris of the resources,
+    the resources are re-indexed incrementally by `update_resources`
+
+    >>> from keycloak.matcher import PathConfig, PathMatcher
+    >>> matcher = PathMatcher([PathConfig("/albums/{id}", name="Album", methods={"DELETE": ["delete"]})])
+    >>> matcher.match("/albums/42", "DELETE")
+    PathMatch(config=PathConfig(path='/albums/{id}', name='Album', ...), scopes=['delete'], params={'id': '42'})
+    >>>
+
+    :param paths: path configurations
+    """
+
+    def __init__(self, paths: Iterable[PathConfig] = ()) -> None:
+        self.root = Node()
+        self._resources: Dict[str, Tuple[Tuple, List[PathConfig]]] = {}
+        self._lock = threading.Lock()
+        for config in paths:
+            self.add(config)
+
+    @classmethod
+    def from_settings(cls, policy_enforcer: Optional[Dict]) -> "PathMatcher":
+        """matcher of the `paths` of the `policy-enforcer` settings"""
+        paths = (policy_enforcer or {}).get("paths", [])
+        return cls(PathConfig.from_settings(x) for x in paths)
+
+    def add(self, config: PathConfig, priority: int = CONFIGURED) -> None:
+        """method to index a path configuration, replacing the one with the same path"""
+        with self._lock:
+            self._add(config, priority)
+
+    def remove(self, config: PathConfig, priority: int = CONFIGURED) -> None:
+        """method to remove a path configuration, unknown paths are ignored"""
+        with self._lock:
+            self._remove(config, priority)
+
+    def update_resources(self, resources: Iterable[Dict]) -> None:
+        """
+        method to index the uris of the resources (as returned by `find_resources`),
+        only the resources added, changed or removed since the last call are updated
+
+        :param resources: resource representations
+        """
+        with self._lock:
+            current: Dict[str, Tuple] = {}
+            for resource in resources:
+                uris = tuple(resource.get("uris") or ())
+                current[resource["_id"]] = (resource.get("name"), uris)
+            for resource_id in list(self._resources):
+                if current.get(resource_id) != self._resources[resource_id][0]:
+                    for config in self._resources.pop(resource_id)[1]:
+                        self._remove(config, RESOURCE)
+            for resource_id, (name, uris) in current.items():
+                if resource_id in self._resources:
+                    continue
+                configs = [PathConfig(x, name, resource_id) for x in uris]
+                for config in configs:
+                    self._add(config, RESOURCE)
+                self._resources[resource_id] = ((name, uris), configs)
+
+    def match(self, path: str, method: str = "GET") -> Optional[PathMatch]:
+        """
+        path configuration matching the request
+
+        :param path: path of the request, the query string is ignored
+        :param method: http method of the request
+        :returns: PathMatch or None
+        """
+        values: List[str] = []
+        entry = self._match(self.root, segments(path), 0, values)
+        if entry is None:
+            return None
+        _, config, names = entry
+        params = {name: x for name, x in zip(names, values) if name}
+        return PathMatch(config, config.scopes_for(method), params)
+
+    def _match(
+        self, node: Node, parts: List[str], index: int, values: List[str]
+    ) -> Optional[Entry]:
+        if index == len(parts):
+            entries = node.entries or node.tail
+            return min(entries.values(), key=lambda x: x[0]) if entries else None
+        child = node.literals.get(parts[index])
+        if child is not None:
+            entry = self._match(child, parts, index + 1, values)
+            if entry is not None:
+                return entry
+        if node.param is not None:
+            values.append(parts[index])
+            entry = self._match(node.param, parts, index + 1, values)
+            if entry is not None:
+                return entry
+            values.pop()
+        tail = node.tail
+        if tail:
+            return min(tail.values(), key=lambda x: x[0])
+        return None
+
+    def _walk(self, config: PathConfig, create: bool) -> Tuple[Optional[Node], bool]:
+        """node of the pattern and whether it ends with a wildcard"""
+        parts = segments(config.path)
+        tail = bool(parts) and parts[-1] == "*"
+        node: Optional[Node] = self.root
+        for part in parts[:-1] if tail else parts:
+            if node is None:
+                break
+            if part == "*" or param_name(part) is not None:
+                if node.param is None and create:
+                    node.param = Node()
+                node = node.param
+            elif create:
+                node = node.literals.setdefault(part, Node())
+            else:
+                node = node.literals.get(part)
+        return node, tail
+
+    def _add(self, config: PathConfig, priority: int) -> None:
+        node, tail = self._walk(config, create=True)
+        parts = segments(config.path)
+        names = tuple(
+            param_name(x)
+            for x in (parts[:-1] if tail else parts)
+            if x == "*" or param_name(x) is not None
+        )
+        key = entry_key(config, priority)
+        entry: Entry = (priority, config, names)
+        # copy on write, `match` reads the entries without the lock
+        if tail:
+            node.tail = {**node.tail, key: entry}  # type: ignore
+        else:
+            node.entries = {**node.entries, key: entry}  # type: ignore
+
+    def _remove(self, config: PathConfig, priority: int) -> None:
+        node, tail = self._walk(config, create=False)
+        if node is None:
+            return
+        key = entry_key(config, priority)
+        if tail:
+            node.tail = {k: v for k, v in node.tail.items() if k != key}
+        else:
+            node.entries = {k: v for k, v in node.entries.items() if k != key}
+
+
+def entry_key(config: PathConfig, priority: int) -> Tuple:
+    """a configured path replaces the previous configuration of the same path"""
+    resource_id = config.resource_id if priority == RESOURCE else None
+    return priority, resource_id, config.path
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+# resource (id or name) and scope, None for the resource itself
+Permission = Tuple[str, Optional[str]]
+
+
+def permission_param(permission: Permission) -> str:
+    """
+    value of the `permission` parameter of the uma grant eg: `resource#scope`
+
+    :param permission: resource (id or name) and scope
+    :returns: string
+    """
+    resource, scope = permission
+    return resource if scope is None else f"{resource}#{scope}"
+
+
+class PermissionSet:
+    """
+    permissions granted by keycloak (the `permissions` response mode of the uma grant
+    or the `authorization.permissions` claim of an RPT) indexed by resource id and
+    name, so that a permission is checked with a single set lookup
+
+    >>> from keycloak.permissions import PermissionSet
+    >>> granted = PermissionSet([{"rsid": "1a2b", "rsname": "Album", "scopes": ["view"]}])
+    >>> granted.allows("Album", "view")
+    True
+    >>> granted.allows("1a2b", "delete")
+    False
+    >>>
+
+    :param permissions: permissions with `rsid`, `rsname` and `scopes`
+    """
+
+    def __init__(self, permissions: Iterable[Dict]) -> None:
+        self.resources: Set[str] = set()
+        self.permissions: Set[Tuple[str, str]] = set()
+        for permission in permissions:
+            scopes = permission.get("scopes") or ()
+            for name in (permission.get("rsid"), permission.get("rsname")):
+                if name:
+                    self.resources.add(name)
+                    self.permissions.update((name, x) for x in scopes)
+
+    def __contains__(self, permission: Permission) -> bool:
+        return self.allows(*permission)
+
+    def allows(self, resource: str, scope: Optional[str] = None) -> bool:
+        """
+        whether the resource (or one of its scopes) is granted
+
+        :param resource: id or name of the resource
+        :param scope: name of the scope, None for the resource itself
+        :returns: boolean
+        """
+        if scope is None:
+            return resource in self.resources
+        return (resource, scope) in self.permissions
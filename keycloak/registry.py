@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Generic, List, Optional, Tuple, TypeVar, Union
+
+import httpx
+
+from .config import Client as ClientConfig
+from .config import Config, config
+from .constants import Defaults, Logger
+from .core.transport import TransportMixin
+
+log = logging.getLogger(Logger.name)
+
+# auth server url, realm and client id
+Key = Tuple[str, str, str]
+T = TypeVar("T")
+
+
+class BaseRegistry(Generic[T]):
+    """
+    registry of the clients of several keycloak realms (or several clients of the
+    same realm), keyed by auth server url, realm and client id
+
+    the clients share a single connection pool but each of them has its own
+    configuration, discovery documents, keys and caches, a client is only created
+    (and its realm discovered) on first use and the least recently used clients
+    are evicted once more than `maxsize` are kept in memory
+
+    :param maxsize: number of clients kept in memory
+    :param timeout: timeout (in seconds) applied to the requests sent to keycloak
+    :param limits: limits of the shared connection pool
+    :param http2: enable http/2 (requires ``httpx[http2]``)
+    :param transport: custom httpx transport eg: a mock server for tests
+    :param options: keyword arguments passed to every client eg: token_cache_size
+    """
+
+    def __init__(
+        self,
+        maxsize: int = Defaults.registry_size,
+        timeout: Union[float, httpx.Timeout] = Defaults.timeout,
+        limits: httpx.Limits = TransportMixin.limits,
+        http2: bool = False,
+        transport: Optional[httpx.BaseTransport] = None,
+        **options: Any,
+    ) -> None:
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.limits = limits
+        self.http2 = http2
+        self.transport = transport
+        self.options = options
+        self._settings: Dict[Key, Dict] = {}
+        self._clients: "OrderedDict[Key, T]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(auth_server_url: str, realm: str, client_id: str) -> Key:
+        return auth_server_url.rstrip("/"), realm, client_id
+
+    @property
+    def clients(self) -> List[Key]:
+        """keys of the clients currently kept in memory, least recently used first"""
+        return list(self._clients)
+
+    def __contains__(self, key: Key) -> bool:
+        return self.key(*key) in self._settings
+
+    def register(
+        self,
+        auth_server_url: str,
+        realm: str,
+        client_id: str,
+        client_secret: Optional[str] = None,
+        **options: Any,
+    ) -> None:
+        """
+        method to add a client to the registry, nothing is fetched until the
+        client is used, registering an existing key replaces its client
+
+        >>> from keycloak import Registry
+        >>> registry = Registry()
+        >>> registry.register("http://localhost:8080/auth", "acme", "api", "secret")
+        >>> registry.register("http://localhost:8080/auth", "demo", "web", auto_refresh=True)
+
+        :param auth_server_url: url of the keycloak server
+        :param realm: name of the realm
+        :param client_id: id of the client
+        :param client_secret: secret of the client, None for public clients
+        :param options: keyword arguments overriding the options of the registry
+        """
+        key = self.key(auth_server_url, realm, client_id)
+        with self._lock:
+            self._settings[key] = dict(options, client_secret=client_secret)
+            client = self._clients.pop(key, None)
+        if client is not None:
+            self.evict(client)
+
+    def unregister(self, auth_server_url: str, realm: str, client_id: str) -> None:
+        """method to remove a client from the registry, unknown keys are ignored"""
+        key = self.key(auth_server_url, realm, client_id)
+        with self._lock:
+            self._settings.pop(key, None)
+            client = self._clients.pop(key, None)
+        if client is not None:
+            self.evict(client)
+
+    def get(self, auth_server_url: str, realm: str, client_id: str) -> T:
+        """
+        client registered for the given realm and client id, created on first use
+
+        >>> from keycloak import Registry
+        >>> registry = Registry()
+        >>> registry.register("http://localhost:8080/auth", "acme", "api", "secret")
+        >>> kc = registry.get("http://localhost:8080/auth", "acme", "api")
+        >>> kc.introspect(token)
+
+        :param auth_server_url: url of the keycloak server
+        :param realm: name of the realm
+        :param client_id: id of the client
+        :returns: client
+        :raises KeyError: if the client is not registered
+        """
+        key = self.key(auth_server_url, realm, client_id)
+        evicted = None
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._clients.move_to_end(key)
+                return client
+            if key not in self._settings:
+                raise KeyError(f"Client not registered: {'/'.join(key)}")
+            log.debug(f"Creating client {'/'.join(key)}")
+            client = self.create(self.configure(key), self._settings[key])
+            self._clients[key] = client
+            if len(self._clients) > self.maxsize:
+                _, evicted = self._clients.popitem(last=False)
+        if evicted is not None:
+            log.debug("Evicting the least recently used client")
+            self.evict(evicted)
+        return client
+
+    def configure(self, key: Key) -> Config:
+        """
+        configuration of a client, the discovery documents are stored in the shared
+        snapshot file (if enabled) under a namespace of their own
+        """
+        auth_server_url, realm, client_id = key
+        settings = self._settings[key]
+        client = ClientConfig(
+            realm=realm,
+            auth_server_url=auth_server_url,
+            resource=client_id,
+            credentials={"secret": settings["client_secret"]},
+        )
+        return Config(client, config.snapshot, namespace=f"{'/'.join(key)}:")
+
+    def create(self, config: Config, settings: Dict) -> T:  # pragma: no cover
+        raise NotImplementedError
+
+    def evict(self, client: T) -> None:  # pragma: no cover
+        raise NotImplementedError
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+import logging
+import random
+import threading
+from typing import Collection, Optional
+
+import httpx
+
+from .breaker import failed
+from .constants import Defaults, Logger
+from .utils import retry_after
+
+log = logging.getLogger(Logger.name)
+
+
+class RetryBudget:
+    """
+    token bucket limiting the retries sent to the keycloak server, every retry
+    withdraws a token and every successful call deposits `ratio` tokens, the
+    retries are suspended once the bucket is empty so that an outage does not
+    turn into a retry storm
+
+    :param tokens: capacity of the bucket
+    :param ratio: tokens deposited by a successful call
+    """
+
+    def __init__(
+        self,
+        tokens: float = Defaults.retry_budget,
+        ratio: float = Defaults.retry_budget_ratio,
+    ):
+        self.capacity = tokens
+        self.tokens = tokens
+        self.ratio = ratio
+        self._lock = threading.Lock()
+
+    def success(self) -> None:
+        with self._lock:
+            self.tokens = min(self.tokens + self.ratio, self.capacity)
+
+    def failure(self) -> bool:
+        """withdraw a token for a retry, returns false if the bucket is empty"""
+        with self._lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class RetryPolicy:
+    """
+    policy deciding whether (and when) a failed call to the keycloak server is retried
+
+    GET requests and the operations listed in `operations` are retried on connection
+    errors, timeouts and the `statuses` sent by overloaded servers, the other
+    operations (eg: the authorization code exchange) are only retried when the
+    connection could not be established, since the request never reached the server
+
+    the delays grow exponentially with full jitter, the delay requested by the
+    `Retry-After` header is honoured up to `retry_after_limit` seconds
+
+    >>> from keycloak import Client
+    >>> from keycloak.retry import RetryPolicy
+    >>> kc = Client(retry_policy=RetryPolicy(retries=5, backoff=0.2))
+    >>> kc = Client(retry_policy=RetryPolicy(retries=0))  # disable retries
+
+    :param retries: maximum number of retries per call
+    :param backoff: delay (in seconds) before the first retry
+    :param max_backoff: maximum delay (in seconds) between two attempts
+    :param retry_after_limit: calls asking to wait longer are not retried
+    :param statuses: status codes to be retried
+    :param operations: non GET operations safe to be retried
+    :param budget: retry budget shared by the calls of the client
+    """
+
+    def __init__(
+        self,
+        retries: int = Defaults.retries,
+        backoff: float = Defaults.retry_backoff,
+        max_backoff: float = Defaults.retry_max_backoff,
+        retry_after_limit: float = Defaults.retry_after_limit,
+        statuses: Collection[int] = (429, 502, 503, 504),
+        operations: Collection[str] = (
+            "pat",
+            "rpt",
+            "check_permissions",
+            "introspect",
+            "refresh_tokens",
+        ),
+        budget: RetryBudget = None,
+    ):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_after_limit = retry_after_limit
+        self.statuses = frozenset(statuses)
+        self.operations = frozenset(operations)
+        self.budget = budget or RetryBudget()
+
+    def idempotent(self, operation: str, method: str) -> bool:
+        return method == "get" or operation in self.operations
+
+    def retryable(
+        self,
+        operation: str,
+        method: str,
+        response: httpx.Response = None,
+        error: Exception = None,
+    ) -> bool:
+        if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout)):
+            return True
+        if not self.idempotent(operation, method):
+            return False
+        if error is not None:
+            return isinstance(error, httpx.TransportError)
+        return response is not None and response.status_code in self.statuses
+
+    def delay(
+        self,
+        operation: str,
+        method: str,
+        retries: int,
+        response: httpx.Response = None,
+        error: Exception = None,
+    ) -> Optional[float]:
+        """
+        delay (in seconds) before the next attempt, None if the call must not be retried
+
+        :param operation: name of the operation eg: pat, rpt, introspect
+        :param method: http method in lowercase eg: get, post
+        :param retries: number of retries already sent
+        :param response: response received from the server
+        :param error: exception raised while sending the request
+        :returns: float or None
+        """
+        if not self.retryable(operation, method, response, error):
+            # the 5xx (and 429) sent by a failing server don't refill the budget
+            if response is not None and not failed(response.status_code):
+                self.budget.success()
+            return None
+        if retries >= self.retries:
+            return None
+        delay = random.uniform(0, min(self.backoff * 2**retries, self.max_backoff))
+        requested = retry_after(response.headers) if response is not None else None
+        if requested is not None:
+            if requested > self.retry_after_limit:
+                return None
+            delay = max(delay, requested)
+        # the token is only withdrawn when the retry is actually sent
+        if not self.budget.failure():
+            log.warning(f"Retry budget exhausted, not retrying {operation}")
+            return None
+        return delay
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from .constants import Defaults, FileMode, Logger
+
+log = logging.getLogger(Logger.name)
+
+
+class Snapshot:
+    """
+    json file keeping a copy of the discovery documents and signing keys,
+    so that new processes can start serving without contacting the keycloak server
+
+    every document is stored along with the time it was retrieved and is considered
+    valid for `ttl` seconds, the file is replaced atomically on every update
+    """
+
+    def __init__(self, path: str, ttl: float = Defaults.snapshot_ttl) -> None:
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+    def read(self) -> Dict:
+        """
+        contents of the snapshot file, an empty dictionary if missing or corrupt
+
+        :returns: dictionary
+        """
+        try:
+            with open(self.path, FileMode.read_only) as stream:
+                data = json.loads(stream.read())
+        except (OSError, ValueError):
+            log.debug(f"Snapshot {self.path} not available")
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def get(self, name: str, stale: bool = False) -> Optional[Tuple[Any, float]]:
+        """
+        document stored in the snapshot, if still valid
+
+        :param name: name of the document eg: openid, uma2, jwks
+        :param stale: return the document even if expired
+        :returns: document and the number of seconds it remains valid or None
+        """
+        entry = self.read().get(name)
+        if not isinstance(entry, dict) or "data" not in entry:
+            return None
+        expires_in = float(entry.get("saved_at", 0)) + self.ttl - time.time()
+        if expires_in <= 0 and not stale:
+            log.debug(f"Snapshot of {name} expired")
+            return None
+        return entry["data"], expires_in
+
+    def put(self, name: str, data: Any) -> None:
+        """
+        store the document, the file is written to a temporary file in the same
+        directory and moved in place so that readers never see a partial write
+
+        :param name: name of the document eg: openid, uma2, jwks
+        :param data: json serializable document
+        """
+        with self._lock:
+            documents = self.read()
+            documents[name] = {"saved_at": time.time(), "data": data}
+            directory = os.path.dirname(os.path.abspath(self.path))
+            try:
+                fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+                try:
+                    with os.fdopen(fd, FileMode.write_only) as stream:
+                        stream.write(json.dumps(documents))
+                        stream.flush()
+                        os.fsync(stream.fileno())
+                    os.replace(tmp, self.path)
+                except BaseException:
+                    os.unlink(tmp)
+                    raise
+            except OSError:
+                log.exception(f"Unable to write snapshot {self.path}")
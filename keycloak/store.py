@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+import time
+from typing import Dict, Optional
+
+from .cache import TTLCache
+from .constants import Defaults
+
+
+class TokenStore:
+    """
+    interface of the stores holding the tokens of the users of an application,
+    keyed by session id or subject
+
+    the records are json serialisable dictionaries, so that they can be kept in an
+    external store (eg: redis, memcached) shared by several processes, the
+    implementations must be thread safe and are expected to be fast enough to be
+    called from the event loop by `AsyncClient`
+
+    >>> from keycloak import Client
+    >>> from keycloak.store import TokenStore
+    >>> class RedisTokenStore(TokenStore):
+    >>>     def get(self, key):
+    >>>         data = redis.get(key)
+    >>>         return json.loads(data) if data else None
+    >>>     def set(self, key, record, expires_at):
+    >>>         # expires_at is infinite for the refresh tokens without expiry
+    >>>         exat = int(expires_at) if math.isfinite(expires_at) else None
+    >>>         redis.set(key, json.dumps(record), exat=exat)
+    >>>     def delete(self, key):
+    >>>         redis.delete(key)
+    >>>
+    >>> kc = Client(token_store=RedisTokenStore())
+    """
+
+    def get(self, key: str) -> Optional[Dict]:  # pragma: no cover
+        """record associated with the key, None if missing"""
+        raise NotImplementedError
+
+    def set(
+        self, key: str, record: Dict, expires_at: float
+    ) -> None:  # pragma: no cover
+        """
+        store the record until `expires_at` (unix timestamp, may be infinite)
+
+        :param key: session id or subject
+        :param record: record returned by `token_record`
+        :param expires_at: unix timestamp after which the record is useless
+        """
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:  # pragma: no cover
+        """remove the record associated with the key, unknown keys are ignored"""
+        raise NotImplementedError
+
+
+class MemoryTokenStore(TokenStore):
+    """
+    in-memory store bounded to `maxsize` users, the least recently used records are
+    evicted when the store is full and the records are dropped once their refresh
+    token has expired
+    """
+
+    def __init__(self, maxsize: int = Defaults.token_store_size) -> None:
+        self.cache = TTLCache(maxsize)
+
+    def __len__(self) -> int:
+        return len(self.cache)
+
+    def get(self, key: str) -> Optional[Dict]:
+        return self.cache.get(key)
+
+    def set(self, key: str, record: Dict, expires_at: float) -> None:
+        self.cache.set(key, record, expires_at)
+
+    def delete(self, key: str) -> None:
+        self.cache.delete(key)
+
+
+def token_record(tokens: Dict) -> Dict:
+    """
+    record of the tokens returned by keycloak, the lifetimes (in seconds) are
+    converted to unix timestamps, None if unknown
+    """
+    now = time.time()
+    expires_in = float(tokens.get("expires_in") or 0)
+    refresh_expires_in = float(tokens.get("refresh_expires_in") or 0)
+    return {
+        "tokens": tokens,
+        "expires_at": now + expires_in if expires_in else None,
+        "refresh_expires_at": now + refresh_expires_in if refresh_expires_in else None,
+    }
+
+
+def record_expiry(record: Dict) -> float:
+    """
+    deadline (unix timestamp) until which the record can be used, the access token
+    can be renewed as long as the refresh token is valid
+    """
+    if record["tokens"].get("refresh_token"):
+        deadline = record["refresh_expires_at"]
+    else:
+        deadline = record["expires_at"]
+    return float("inf") if deadline is None else deadline
+
+
+def record_expired(record: Dict, skew: float = 0.0) -> bool:
+    """whether the access token of the record expires within `skew` seconds"""
+    expires_at = record["expires_at"]
+    return expires_at is not None and expires_at - skew <= time.time()
@@ -0,0 +1,588 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import base64
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, urlencode, urlparse
+from uuid import uuid4
+
+import httpx
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+from jose.exceptions import JWTError
+
+from .config import Client as ClientConfig
+from .config import config
+from .constants import GrantTypes, Headers, TokenType, UmaResponseModes
+
+Handler = Callable[[httpx.Request], httpx.Response]
+
+
+class FakeKeycloak:
+    """
+    in-process keycloak server for integration and load tests, it serves the
+    discovery documents, token grants (password, client_credentials, refresh_token,
+    authorization_code, uma-ticket), JWKS with real RS256 signing keys, userinfo,
+    introspection, logout and the resource set endpoints
+
+    it can be plugged into the clients as an httpx transport (`transport` for
+    `Client`, `async_transport` for `AsyncClient`) or served as an ASGI app
+
+    >>> from keycloak import Client
+    >>> from keycloak.testing import FakeKeycloak
+    >>> fake = FakeKeycloak(users={"myuser": "*****"}, latency=0.01)
+    >>> fake.configure()
+    >>> kc = Client(username="myuser", password="*****", transport=fake.transport)
+    >>> kc.decode(kc.access_token)["sub"]
+    'myuser'
+    >>> fake.fail("token", status=503, times=2)  # next two token requests fail
+    >>>
+    >>> # uvicorn --factory "keycloak.testing:FakeKeycloak" --port 8080
+    >>>
+
+    :param base_url: url of the server, used in the issuer and the endpoints
+    :param realm: name of the realm
+    :param client_id: client id expected from the clients
+    :param client_secret: client secret expected from the clients
+    :param users: usernames and passwords accepted by the password grant
+    :param resources: resources served by the resource set endpoint
+    :param latency: seconds added to every response
+    :param error_rate: fraction of the requests answered with `error_status`
+    :param error_status: status code of the injected errors
+    :param seed: seed of the random generator used for the error injection
+    """
+
+    kid = "fake-keycloak"
+    algorithm = "RS256"
+    access_token_lifespan = 300
+    refresh_token_lifespan = 1800
+    # signing is expensive, identical tokens are re-issued for this many seconds
+    reissue_after = 60.0
+
+    def __init__(
+        self,
+        base_url: str = "http://localhost:8080/auth",
+        realm: str = "master",
+        client_id: str = "keycloak-client",
+        client_secret: str = "keycloak-secret",
+        users: Optional[Dict[str, str]] = None,
+        resources: Optional[List[Dict]] = None,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.realm = realm
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.users = {"user": "password"} if users is None else users
+        self.resources = self.default_resources() if resources is None else resources
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+        self.issuer = f"{self.base_url}/realms/{realm}"
+        self.prefix = urlparse(self.issuer).path
+        self.codes: Dict[str, str] = {}
+        self.failures: Dict[str, Deque[int]] = defaultdict(deque)
+        self.requests: Dict[str, int] = defaultdict(int)
+        self._issued: Dict[Tuple, Tuple[float, Dict]] = {}
+        self._lock = threading.Lock()
+
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        # parsing the keys is slow, the constructed keys are reused
+        self.signing_key = jwk.construct(
+            key.private_bytes(
+                serialization.Encoding.PEM,
+                serialization.PrivateFormat.PKCS8,
+                serialization.NoEncryption(),
+            ),
+            self.algorithm,
+        )
+        self.verification_key = jwk.construct(
+            key.public_key().public_bytes(
+                serialization.Encoding.PEM,
+                serialization.PublicFormat.SubjectPublicKeyInfo,
+            ),
+            self.algorithm,
+        )
+        self.jwks = [{**self.verification_key.to_dict(), "kid": self.kid, "use": "sig"}]
+
+        self.routes: Dict[Tuple[str, str], Tuple[str, Handler]] = {
+            ("GET", "/.well-known/openid-configuration"): (
+                "openid-configuration",
+                self.openid_configuration,
+            ),
+            ("GET", "/.well-known/uma2-configuration"): (
+                "uma2-configuration",
+                self.uma2_configuration,
+            ),
+            ("GET", "/protocol/openid-connect/auth"): ("auth", self.auth),
+            ("POST", "/protocol/openid-connect/token"): ("token", self.token_endpoint),
+            ("GET", "/protocol/openid-connect/userinfo"): ("userinfo", self.userinfo),
+            ("POST", "/protocol/openid-connect/logout"): ("logout", self.logout),
+            ("GET", "/protocol/openid-connect/certs"): ("certs", self.certs),
+            ("POST", "/protocol/openid-connect/token/introspect"): (
+                "introspect",
+                self.introspect,
+            ),
+            ("GET", "/authz/protection/resource_set"): (
+                "resource_set",
+                self.resource_set,
+            ),
+            ("POST", "/authz/protection/permission"): ("permission", self.permission),
+        }
+        self.transport = httpx.MockTransport(self.handle)
+        self.async_transport = httpx.MockTransport(self.ahandle)
+
+    @staticmethod
+    def default_resources() -> List[Dict]:
+        return [
+            {
+                "name": "Default Resource",
+                "type": "urn:keycloak-client:resources:default",
+                "owner": {"id": str(uuid4())},
+                "ownerManagedAccess": False,
+                "attributes": {},
+                "_id": str(uuid4()),
+                "uris": ["/*"],
+                "resource_scopes": [],
+            }
+        ]
+
+    @property
+    def settings(self) -> Dict:
+        """contents of the keycloak.json file matching this server"""
+        return {
+            "realm": self.realm,
+            "auth-server-url": self.base_url,
+            "ssl-required": "external",
+            "resource": self.client_id,
+            "verify-token-audience": True,
+            "credentials": {"secret": self.client_secret},
+            "confidential-port": 0,
+            "policy-enforcer": {},
+        }
+
+    def configure(self) -> None:
+        """
+        point the shared configuration (`keycloak.config.config`) to this server,
+        the clients still need `transport` or `async_transport` to reach it
+        """
+        vars(config)["client"] = ClientConfig(**self.settings)
+        for name in ("openid", "uma2", "snapshot"):
+            vars(config).pop(name, None)
+        config.close()
+        config.transport = self.transport
+
+    def endpoint(self, path: str) -> str:
+        return f"{self.issuer}{path}"
+
+    def fail(self, endpoint: str, status: int = 503, times: int = 1) -> None:
+        """
+        answer the next requests sent to the endpoint with an error
+
+        :param endpoint: name of the endpoint eg: token, certs, introspect
+        :param status: status code of the error
+        :param times: number of requests to fail
+        """
+        with self._lock:
+            self.failures[endpoint].extend([status] * times)
+
+    # tokens
+
+    def sign(self, claims: Dict) -> str:
+        return jwt.encode(
+            claims, self.signing_key, self.algorithm, headers={"kid": self.kid}
+        )
+
+    def token(self, subject: str, expires_in: int, **claims: Any) -> str:
+        """signed token issued by this server"""
+        now = int(time.time())
+        payload = {
+            "jti": str(uuid4()),
+            "iss": self.issuer,
+            "aud": self.client_id,
+            "sub": subject,
+            "typ": "Bearer",
+            "azp": self.client_id,
+            "iat": now,
+            "exp": now + expires_in,
+            "preferred_username": subject,
+            **claims,
+        }
+        return self.sign(payload)
+
+    def tokens(self, subject: str, permissions: Optional[List] = None) -> Dict:
+        """token response for the subject, an RPT if permissions are given"""
+        key = (subject, None if permissions is None else repr(permissions))
+        with self._lock:
+            issued_at, tokens = self._issued.get(key, (0.0, {}))
+            if time.time() - issued_at <= self.reissue_after:
+                return tokens
+        claims = {}
+        if permissions is not None:
+            claims["authorization"] = {"permissions": permissions}
+        tokens = {
+            "access_token": self.token(
+                subject, self.access_token_lifespan, scope="openid", **claims
+            ),
+            "expires_in": self.access_token_lifespan,
+            "refresh_token": self.token(
+                subject, self.refresh_token_lifespan, typ="Refresh"
+            ),
+            "refresh_expires_in": self.refresh_token_lifespan,
+            "token_type": TokenType.bearer,
+            "not-before-policy": 0,
+            "session_state": str(uuid4()),
+            "scope": "openid email profile",
+        }
+        with self._lock:
+            self._issued[key] = (time.time(), tokens)
+        return tokens
+
+    def verify(self, token: str) -> Optional[Dict]:
+        """claims of a valid token issued by this server"""
+        try:
+            return jwt.decode(
+                token,
+                self.verification_key,
+                algorithms=[self.algorithm],
+                issuer=self.issuer,
+                options={"verify_aud": False},
+            )
+        except JWTError:
+            return None
+
+    def authorize(self, username: Optional[str] = None) -> str:
+        """single use authorization code for the user"""
+        code = str(uuid4())
+        with self._lock:
+            self.codes[code] = username or next(iter(self.users), "user")
+        return code
+
+    # request handling
+
+    def dispatch(self, request: httpx.Request) -> Tuple[str, Optional[Handler]]:
+        path = request.url.path
+        if not path.startswith(self.prefix):
+            return "", None
+        path = path[len(self.prefix) :]
+        route = self.routes.get((request.method, path))
+        if route is not None:
+            return route
+        if request.method == "GET" and path.startswith(
+            "/authz/protection/resource_set/"
+        ):
+            return "resource_set", self.resource
+        return "", None
+
+    def injected_error(self, endpoint: str) -> Optional[httpx.Response]:
+        with self._lock:
+            self.requests[endpoint] += 1
+            failures = self.failures.get(endpoint)
+            if failures:
+                return error(failures.popleft(), "injected_error")
+        if self.error_rate and self.random.random() < self.error_rate:
+            return error(self.error_status, "injected_error")
+        return None
+
+    def respond(self, request: httpx.Request) -> httpx.Response:
+        endpoint, handler = self.dispatch(request)
+        if handler is None:
+            return error(404, "not_found")
+        return self.injected_error(endpoint) or handler(request)
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        """handler of the synchronous transport"""
+        if self.latency:
+            time.sleep(self.latency)
+        return self.respond(request)
+
+    async def ahandle(self, request: httpx.Request) -> httpx.Response:
+        """handler of the asynchronous transport"""
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self.respond(request)
+
+    async def __call__(self, scope: Dict, receive: Callable, send: Callable) -> None:
+        """ASGI interface, to serve the fake server over the network"""
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        host, port = scope.get("server") or ("localhost", 80)
+        request = httpx.Request(
+            scope["method"],
+            httpx.URL(
+                scheme=scope.get("scheme", "http"),
+                host=host,
+                port=port,
+                path=scope["path"],
+                query=scope.get("query_string", b""),
+            ),
+            headers=[
+                (k.decode("latin-1"), v.decode("latin-1")) for k, v in scope["headers"]
+            ],
+            content=body,
+        )
+        response = await self.ahandle(request)
+        await send(
+            {
+                "type": "http.response.start",
+                "status": response.status_code,
+                "headers": response.headers.raw,
+            }
+        )
+        await send({"type": "http.response.body", "body": response.content})
+
+    # authentication of the requests
+
+    def client_authenticated(self, request: httpx.Request, form: Dict) -> bool:
+        authorization = request.headers.get(Headers.authorization, "")
+        if authorization.startswith(TokenType.basic):
+            credentials = base64.b64decode(authorization.split(" ", 1)[-1]).decode()
+            client_id, _, client_secret = credentials.partition(":")
+        else:
+            client_id = form.get("client_id", "")
+            client_secret = form.get("client_secret", "")
+        return client_id == self.client_id and client_secret == self.client_secret
+
+    def bearer(self, request: httpx.Request) -> Optional[Dict]:
+        authorization = request.headers.get(Headers.authorization, "")
+        if not authorization.startswith(TokenType.bearer):
+            return None
+        return self.verify(authorization.split(" ", 1)[-1])
+
+    # endpoints
+
+    def openid_configuration(self, request: httpx.Request) -> httpx.Response:
+        return httpx.Response(
+            200,
+            json={
+                "issuer": self.issuer,
+                "authorization_endpoint": self.endpoint(
+                    "/protocol/openid-connect/auth"
+                ),
+                "token_endpoint": self.endpoint("/protocol/openid-connect/token"),
+                "token_introspection_endpoint": self.endpoint(
+                    "/protocol/openid-connect/token/introspect"
+                ),
+                "userinfo_endpoint": self.endpoint("/protocol/openid-connect/userinfo"),
+                "end_session_endpoint": self.endpoint(
+                    "/protocol/openid-connect/logout"
+                ),
+                "jwks_uri": self.endpoint("/protocol/openid-connect/certs"),
+                "introspection_endpoint": self.endpoint(
+                    "/protocol/openid-connect/token/introspect"
+                ),
+                "grant_types_supported": [
+                    GrantTypes.authorization_code,
+                    GrantTypes.refresh_token,
+                    GrantTypes.password,
+                    GrantTypes.client_credentials,
+                    GrantTypes.uma_ticket,
+                ],
+                "response_types_supported": ["code"],
+                "id_token_signing_alg_values_supported": [self.algorithm],
+            },
+        )
+
+    def uma2_configuration(self, request: httpx.Request) -> httpx.Response:
+        return httpx.Response(
+            200,
+            json={
+                "issuer": self.issuer,
+                "authorization_endpoint": self.endpoint(
+                    "/protocol/openid-connect/auth"
+                ),
+                "token_endpoint": self.endpoint("/protocol/openid-connect/token"),
+                "token_introspection_endpoint": self.endpoint(
+                    "/protocol/openid-connect/token/introspect"
+                ),
+                "end_session_endpoint": self.endpoint(
+                    "/protocol/openid-connect/logout"
+                ),
+                "jwks_uri": self.endpoint("/protocol/openid-connect/certs"),
+                "resource_registration_endpoint": self.endpoint(
+                    "/authz/protection/resource_set"
+                ),
+                "permission_endpoint": self.endpoint("/authz/protection/permission"),
+                "policy_endpoint": self.endpoint("/authz/protection/uma-policy"),
+                "introspection_endpoint": self.endpoint(
+                    "/protocol/openid-connect/token/introspect"
+                ),
+            },
+        )
+
+    def auth(self, request: httpx.Request) -> httpx.Response:
+        # users are logged in right away, as the first configured user
+        params = request.url.params
+        if params.get("client_id") != self.client_id:
+            return error(400, "unauthorized_client")
+        query = urlencode({"code": self.authorize(), "state": params.get("state", "")})
+        return httpx.Response(
+            302, headers={"Location": f"{params.get('redirect_uri')}?{query}"}
+        )
+
+    def token_endpoint(self, request: httpx.Request) -> httpx.Response:
+        form = {k: v[0] for k, v in parse_qs(request.content.decode()).items()}
+        grant_type = form.get("grant_type")
+        if grant_type == GrantTypes.uma_ticket:
+            return self.uma_ticket(request, form)
+        if not self.client_authenticated(request, form):
+            return error(401, "unauthorized_client")
+        if grant_type == GrantTypes.client_credentials:
+            return httpx.Response(
+                200, json=self.tokens(f"service-account-{self.client_id}")
+            )
+        if grant_type == GrantTypes.password:
+            username = form.get("username", "")
+            if username not in self.users or self.users[username] != form.get(
+                "password"
+            ):
+                return error(401, "invalid_grant", "Invalid user credentials")
+            return httpx.Response(200, json=self.tokens(username))
+        if grant_type == GrantTypes.refresh_token:
+            claims = self.verify(form.get("refresh_token", ""))
+            if claims is None or claims.get("typ") != "Refresh":
+                return error(400, "invalid_grant", "Invalid refresh token")
+            return httpx.Response(200, json=self.tokens(claims["sub"]))
+        if grant_type == GrantTypes.authorization_code:
+            with self._lock:
+                subject = self.codes.pop(form.get("code", ""), None)
+            if subject is None:
+                return error(400, "invalid_grant", "Code not valid")
+            return httpx.Response(200, json=self.tokens(subject))
+        return error(400, "unsupported_grant_type")
+
+    def uma_ticket(self, request: httpx.Request, form: Dict) -> httpx.Response:
+        claims = self.bearer(request)
+        if claims is None:
+            return error(401, "invalid_token")
+        if form.get("audience", self.client_id) != self.client_id:
+            return error(400, "invalid_target")
+        requested: Dict[str, Set[str]] = defaultdict(set)
+        for value in parse_qs(request.content.decode()).get("permission", []):
+            resource_ref, _, scope_refs = value.partition("#")
+            requested[resource_ref].update(x for x in scope_refs.split(",") if x)
+        permissions = []
+        for resource in self.resources:
+            names = {resource["_id"], resource["name"]}
+            if requested and not names & set(requested):
+                continue
+            available = {
+                x["name"] if isinstance(x, dict) else x
+                for x in resource.get("resource_scopes", [])
+            }
+            asked = set().union(*[requested[x] for x in names if x in requested])
+            scopes = sorted(available & asked if asked else available)
+            # resources without scopes are granted as a whole
+            if asked and available and not scopes:
+                continue
+            permission = {"rsid": resource["_id"], "rsname": resource["name"]}
+            if scopes:
+                permission["scopes"] = scopes
+            permissions.append(permission)
+        if not permissions:
+            return error(403, "access_denied", "not_authorized")
+        if form.get("response_mode") == UmaResponseModes.decision:
+            return httpx.Response(200, json={"result": True})
+        if form.get("response_mode") == UmaResponseModes.permissions:
+            return httpx.Response(200, json=permissions)
+        return httpx.Response(200, json=self.tokens(claims["sub"], permissions))
+
+    def userinfo(self, request: httpx.Request) -> httpx.Response:
+        claims = self.bearer(request)
+        if claims is None:
+            return error(401, "invalid_token")
+        return httpx.Response(
+            200,
+            json={
+                "sub": claims["sub"],
+                "email_verified": False,
+                "preferred_username": claims["sub"],
+            },
+        )
+
+    def logout(self, request: httpx.Request) -> httpx.Response:
+        return httpx.Response(204)
+
+    def certs(self, request: httpx.Request) -> httpx.Response:
+        return httpx.Response(
+            200,
+            json={"keys": self.jwks},
+            headers={Headers.cache_control: "max-age=300"},
+        )
+
+    def introspect(self, request: httpx.Request) -> httpx.Response:
+        form = {k: v[0] for k, v in parse_qs(request.content.decode()).items()}
+        if not self.client_authenticated(request, form):
+            return error(401, "unauthorized_client")
+        claims = self.verify(form.get("token", ""))
+        if claims is None:
+            return httpx.Response(200, json={"active": False})
+        permissions = claims.get("authorization", {}).get("permissions", [])
+        return httpx.Response(
+            200, json={**claims, "permissions": permissions, "active": True}
+        )
+
+    def resource_set(self, request: httpx.Request) -> httpx.Response:
+        if self.bearer(request) is None:
+            return error(401, "invalid_token")
+        params = request.url.params
+        resources = [x for x in self.resources if self.matches(x, params)]
+        first = int(params.get("first", 0))
+        size = int(params.get("max", len(resources)))
+        page = resources[first : first + size]
+        if params.get("deep") == "true":
+            return httpx.Response(200, json=page)
+        return httpx.Response(200, json=[x["_id"] for x in page])
+
+    @staticmethod
+    def matches(resource: Dict, params: httpx.QueryParams) -> bool:
+        """filters of the resource set endpoint, the name is matched partially"""
+        if "name" in params and params["name"].lower() not in resource["name"].lower():
+            return False
+        if "uri" in params and params["uri"] not in resource.get("uris", []):
+            return False
+        owner = resource.get("owner", {}).get("id")
+        if "owner" in params and params["owner"] != owner:
+            return False
+        return "type" not in params or params["type"] == resource.get("type")
+
+    def resource(self, request: httpx.Request) -> httpx.Response:
+        if self.bearer(request) is None:
+            return error(401, "invalid_token")
+        resource_id = request.url.path.rsplit("/", 1)[-1]
+        for resource in self.resources:
+            if resource["_id"] == resource_id:
+                return httpx.Response(200, json=resource)
+        return error(404, "not_found")
+
+    def permission(self, request: httpx.Request) -> httpx.Response:
+        if self.bearer(request) is None:
+            return error(401, "invalid_token")
+        return httpx.Response(201, json={"ticket": str(uuid4())})
+
+
+def error(status: int, code: str, description: str = "") -> httpx.Response:
+    body = {"error": code}
+    if description:
+        body["error_description"] = description
+    return httpx.Response(status, json=body)
@@ -1,16 +1,22 @@
 # -*- coding: utf-8 -*-
+import asyncio
 import base64
+import hashlib
 import json
 import logging
+import time
+from email.utils import parsedate_to_datetime
 from functools import wraps
-from typing import Any, Callable, Dict, Tuple, Union
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple, Type, TypeVar, Union
 
-from requests.exceptions import HTTPError
+from httpx import HTTPStatusError
 
 from .constants import Headers, Logger, TokenType
 
 log = logging.getLogger(Logger.name)
 
+T = TypeVar("T")
+
 
 def b64encode(data: Any, serialize: bool = False) -> str:
     """method to encode string using base64"""
@@ -31,25 +37,65 @@ def basic_auth(username: str, password: str) -> Dict:
     return auth_header(token, TokenType.basic)
 
 
+def digest(token: str) -> bytes:
+    """method to generate the digest of a token, used as cache key"""
+    return hashlib.sha256(token.encode("utf-8")).digest()
+
+
 def fix_padding(encoded_string: str) -> str:
     """method to correct padding for base64 encoding"""
     required_padding = len(encoded_string) % 4
     return encoded_string + ("=" * required_padding)
 
 
+def max_age(headers: Mapping) -> Optional[float]:
+    """method to read max-age (in seconds) from the cache-control header"""
+    for directive in headers.get(Headers.cache_control, "").split(","):
+        name, _, value = directive.strip().partition("=")
+        if name.lower() == "max-age" and value.isdigit():
+            return float(value)
+    return None
+
+
+def retry_after(headers: Mapping) -> Optional[float]:
+    """method to read the delay (in seconds) requested by the retry-after header"""
+    value = headers.get(Headers.retry_after, "").strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def log_exception(ex: Exception) -> None:
+    if isinstance(ex, HTTPStatusError):
+        log.exception(ex.response.content)
+    else:
+        log.exception("Error occurred:")
+
+
 def handle_exceptions(func: Callable) -> Any:
-    """decorator to take care of HTTPError"""
+    """decorator to take care of HTTPStatusError"""
+
+    if asyncio.iscoroutinefunction(func):
+
+        @wraps(func)
+        async def async_wrapper(*args: Tuple, **kwargs: Dict) -> Any:
+            try:
+                return await func(*args, **kwargs)
+            except Exception as ex:
+                log_exception(ex)
+                raise ex
+
+        return async_wrapper
 
     @wraps(func)
     def wrapper(*args: Tuple, **kwargs: Dict) -> Any:
         try:
             return func(*args, **kwargs)
-        except HTTPError as ex:
-            if hasattr(ex.response, "content"):
-                log.exception(ex.response.content)
-            raise ex
         except Exception as ex:
-            log.exception("Error occurred:")
+            log_exception(ex)
             raise ex
 
     return wrapper
@@ -64,3 +110,7 @@ class Singleton(type):
         if cls not in cls._instances:
             cls._instances[cls] = super().__call__(*args, **kwargs)
         return cls._instances[cls]
+
+    def create(cls: Type[T], *args: Any, **kwargs: Any) -> T:
+        """create an instance independent of the shared one"""
+        return super().__call__(*args, **kwargs)  # type: ignore
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks.runner import OPERATIONS, Result, regressions
+
+root = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+
+def test_benchmarks(tmp_path):
+    baseline = tmp_path / "baseline.json"
+    options = ["--iterations", "2", "--warmup", "0", "--rounds", "1"]
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "benchmarks",
+            *options,
+            "--baseline",
+            baseline,
+            "--save",
+        ],
+        capture_output=True,
+        cwd=root,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr
+    keys = {f"{x}.{y}" for x in ("sync", "async") for y in OPERATIONS}
+    assert set(json.loads(baseline.read_text())) == keys
+
+
+def test_regressions():
+    baseline = {"sync.decode": {"ops_per_sec": 1000.0, "alloc_kib": 4.0}}
+    result = Result("decode", "sync", 900.0, 1.0, 2.0, 4.0)
+    assert regressions([result], baseline, 0.25) == []
+    result = Result("decode", "sync", 700.0, 1.0, 2.0, 5.5)
+    assert len(regressions([result], baseline, 0.25)) == 2
+    result = Result("decode", "async", 1.0, 1.0, 2.0, 50.0)
+    assert regressions([result], baseline, 0.25) == []
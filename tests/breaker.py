@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+from unittest.mock import MagicMock, patch
+
+import httpx
+import pytest
+
+from keycloak.breaker import CircuitBreaker, unavailable
+from keycloak.exceptions import CircuitOpenError
+from keycloak.retry import RetryPolicy
+
+from .conftest import openid
+
+
+def test_unavailable():
+    request = httpx.Request("GET", "http://kc")
+    for status, expected in [(503, True), (429, True), (401, False)]:
+        response = httpx.Response(status, request=request)
+        error = httpx.HTTPStatusError("error", request=request, response=response)
+        assert unavailable(error) is expected
+    assert unavailable(httpx.ConnectTimeout("slow"))
+    assert unavailable(CircuitOpenError("pat", 1.0))
+    assert not unavailable(ValueError())
+
+
+def test_breaker_opens():
+    breaker = CircuitBreaker(threshold=2, reset_timeout=60)
+    breaker.record("pat", success=False)
+    breaker.check("pat")
+    breaker.record("pat", success=False)
+    with pytest.raises(CircuitOpenError) as ex:
+        breaker.check("pat")
+    assert ex.value.operation == "pat"
+    assert 0 < ex.value.retry_in <= 60
+    breaker.check("rpt")
+    assert breaker.open_circuits == ["pat"]
+
+
+def test_breaker_success_resets_failures():
+    breaker = CircuitBreaker(threshold=2)
+    breaker.record("pat", success=False)
+    breaker.record("pat", success=True)
+    breaker.record("pat", success=False)
+    breaker.check("pat")
+
+
+@patch("keycloak.breaker.time.monotonic")
+def test_breaker_probe(mock_monotonic):
+    breaker = CircuitBreaker(threshold=1, reset_timeout=30)
+    mock_monotonic.return_value = 100.0
+    breaker.record("pat", success=False)
+    mock_monotonic.return_value = 131.0
+    breaker.check("pat")
+    with pytest.raises(CircuitOpenError):
+        breaker.check("pat")
+    breaker.record("pat", success=False)
+    with pytest.raises(CircuitOpenError):
+        breaker.check("pat")
+    mock_monotonic.return_value = 162.0
+    breaker.check("pat")
+    breaker.record("pat", success=True)
+    breaker.check("pat")
+    assert breaker.open_circuits == []
+
+
+def test_breaker_disabled():
+    breaker = CircuitBreaker(threshold=0)
+    for _ in range(10):
+        breaker.record("pat", success=False)
+    breaker.check("pat")
+
+
+def test_request_fails_fast(kc_client):
+    respond = MagicMock(return_value=httpx.Response(503))
+    kc_client.close()
+    kc_client.transport = httpx.MockTransport(respond)
+    kc_client.retry_policy = RetryPolicy(retries=0)
+    threshold = kc_client.circuit_breaker.threshold
+    try:
+        for _ in range(threshold):
+            assert kc_client.request("pat", "post", openid.token_endpoint).is_error
+        with pytest.raises(CircuitOpenError):
+            kc_client.request("pat", "post", openid.token_endpoint)
+    finally:
+        kc_client.close()
+        del kc_client.transport
+    assert respond.call_count == threshold
+
+
+@patch("keycloak.core.transport.time.sleep")
+def test_request_records_calls(mock_sleep, kc_client):
+    respond = MagicMock(return_value=httpx.Response(503))
+    kc_client.close()
+    kc_client.transport = httpx.MockTransport(respond)
+    kc_client.retry_policy = RetryPolicy(retries=3)
+    kc_client.circuit_breaker = CircuitBreaker(threshold=2)
+    try:
+        assert kc_client.request("pat", "post", openid.token_endpoint).is_error
+        # the retries of a call are a single failure
+        assert respond.call_count == 4
+        assert kc_client.circuit_breaker.open_circuits == []
+        assert kc_client.request("pat", "post", openid.token_endpoint).is_error
+        assert kc_client.circuit_breaker.open_circuits == ["pat"]
+    finally:
+        kc_client.close()
+        del kc_client.transport
+        del kc_client.circuit_breaker
+        kc_client.retry_policy = RetryPolicy()
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+import time
+
+from keycloak.cache import TTLCache
+
+
+def test_cache_hit_and_miss():
+    cache = TTLCache(10)
+    cache.set("key", "value", time.time() + 60)
+    assert cache.get("key") == "value"
+    assert cache.get("unknown") is None
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+
+def test_cache_expiry():
+    cache = TTLCache(10)
+    cache.set("expired", "value", time.time() - 1)
+    assert len(cache) == 0
+    cache.set("key", "value", time.time() + 0.01)
+    time.sleep(0.02)
+    assert cache.get("key") is None
+    assert len(cache) == 0
+
+
+def test_cache_lru_eviction():
+    cache = TTLCache(2)
+    expires_at = time.time() + 60
+    cache.set("a", 1, expires_at)
+    cache.set("b", 2, expires_at)
+    cache.get("a")
+    cache.set("c", 3, expires_at)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_cache_delete_and_clear():
+    cache = TTLCache(10)
+    cache.set("a", 1, time.time() + 60)
+    cache.set("b", 2, time.time() + 60)
+    cache.delete("a")
+    assert cache.get("a") is None
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.hits == cache.misses == 0
+
+
+def test_cache_stale():
+    cache = TTLCache(10)
+    now = time.time()
+    cache.set("key", "value", now - 1, now + 60)
+    assert cache.get("key") is None
+    assert cache.get_stale("key") == "value"
+    cache.set("expired", "value", now - 2, now - 1)
+    assert cache.get_stale("expired") is None
+    assert len(cache) == 1
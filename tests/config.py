@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import pytest
+
+from keycloak.config import Config, OpenId, Uma2, config
+from keycloak.retry import RetryPolicy
+from keycloak.snapshot import Snapshot
+
+from .conftest import openid, uma2
+
+
+@patch("keycloak.core.transport.httpx.Client.get")
+def test_openid(mock_get, monkeypatch):
+    monkeypatch.delitem(vars(config), "openid")
+    mock_get.return_value.json.return_value = {"issuer": openid.issuer}
+    assert config.openid.issuer == openid.issuer
+    assert config.openid.issuer == openid.issuer
+    mock_get.assert_called_once_with(config.openid_endpoint)
+
+
+def test_aload(monkeypatch):
+    monkeypatch.delitem(vars(config), "openid")
+    monkeypatch.delitem(vars(config), "uma2")
+    documents = {
+        config.openid_endpoint: {"issuer": openid.issuer},
+        config.uma_endpoint: {"issuer": uma2.issuer},
+    }
+
+    async def request(operation, method, endpoint):
+        response = MagicMock()
+        response.json.return_value = documents[endpoint]
+        return response
+
+    client = MagicMock()
+    client.request = AsyncMock(side_effect=request)
+    asyncio.run(config.aload(client))
+    assert isinstance(vars(config)["openid"], OpenId)
+    assert isinstance(vars(config)["uma2"], Uma2)
+    assert config.openid.issuer == openid.issuer
+    assert config.uma2.issuer == uma2.issuer
+    assert client.request.call_count == 2
+    client.request.assert_any_call("discovery", "get", config.openid_endpoint)
+
+
+def test_aload_single_flight(monkeypatch):
+    monkeypatch.delitem(vars(config), "openid")
+    monkeypatch.delitem(vars(config), "uma2")
+
+    async def request(operation, method, endpoint):
+        await asyncio.sleep(0)
+        response = MagicMock()
+        response.json.return_value = {"issuer": openid.issuer}
+        return response
+
+    async def discover():
+        await asyncio.gather(*[config.aload(client) for _ in range(10)])
+
+    client = MagicMock()
+    client.request = AsyncMock(side_effect=request)
+    asyncio.run(discover())
+    assert client.request.call_count == 2
+    assert config.openid.issuer == openid.issuer
+
+
+def test_attach():
+    owner = MagicMock()
+    config = Config()
+    config.attach(owner)
+    config.attach(MagicMock())
+    assert config.http is owner.http
+    config.transport = httpx.MockTransport(lambda request: httpx.Response(200))
+    assert config.http is not owner.http
+    config.close()
+    config.pool = MagicMock()
+    assert config.http is config.pool
+
+
+def test_aload_loaded():
+    client = MagicMock()
+    client.request = AsyncMock()
+    asyncio.run(config.aload(client))
+    client.request.assert_not_called()
+
+
+@patch("keycloak.config.Config.revalidate")
+@patch("keycloak.core.transport.httpx.Client.get")
+def test_openid_snapshot(mock_get, mock_revalidate, monkeypatch, tmp_path):
+    snapshot = Snapshot(str(tmp_path / "snapshot.json"))
+    snapshot.put("openid", {"issuer": openid.issuer})
+    monkeypatch.setitem(vars(config), "snapshot", snapshot)
+    monkeypatch.delitem(vars(config), "openid")
+    assert config.openid.issuer == openid.issuer
+    mock_get.assert_not_called()
+    mock_revalidate.assert_called_once_with()
+
+
+@patch("keycloak.core.transport.httpx.Client.get")
+def test_uma2_saved_to_snapshot(mock_get, monkeypatch, tmp_path):
+    snapshot = Snapshot(str(tmp_path / "snapshot.json"))
+    monkeypatch.setitem(vars(config), "snapshot", snapshot)
+    monkeypatch.delitem(vars(config), "uma2")
+    mock_get.return_value.json.return_value = {"issuer": uma2.issuer}
+    assert config.uma2.issuer == uma2.issuer
+    assert snapshot.get("uma2")[0] == {"issuer": uma2.issuer}
+
+
+@patch("keycloak.core.transport.httpx.Client.get")
+def test_revalidate(mock_get, monkeypatch, tmp_path):
+    snapshot = Snapshot(str(tmp_path / "snapshot.json"))
+    monkeypatch.setitem(vars(config), "snapshot", snapshot)
+    monkeypatch.setitem(vars(config), "openid", openid)
+    monkeypatch.setitem(vars(config), "uma2", uma2)
+    mock_get.return_value.json.return_value = {"issuer": "http://new-issuer"}
+    config._revalidate()
+    assert config.openid.issuer == "http://new-issuer"
+    assert config.uma2.issuer == "http://new-issuer"
+    assert snapshot.get("openid")[0] == {"issuer": "http://new-issuer"}
+
+
+@patch("keycloak.config.Config.revalidate")
+@patch("keycloak.core.transport.httpx.Client.get")
+def test_stale_snapshot(mock_get, mock_revalidate, monkeypatch, tmp_path):
+    snapshot = Snapshot(str(tmp_path / "snapshot.json"), ttl=0)
+    snapshot.put("openid", {"issuer": openid.issuer})
+    monkeypatch.setitem(vars(config), "snapshot", snapshot)
+    monkeypatch.delitem(vars(config), "openid")
+    monkeypatch.setattr(config, "retry_policy", RetryPolicy(retries=0))
+    mock_get.side_effect = httpx.ConnectError("connection refused")
+    assert config.openid.issuer == openid.issuer
+    mock_revalidate.assert_called_once_with()
+    monkeypatch.delitem(vars(config), "uma2")
+    with pytest.raises(httpx.ConnectError):
+        config.uma2
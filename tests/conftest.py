@@ -6,6 +6,7 @@ import pytest
 
 from keycloak import Client as KeycloakClient
 from keycloak.config import Client, OpenId, Uma2, config
+from keycloak.retry import RetryPolicy
 
 here = os.path.dirname(os.path.realpath(__file__))
 
@@ -26,9 +27,11 @@ jwks = read_json("jwks.json")
 @pytest.fixture(autouse=True)
 def configs(monkeypatch):
     monkeypatch.setattr("keycloak.config.Config.client", client)
-    monkeypatch.setattr("keycloak.config.Config.openid", openid)
-    monkeypatch.setattr("keycloak.config.Config.uma2", uma2)
-    monkeypatch.setattr("keycloak.core.token.TokenMixin.jwks", jwks)
+    monkeypatch.setitem(vars(config), "openid", openid)
+    monkeypatch.setitem(vars(config), "uma2", uma2)
+    monkeypatch.setattr(
+        "keycloak.core.token.TokenMixin.fetch_jwks", lambda self: (jwks, None)
+    )
 
 
 @pytest.fixture()
@@ -38,4 +41,7 @@ def kc_config(monkeypatch):
 
 @pytest.fixture()
 def kc_client(monkeypatch):
-    yield KeycloakClient()
+    client = KeycloakClient()
+    yield client
+    client.retry_policy = RetryPolicy()
+    client.circuit_breaker.reset()
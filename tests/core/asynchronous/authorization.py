@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+import asyncio
+from urllib.parse import parse_qs
+
+import httpx
+
+from keycloak import AsyncClient
+from keycloak.cache import TTLCache
+
+
+def test_check_permissions(monkeypatch):
+    requests = []
+
+    def respond(request):
+        requests.append(request)
+        return httpx.Response(200, json=[{"rsname": "res", "scopes": ["view"]}])
+
+    async def subject(token):
+        return "alice"
+
+    async def run():
+        kc = AsyncClient()
+        await kc.aclose()
+        kc.transport = httpx.MockTransport(respond)
+        kc.decision_cache = TTLCache(10)
+        monkeypatch.setattr(kc, "subject", subject)
+        try:
+            first = await kc.check_permissions("token", [("res", "view")])
+            second = await kc.check_permissions("token", [("res", "view"), ("x", None)])
+            return first, second
+        finally:
+            await kc.aclose()
+            del kc.transport, kc.decision_cache
+
+    first, second = asyncio.run(run())
+    assert first == {("res", "view"): True}
+    assert second == {("res", "view"): True, ("x", None): False}
+    assert len(requests) == 2
+    assert parse_qs(requests[1].content.decode())["permission"] == ["x"]
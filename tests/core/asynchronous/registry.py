@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+import asyncio
+
+import httpx
+
+from keycloak import AsyncClient, AsyncRegistry
+from keycloak.testing import FakeKeycloak
+
+base_url = "http://localhost:8080/auth"
+
+
+def test_clients(monkeypatch):
+    monkeypatch.undo()
+    realms = [
+        FakeKeycloak(base_url, "acme", "api", "acme-secret"),
+        FakeKeycloak(base_url, "demo", "web", "demo-secret"),
+    ]
+
+    async def route(request):
+        for fake in realms:
+            if str(request.url).startswith(fake.issuer + "/"):
+                return await fake.ahandle(request)
+        return httpx.Response(404)
+
+    async def run():
+        async with AsyncRegistry(transport=httpx.MockTransport(route)) as registry:
+            for fake in realms:
+                registry.register(
+                    base_url, fake.realm, fake.client_id, fake.client_secret
+                )
+            clients = [registry.get(base_url, x.realm, x.client_id) for x in realms]
+            await asyncio.gather(*[x.discover() for x in clients])
+            claims = [
+                await kc.decode(fake.token("akhil", 60))
+                for kc, fake in zip(clients, realms)
+            ]
+            assert clients[0].http is clients[1].http is registry.pool
+            assert all(x.config.transport is None for x in clients)
+            assert all(x is not AsyncClient() for x in clients)
+            pool = registry.pool
+        assert pool.is_closed
+        return claims
+
+    acme, demo = asyncio.run(run())
+    assert acme["iss"] == realms[0].issuer
+    assert demo["iss"] == realms[1].issuer
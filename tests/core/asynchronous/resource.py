@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+import asyncio
+from unittest.mock import MagicMock, patch
+
+import httpx
+import pytest
+
+from keycloak import AsyncClient
+from keycloak.config import Client as ClientConfig
+from keycloak.config import Config
+from keycloak.exceptions import ResourceFetchError
+from keycloak.testing import FakeKeycloak
+
+
+async def find_resource(resource_id, access_token=None):
+    # finish the later resources first to make sure the order is preserved
+    await asyncio.sleep(0.01 / int(resource_id))
+    if resource_id == "3":
+        raise ValueError("not found")
+    return {"_id": resource_id}
+
+
+@patch("keycloak.core.asynchronous.resource.AsyncResourceMixin.find_resource")
+@patch("keycloak.core.asynchronous.transport.httpx.AsyncClient.get")
+def test_find_resources(mock_get, mock_find_resource):
+    mock_get.return_value = MagicMock()
+    mock_get.return_value.json.return_value = ["1", "2", "4"]
+    mock_find_resource.side_effect = find_resource
+    kc = AsyncClient()
+    resources = asyncio.run(kc.find_resources("token123456789", concurrency=2))
+    assert resources == [{"_id": "1"}, {"_id": "2"}, {"_id": "4"}]
+    assert mock_find_resource.call_count == 3
+
+
+@patch("keycloak.core.asynchronous.resource.AsyncResourceMixin.find_resource")
+@patch("keycloak.core.asynchronous.transport.httpx.AsyncClient.get")
+def test_find_resources_partial_failure(mock_get, mock_find_resource):
+    mock_get.return_value = MagicMock()
+    mock_get.return_value.json.return_value = ["1", "2", "3", "4"]
+    mock_find_resource.side_effect = find_resource
+    kc = AsyncClient()
+    with pytest.raises(ResourceFetchError) as ex:
+        asyncio.run(kc.find_resources("token123456789"))
+    assert ex.value.resources == [{"_id": "1"}, {"_id": "2"}, {"_id": "4"}]
+    assert list(ex.value.errors) == ["3"]
+
+
+def test_aiter_resources(monkeypatch):
+    monkeypatch.undo()
+    resources = [
+        {"_id": str(x), "name": f"Album {x}", "type": f"urn:{x % 2}", "owner": {}}
+        for x in range(5)
+    ]
+    fake = FakeKeycloak(resources=resources)
+    config = Config(ClientConfig(**fake.settings))
+    config.transport = fake.transport
+
+    async def run():
+        kc = AsyncClient.create(config=config, transport=fake.async_transport)
+        token = fake.token("akhil", 60)
+        try:
+            listed = [x async for x in kc.aiter_resources(token, page_size=2)]
+            assert fake.requests["resource_set"] == 3
+            filtered = [
+                x["_id"] async for x in kc.aiter_resources(token, 2, type="urn:1")
+            ]
+            # a full page of matches prefetches an empty page
+            assert fake.requests["resource_set"] == 5
+            pages = kc.aiter_resources(token, page_size=2)
+            first = await pages.__anext__()
+            await pages.aclose()
+            return listed, filtered, first
+        finally:
+            await kc.aclose()
+
+    listed, filtered, first = asyncio.run(run())
+    config.close()
+    assert listed == resources
+    assert filtered == ["1", "3"]
+    assert first == resources[0]
+    # the prefetch of the third page is cancelled
+    assert fake.requests["resource_set"] <= 7
+
+
+@patch("keycloak.core.asynchronous.resource.AsyncResourceMixin.find_resource")
+@patch("keycloak.core.asynchronous.transport.httpx.AsyncClient.get")
+def test_aiter_resources_fallback(mock_get, mock_find_resource):
+    mock_get.return_value = MagicMock()
+    mock_get.return_value.json.side_effect = [["1", "2"], ["4"]]
+    mock_find_resource.side_effect = find_resource
+    kc = AsyncClient()
+
+    async def run():
+        return [x async for x in kc.aiter_resources("token123456789", page_size=2)]
+
+    assert asyncio.run(run()) == [{"_id": "1"}, {"_id": "2"}, {"_id": "4"}]
+    assert mock_get.call_count == 2
+
+
+def test_find_resources_paging(monkeypatch):
+    monkeypatch.undo()
+    resources = [{"_id": str(x), "name": f"Album {x}"} for x in range(5)]
+    fake = FakeKeycloak(resources=resources)
+    config = Config(ClientConfig(**fake.settings))
+    config.transport = fake.transport
+
+    async def run():
+        kc = AsyncClient.create(config=config, transport=fake.async_transport)
+        try:
+            return await kc.find_resources(fake.token("akhil", 60), page_size=2)
+        finally:
+            await kc.aclose()
+
+    assert asyncio.run(run()) == resources
+    config.close()
+    # full representations in 3 pages, no request per resource
+    assert fake.requests["resource_set"] == 3
+
+
+def test_find_resources_by_id_not_found():
+    def respond(request):
+        resource_id = request.url.path.rsplit("/", 1)[-1]
+        if resource_id == "2":
+            return httpx.Response(404, json={"error": "not found"})
+        return httpx.Response(200, json={"_id": resource_id})
+
+    async def run():
+        kc = AsyncClient()
+        await kc.aclose()
+        kc.transport = httpx.MockTransport(respond)
+        try:
+            return await kc.find_resources_by_id(["1", "2", "3"], "token123456789")
+        finally:
+            await kc.aclose()
+            del kc.transport
+
+    with pytest.raises(ResourceFetchError) as ex:
+        asyncio.run(run())
+    assert ex.value.resources == [{"_id": "1"}, {"_id": "3"}]
+    assert list(ex.value.errors) == ["2"]
+    assert isinstance(ex.value.errors["2"], httpx.HTTPStatusError)
+
+
+def test_aiter_resources_fallback_not_found():
+    pages = {"0": ["1", "2"], "2": ["3"]}
+
+    def respond(request):
+        if "first" in request.url.params:
+            return httpx.Response(200, json=pages[request.url.params["first"]])
+        resource_id = request.url.path.rsplit("/", 1)[-1]
+        if resource_id == "2":
+            return httpx.Response(404, json={"error": "not found"})
+        return httpx.Response(200, json={"_id": resource_id})
+
+    retrieved = []
+
+    async def run():
+        kc = AsyncClient()
+        await kc.aclose()
+        kc.transport = httpx.MockTransport(respond)
+        try:
+            async for resource in kc.aiter_resources("token123456789", page_size=2):
+                retrieved.append(resource)
+        finally:
+            await kc.aclose()
+            del kc.transport
+
+    # the error bodies are never yielded as resources
+    with pytest.raises(ResourceFetchError) as ex:
+        asyncio.run(run())
+    assert retrieved == []
+    assert ex.value.resources == [{"_id": "1"}]
+    assert list(ex.value.errors) == ["2"]
+    assert isinstance(ex.value.errors["2"], httpx.HTTPStatusError)
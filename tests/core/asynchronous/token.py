@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import time
+from unittest.mock import AsyncMock, patch
+
+from keycloak import AsyncClient
+from keycloak.config import Client as ClientConfig
+from keycloak.config import Config
+from keycloak.store import MemoryTokenStore
+from keycloak.testing import FakeKeycloak
+
+
+@patch(
+    "keycloak.core.asynchronous.token.AsyncTokenMixin.refresh", new_callable=AsyncMock
+)
+def test_load_tokens(mock_refresh):
+    async def refresh(refresh_token):
+        await asyncio.sleep(0.01)
+        return {"access_token": "b", "refresh_token": "r2", "expires_in": 60}
+
+    mock_refresh.side_effect = refresh
+    kc = AsyncClient()
+    kc.token_store = store = MemoryTokenStore(10)
+    kc.save_tokens("session", {"access_token": "a", "refresh_token": "r"})
+    store.get("session")["expires_at"] = time.time()
+
+    async def run():
+        return await asyncio.gather(*[kc.load_tokens("session") for _ in range(4)])
+
+    try:
+        results = asyncio.run(run())
+    finally:
+        del kc.token_store, kc.token_store_locks
+    assert all(x["access_token"] == "b" for x in results)
+    mock_refresh.assert_called_once_with("r")
+
+
+def test_has_permission(monkeypatch):
+    monkeypatch.undo()
+    fake = FakeKeycloak()
+    config = Config(ClientConfig(**fake.settings))
+    config.transport = fake.transport
+    rpt = fake.tokens(
+        "akhil", [{"rsid": "1a2b", "rsname": "Album", "scopes": ["view"]}]
+    )
+
+    async def run():
+        async with AsyncClient.create(
+            config=config, transport=fake.async_transport
+        ) as kc:
+            return [
+                await kc.has_permission(rpt["access_token"], "Album", "view"),
+                await kc.has_permission(rpt["access_token"], "1a2b", "delete"),
+            ]
+
+    try:
+        assert asyncio.run(run()) == [True, False]
+    finally:
+        config.close()
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+import asyncio
+
+import httpx
+
+from keycloak import AsyncClient
+
+
+def test_http_reused():
+    kc = AsyncClient()
+    asyncio.run(kc.aclose())
+    http = kc.http
+    assert isinstance(http, httpx.AsyncClient)
+    assert kc.http is http
+
+
+def test_http_reopened_after_close():
+    kc = AsyncClient()
+    http = kc.http
+    asyncio.run(kc.aclose())
+    assert http.is_closed
+    assert kc.http is not http
+
+
+def test_context_manager():
+    async def run(kc):
+        async with kc:
+            return kc.http
+
+    kc = AsyncClient()
+    http = asyncio.run(run(kc))
+    assert http.is_closed
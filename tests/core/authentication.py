@@ -27,7 +27,7 @@ def test_kc_login(mock_uuid4, kc_client, kc_config):
     assert login_url == _login_url
 
 
-@patch("keycloak.core.authentication.httpx.post")
+@patch("keycloak.core.transport.httpx.Client.post")
 def test_kc_logout(mock_post, kc_client, kc_config):
     kc_client.logout("access-token", "refresh-token")
     payload = {
@@ -41,7 +41,7 @@ def test_kc_logout(mock_post, kc_client, kc_config):
     )
 
 
-@patch("keycloak.core.authentication.httpx.post")
+@patch("keycloak.core.transport.httpx.Client.post")
 def test_kc_callback(mock_post, kc_client, kc_config):
     """Test case for authentication_callback"""
     mock_post.return_value.json = MagicMock()
@@ -57,7 +57,7 @@ def test_kc_callback(mock_post, kc_client, kc_config):
     mock_post.return_value.json.assert_called_once()
 
 
-@patch("keycloak.core.authentication.httpx.post")
+@patch("keycloak.core.transport.httpx.Client.post")
 def test_kc_callback_failure(mock_post, kc_client, kc_config):
     mock_post.return_value = MagicMock()
     mock_post.return_value.content = "server error"
@@ -75,16 +75,19 @@ def test_kc_callback_failure(mock_post, kc_client, kc_config):
     mock_post.assert_called_once_with(kc_config.openid.token_endpoint, data=payload)
 
 
-@patch("keycloak.core.authentication.httpx.post")
-@patch("keycloak.core.authentication.httpx.get")
+@patch("keycloak.core.transport.httpx.Client.post")
+@patch("keycloak.core.transport.httpx.Client.get")
 def test_kc_userinfo(mock_httpx_get, mock_httpx_post, kc_client):
     mock_httpx_get.return_value.json = MagicMock()
     kc_client.userinfo
     mock_httpx_get.assert_called()
     mock_httpx_get.return_value.json.assert_called()
+    # not memoised, the user behind the tokens may change
+    kc_client.userinfo
+    assert mock_httpx_get.return_value.json.call_count == 2
 
 
-@patch("keycloak.core.authentication.httpx.get")
+@patch("keycloak.core.transport.httpx.Client.get")
 def test_kc_fetch_userinfo(mock_post, kc_client, kc_config):
     mock_post.return_value.json = MagicMock()
     token = "token123456789"
@@ -96,7 +99,7 @@ def test_kc_fetch_userinfo(mock_post, kc_client, kc_config):
     mock_post.return_value.json.assert_called_once()
 
 
-@patch("keycloak.core.authentication.httpx.get")
+@patch("keycloak.core.transport.httpx.Client.get")
 def test_kc_userinfo_failure(mock_post, kc_client, kc_config):
     mock_post.return_value = MagicMock()
     mock_post.return_value.content = "server error"
@@ -1,10 +1,20 @@
 # -*- coding: utf-8 -*-
+import time
 from unittest.mock import MagicMock, patch
 
+import httpx
 import pytest
+from jose import JWTError
 from requests.exceptions import HTTPError
 
-from keycloak.constants import GrantTypes, TokenType, TokenTypeHints
+from keycloak import Client
+from keycloak.cache import TTLCache, introspection_expiry, introspection_stale_until
+from keycloak.config import Client as ClientConfig
+from keycloak.config import Config
+from keycloak.constants import GrantTypes, TokenType, TokenTypeHints, UmaResponseModes
+from keycloak.retry import RetryPolicy
+from keycloak.testing import FakeKeycloak
+from keycloak.utils import digest
 
 
 def test_payload_for_client(kc_client):
@@ -26,7 +36,7 @@ def test_payload_for_user_empty(kc_client):
     assert payload == {}
 
 
-@patch("keycloak.core.authorization.httpx.post")
+@patch("keycloak.core.transport.httpx.Client.post")
 @patch("keycloak.core.authorization.AuthorizationMixin.payload_for_client")
 @patch("keycloak.core.authorization.AuthorizationMixin.payload_for_user")
 @patch("keycloak.core.authorization.basic_auth")
@@ -55,7 +65,7 @@ def test_pat(
     )
 
 
-@patch("keycloak.core.authorization.httpx.post")
+@patch("keycloak.core.transport.httpx.Client.post")
 @patch("keycloak.core.authorization.AuthorizationMixin.payload_for_client")
 @patch("keycloak.core.authorization.AuthorizationMixin.payload_for_user")
 @patch("keycloak.core.authorization.basic_auth")
@@ -89,7 +99,7 @@ def test_pat_failure(
     )
 
 
-@patch("keycloak.core.authorization.httpx.post")
+@patch("keycloak.core.transport.httpx.Client.post")
 @patch("keycloak.core.authorization.auth_header")
 def test_ticket(mock_auth_header, mock_post, kc_client, kc_config):
     token = "token123456789"
@@ -104,7 +114,7 @@ def test_ticket(mock_auth_header, mock_post, kc_client, kc_config):
     )
 
 
-@patch("keycloak.core.authorization.httpx.post")
+@patch("keycloak.core.transport.httpx.Client.post")
 @patch("keycloak.core.authorization.auth_header")
 def test_ticket_failure(mock_auth_header, mock_post, kc_client, kc_config):
     mock_post.return_value = MagicMock()
@@ -124,7 +134,7 @@ def test_ticket_failure(mock_auth_header, mock_post, kc_client, kc_config):
     )
 
 
-@patch("keycloak.core.authorization.httpx.post")
+@patch("keycloak.core.transport.httpx.Client.post")
 @patch("keycloak.core.authorization.auth_header")
 def test_rpt(mock_auth_header, mock_post, kc_client, kc_config):
     token = "token123456789"
@@ -141,7 +151,7 @@ def test_rpt(mock_auth_header, mock_post, kc_client, kc_config):
     )
 
 
-@patch("keycloak.core.authorization.httpx.post")
+@patch("keycloak.core.transport.httpx.Client.post")
 @patch("keycloak.core.authorization.auth_header")
 def test_rpt_failure(mock_auth_header, mock_post, kc_client, kc_config):
     mock_post.return_value = MagicMock()
@@ -163,7 +173,7 @@ def test_rpt_failure(mock_auth_header, mock_post, kc_client, kc_config):
     )
 
 
-@patch("keycloak.core.authorization.httpx.post")
+@patch("keycloak.core.transport.httpx.Client.post")
 @patch("keycloak.core.authorization.basic_auth")
 def test_introspect(mock_basic_auth, mock_post, kc_client, kc_config):
     rpt = "rpt123456789"
@@ -180,7 +190,7 @@ def test_introspect(mock_basic_auth, mock_post, kc_client, kc_config):
     )
 
 
-@patch("keycloak.core.authorization.httpx.post")
+@patch("keycloak.core.transport.httpx.Client.post")
 @patch("keycloak.core.authorization.basic_auth")
 def test_introspect_failure(mock_basic_auth, mock_post, kc_client, kc_config):
     mock_post.return_value = MagicMock()
@@ -200,3 +210,192 @@ def test_introspect_failure(mock_basic_auth, mock_post, kc_client, kc_config):
     mock_post.assert_called_once_with(
         kc_config.uma2.introspection_endpoint, data=payload, headers=header
     )
+
+
+@patch("keycloak.core.transport.httpx.Client.post")
+@patch("keycloak.core.authorization.basic_auth")
+def test_introspect_cached(mock_basic_auth, mock_post, kc_client):
+    kc_client.introspection_cache = TTLCache(10)
+    mock_post.return_value.json.return_value = {
+        "active": True,
+        "exp": time.time() + 60,
+    }
+    assert kc_client.introspect("rpt123456789") == mock_post.return_value.json()
+    assert kc_client.introspect("rpt123456789") == mock_post.return_value.json()
+    kc_client.introspect("rpt987654321")
+    assert mock_post.call_count == 2
+    assert kc_client.introspection_cache.hits == 1
+    del kc_client.introspection_cache
+
+
+@patch("keycloak.core.transport.httpx.Client.post")
+@patch("keycloak.core.authorization.basic_auth")
+def test_introspect_cache_expired(mock_basic_auth, mock_post, kc_client):
+    kc_client.introspection_cache = TTLCache(10)
+    mock_post.return_value.json.return_value = {"active": True, "exp": time.time()}
+    kc_client.introspect("rpt123456789")
+    kc_client.introspect("rpt123456789")
+    assert mock_post.call_count == 2
+    del kc_client.introspection_cache
+
+
+def test_introspection_expiry():
+    now = time.time()
+    assert introspection_expiry({"active": False}, 300, 5) == pytest.approx(now + 5)
+    assert introspection_expiry({"active": True}, 300, 5) == pytest.approx(now + 300)
+    result = {"active": True, "exp": now + 60}
+    assert introspection_expiry(result, 300, 5) == now + 60
+    result = {"active": True, "exp": now + 600}
+    assert introspection_expiry(result, 300, 5) == pytest.approx(now + 300)
+
+
+@patch("keycloak.core.transport.httpx.Client.post")
+@patch("keycloak.core.authorization.auth_header")
+def test_rpt_permissions(mock_auth_header, mock_post, kc_client, kc_config):
+    header = {"Authorization": "token123456789"}
+    mock_auth_header.return_value = header
+    kc_client.rpt("token123456789", "my-api", ["res#view", "res#edit"])
+    payload = {
+        "grant_type": GrantTypes.uma_ticket,
+        "audience": "my-api",
+        "permission": ["res#view", "res#edit"],
+    }
+    mock_post.assert_called_once_with(
+        kc_config.uma2.token_endpoint, data=payload, headers=header
+    )
+
+
+@patch("keycloak.core.transport.httpx.Client.post")
+@patch("keycloak.core.authorization.auth_header")
+def test_rpt_cached(mock_auth_header, mock_post, kc_client):
+    kc_client.rpt_cache = TTLCache(10)
+    mock_post.return_value.json.return_value = {"access_token": "rpt", "expires_in": 60}
+    kc_client.rpt("token123456789", permissions=["res#view", "res#edit"])
+    kc_client.rpt("token123456789", permissions=["res#edit", "res#view"])
+    assert mock_post.call_count == 1
+    kc_client.rpt("token123456789", permissions=["res#view"])
+    kc_client.rpt("token987654321", permissions=["res#view", "res#edit"])
+    kc_client.rpt("token123456789", "my-api", ["res#view", "res#edit"])
+    assert mock_post.call_count == 4
+    del kc_client.rpt_cache
+
+
+@patch("keycloak.core.transport.httpx.Client.post")
+@patch("keycloak.core.authorization.auth_header")
+def test_rpt_cache_skew(mock_auth_header, mock_post, kc_client):
+    kc_client.rpt_cache = TTLCache(10)
+    mock_post.return_value.json.return_value = {"access_token": "rpt", "expires_in": 5}
+    kc_client.rpt("token123456789")
+    kc_client.rpt("token123456789")
+    assert mock_post.call_count == 2
+    del kc_client.rpt_cache
+
+
+@patch("keycloak.core.transport.httpx.Client.post")
+@patch("keycloak.core.authorization.basic_auth")
+def test_introspect_stale(mock_basic_auth, mock_post, kc_client):
+    result = {"active": True, "exp": time.time() + 60}
+    kc_client.introspection_cache = TTLCache(10)
+    kc_client.introspection_cache.set(digest("rpt123456789"), result, 0, result["exp"])
+    mock_post.side_effect = httpx.ConnectError("connection refused")
+    kc_client.retry_policy = RetryPolicy(retries=0)
+    assert kc_client.introspect("rpt123456789") == result
+    with pytest.raises(httpx.ConnectError):
+        kc_client.introspect("rpt987654321")
+    del kc_client.introspection_cache
+
+
+@patch("keycloak.core.transport.httpx.Client.post")
+@patch("keycloak.core.authorization.basic_auth")
+def test_introspect_stale_rejected(mock_basic_auth, mock_post, kc_client):
+    result = {"active": True, "exp": time.time() + 60}
+    kc_client.introspection_cache = TTLCache(10)
+    kc_client.introspection_cache.set(digest("rpt123456789"), result, 0, result["exp"])
+    response = httpx.Response(401, request=httpx.Request("POST", "http://kc"))
+    mock_post.return_value = response
+    with pytest.raises(httpx.HTTPStatusError):
+        kc_client.introspect("rpt123456789")
+    del kc_client.introspection_cache
+
+
+def test_introspection_stale_until():
+    assert introspection_stale_until({"active": True, "exp": 100}) == 100
+    assert introspection_stale_until({"active": False, "exp": 100}) == 0
+
+
+@patch("keycloak.core.transport.httpx.Client.post")
+@patch("keycloak.core.authorization.auth_header")
+def test_check_permissions(mock_auth_header, mock_post, kc_client, kc_config):
+    header = {"Authorization": "token123456789"}
+    mock_auth_header.return_value = header
+    mock_post.return_value = MagicMock(status_code=200)
+    mock_post.return_value.json.return_value = [
+        {"rsid": "1a2b", "rsname": "res", "scopes": ["view"]}
+    ]
+    decisions = kc_client.check_permissions(
+        "token123456789", [("res", "view"), ("res", "edit"), ("1a2b", None)]
+    )
+    assert decisions == {
+        ("res", "view"): True,
+        ("res", "edit"): False,
+        ("1a2b", None): True,
+    }
+    payload = {
+        "grant_type": GrantTypes.uma_ticket,
+        "audience": kc_config.client.client_id,
+        "response_mode": UmaResponseModes.permissions,
+        "permission": ["res#view", "res#edit", "1a2b"],
+    }
+    mock_post.assert_called_once_with(
+        kc_config.uma2.token_endpoint, data=payload, headers=header
+    )
+    assert kc_client.check_permissions("token123456789", []) == {}
+
+
+@patch("keycloak.core.transport.httpx.Client.post")
+def test_check_permissions_denied(mock_post, kc_client):
+    mock_post.return_value = MagicMock(status_code=403)
+    decisions = kc_client.check_permissions("token123456789", [("res", "view")])
+    assert decisions == {("res", "view"): False}
+    mock_post.return_value.raise_for_status.assert_not_called()
+
+
+def test_check_permissions_other_audience(monkeypatch):
+    # verify real tokens signed by the fake server
+    monkeypatch.undo()
+    fake = FakeKeycloak(
+        resources=[{"_id": "1a2b", "name": "Album", "resource_scopes": []}]
+    )
+    config = Config(ClientConfig(**fake.settings))
+    config.transport = fake.transport
+    token = fake.token("akhil", 60, aud="account")
+    with Client.create(config=config, transport=fake.transport) as kc:
+        kc.decision_cache = TTLCache(10)
+        assert kc.check_permissions(token, [("Album", None)]) == {("Album", None): True}
+        assert kc.check_permissions(token, [("Album", None)]) == {("Album", None): True}
+        with pytest.raises(JWTError):
+            kc.decode(token)
+    config.close()
+    assert fake.requests["token"] == 1
+
+
+@patch("keycloak.core.token.TokenMixin.subject")
+@patch("keycloak.core.transport.httpx.Client.post")
+def test_check_permissions_cached(mock_post, mock_subject, kc_client):
+    kc_client.decision_cache = TTLCache(10)
+    mock_subject.side_effect = lambda token: token.split(".")[0]
+    mock_post.return_value = MagicMock(status_code=200)
+    mock_post.return_value.json.return_value = [{"rsname": "res", "scopes": ["view"]}]
+    kc_client.check_permissions("alice.1", [("res", "view")])
+    # another token of the same subject, only the new permission is requested
+    decisions = kc_client.check_permissions(
+        "alice.2", [("res", "view"), ("res", "edit")]
+    )
+    assert decisions == {("res", "view"): True, ("res", "edit"): False}
+    assert mock_post.call_args.kwargs["data"]["permission"] == ["res#edit"]
+    kc_client.check_permissions("alice.3", [("res", "edit"), ("res", "view")])
+    assert mock_post.call_count == 2
+    kc_client.check_permissions("bob.1", [("res", "view")])
+    kc_client.check_permissions("alice.1", [("res", "view")], audience="my-api")
+    assert mock_post.call_count == 4
+    del kc_client.decision_cache
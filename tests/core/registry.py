@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+import httpx
+import pytest
+from jose import JWTError
+
+from keycloak import Client, Registry
+from keycloak.config import config
+from keycloak.snapshot import Snapshot
+from keycloak.testing import FakeKeycloak
+
+base_url = "http://localhost:8080/auth"
+
+
+@pytest.fixture(scope="module")
+def realms():
+    return [
+        FakeKeycloak(base_url, "acme", "api", "acme-secret"),
+        FakeKeycloak(base_url, "demo", "web", "demo-secret"),
+    ]
+
+
+@pytest.fixture()
+def router(realms):
+    requests = []
+
+    def route(request):
+        requests.append(request)
+        for fake in realms:
+            if str(request.url).startswith(fake.issuer + "/"):
+                return fake.handle(request)
+        return httpx.Response(404)
+
+    route.requests = requests
+    return route
+
+
+@pytest.fixture()
+def registry(monkeypatch, realms, router):
+    # the clients of the registry fetch their own documents and keys
+    monkeypatch.undo()
+    registry = Registry(maxsize=2, transport=httpx.MockTransport(router))
+    for fake in realms:
+        registry.register(base_url, fake.realm, fake.client_id, fake.client_secret)
+    yield registry
+    registry.close()
+
+
+def test_clients(registry, realms):
+    acme, demo = realms
+    first = registry.get(base_url, "acme", "api")
+    second = registry.get(base_url + "/", "demo", "web")
+    assert first is registry.get(base_url, "acme", "api")
+    assert first is not second
+    assert first is not Client() and second is not Client()
+    assert first.config.openid.issuer == acme.issuer
+    assert second.config.openid.issuer == demo.issuer
+    assert first.pool is second.pool is registry.pool
+    assert first.http is registry.pool
+
+    token = demo.token("akhil", 60)
+    assert second.decode(token)["iss"] == demo.issuer
+    with pytest.raises(JWTError):
+        first.decode(token)
+
+
+def test_lazy(registry, router):
+    kc = registry.get(base_url, "acme", "api")
+    assert router.requests == []
+    assert kc.config.client.client_secret == "acme-secret"
+    kc.config.uma2
+    assert [x.url.path for x in router.requests] == [
+        "/auth/realms/acme/.well-known/uma2-configuration"
+    ]
+
+
+def test_unknown(registry):
+    assert (base_url, "acme", "api") in registry
+    assert (base_url, "acme", "web") not in registry
+    with pytest.raises(KeyError):
+        registry.get(base_url, "acme", "web")
+
+
+def test_eviction(registry):
+    registry.register(base_url, "other", "api")
+    acme = registry.get(base_url, "acme", "api")
+    registry.get(base_url, "demo", "web")
+    registry.get(base_url, "acme", "api")
+    registry.get(base_url, "other", "api")
+    assert registry.clients == [(base_url, "acme", "api"), (base_url, "other", "api")]
+    assert registry.get(base_url, "acme", "api") is acme
+    assert not registry.pool.is_closed
+
+
+def test_register_replaces(registry):
+    kc = registry.get(base_url, "acme", "api")
+    registry.register(base_url, "acme", "api", "rotated", token_cache_size=10)
+    replaced = registry.get(base_url, "acme", "api")
+    assert replaced is not kc
+    assert replaced.token_cache_size == 10
+    assert replaced.config.client.client_secret == "rotated"
+    registry.unregister(base_url, "acme", "api")
+    assert registry.clients == []
+
+
+def test_close(registry):
+    pool = registry.pool
+    registry.get(base_url, "acme", "api")
+    registry.close()
+    assert pool.is_closed
+    assert registry.clients == []
+    assert not registry.get(base_url, "acme", "api").http.is_closed
+
+
+def test_snapshot(monkeypatch, registry, tmp_path):
+    snapshot = Snapshot(str(tmp_path / "snapshot.json"), 60)
+    monkeypatch.setitem(vars(config), "snapshot", snapshot)
+    registry.get(base_url, "acme", "api").config.openid
+    registry.get(base_url, "demo", "web").config.openid
+    assert snapshot.get(f"{base_url}/acme/api:openid")[0]["issuer"].endswith("acme")
+    assert snapshot.get(f"{base_url}/demo/web:openid")[0]["issuer"].endswith("demo")
+    assert snapshot.get("openid") is None
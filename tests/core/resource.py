@@ -4,8 +4,14 @@ from unittest.mock import MagicMock, patch
 import pytest
 from requests.exceptions import HTTPError
 
+from keycloak import Client
+from keycloak.config import Client as ClientConfig
+from keycloak.config import Config
+from keycloak.exceptions import ResourceFetchError
+from keycloak.testing import FakeKeycloak
 
-@patch("keycloak.core.resource.httpx.get")
+
+@patch("keycloak.core.transport.httpx.Client.get")
 @patch("keycloak.core.resource.auth_header")
 def test_resources(mock_auth_header, mock_get, kc_client):
     kc_client.resources
@@ -13,7 +19,7 @@ def test_resources(mock_auth_header, mock_get, kc_client):
     mock_get.assert_called()
 
 
-@patch("keycloak.core.resource.httpx.get")
+@patch("keycloak.core.transport.httpx.Client.get")
 @patch("keycloak.core.resource.auth_header")
 def test_find_resources(mock_auth_header, mock_get, kc_client, kc_config):
     token = "token123456789"
@@ -22,11 +28,13 @@ def test_find_resources(mock_auth_header, mock_get, kc_client, kc_config):
     kc_client.find_resources(token)
     mock_auth_header.assert_called_once_with(token)
     mock_get.assert_called_once_with(
-        kc_config.uma2.resource_registration_endpoint, headers=header
+        kc_config.uma2.resource_registration_endpoint,
+        headers=header,
+        params={"deep": "true", "first": 0, "max": 100},
     )
 
 
-@patch("keycloak.core.resource.httpx.get")
+@patch("keycloak.core.transport.httpx.Client.get")
 @patch("keycloak.core.resource.auth_header")
 def test_resources_failure(mock_auth_header, mock_get, kc_client, kc_config):
     mock_get.return_value = MagicMock()
@@ -40,11 +48,52 @@ def test_resources_failure(mock_auth_header, mock_get, kc_client, kc_config):
     assert ex.type == HTTPError
     mock_auth_header.assert_called_once_with(token)
     mock_get.assert_called_once_with(
-        kc_config.uma2.resource_registration_endpoint, headers=header
+        kc_config.uma2.resource_registration_endpoint,
+        headers=header,
+        params={"deep": "true", "first": 0, "max": 100},
     )
 
 
-@patch("keycloak.core.resource.httpx.get")
+@patch("keycloak.core.transport.httpx.Client.get")
+def test_find_resources_paging(mock_get, kc_client, kc_config):
+    pages = [[{"_id": "1"}, {"_id": "2"}], [{"_id": "3"}]]
+    mock_get.return_value.json.side_effect = pages
+    resources = kc_client.find_resources("token123456789", page_size=2)
+    assert resources == [{"_id": "1"}, {"_id": "2"}, {"_id": "3"}]
+    assert mock_get.call_count == 2
+    assert mock_get.call_args.kwargs["params"] == {
+        "deep": "true",
+        "first": 2,
+        "max": 2,
+    }
+
+
+@patch("keycloak.core.resource.ResourceMixin.find_resource")
+@patch("keycloak.core.transport.httpx.Client.get")
+def test_find_resources_fallback(mock_get, mock_find_resource, kc_client):
+    mock_get.return_value.json.return_value = ["1", "2", "3"]
+    mock_find_resource.side_effect = lambda x, _: {"_id": x}
+    resources = kc_client.find_resources("token123456789", page_size=2)
+    assert resources == [{"_id": "1"}, {"_id": "2"}, {"_id": "3"}]
+    assert mock_get.call_count == 1
+    assert mock_find_resource.call_count == 3
+
+
+@patch("keycloak.core.resource.ResourceMixin.find_resource")
+def test_find_resources_by_id_failure(mock_find_resource, kc_client):
+    def find_resource(resource_id, access_token):
+        if resource_id == "2":
+            raise HTTPError("not found")
+        return {"_id": resource_id}
+
+    mock_find_resource.side_effect = find_resource
+    with pytest.raises(ResourceFetchError) as ex:
+        kc_client.find_resources_by_id(["1", "2", "3"], "token123456789")
+    assert ex.value.resources == [{"_id": "1"}, {"_id": "3"}]
+    assert list(ex.value.errors) == ["2"]
+
+
+@patch("keycloak.core.transport.httpx.Client.get")
 @patch("keycloak.core.resource.auth_header")
 def test_resource(mock_auth_header, mock_get, kc_client, kc_config):
     token = "token123456789"
@@ -57,7 +106,7 @@ def test_resource(mock_auth_header, mock_get, kc_client, kc_config):
     mock_get.assert_called_once_with(endpoint, headers=header)
 
 
-@patch("keycloak.core.resource.httpx.get")
+@patch("keycloak.core.transport.httpx.Client.get")
 @patch("keycloak.core.resource.auth_header")
 def test_resource_failure(mock_auth_header, mock_get, kc_client, kc_config):
     mock_get.return_value = MagicMock()
@@ -73,3 +122,94 @@ def test_resource_failure(mock_auth_header, mock_get, kc_client, kc_config):
     assert ex.type == HTTPError
     mock_auth_header.assert_called_once_with(token)
     mock_get.assert_called_once_with(endpoint, headers=header)
+
+
+@patch("keycloak.core.resource.ResourceMixin.find_resources")
+def test_refresh_paths(mock_find_resources, kc_client, monkeypatch):
+    monkeypatch.setattr(
+        kc_client.config.client,
+        "policy_enforcer",
+        {"paths": [{"name": "Album", "path": "/albums/{id}"}]},
+    )
+    mock_find_resources.return_value = [
+        {"_id": "1a2b", "name": "Default Resource", "uris": ["/*"]}
+    ]
+    try:
+        assert kc_client.path_matcher.match("/albums/42").resource == "Album"
+        assert kc_client.path_matcher.match("/users/42") is None
+        kc_client.refresh_paths("token123456789")
+        mock_find_resources.assert_called_once_with("token123456789")
+        assert kc_client.path_matcher.match("/users/42").resource == "1a2b"
+    finally:
+        del kc_client.path_matcher
+
+
+def make_resources(count):
+    return [
+        {
+            "_id": str(x),
+            "name": f"Album {x}",
+            "type": "urn:albums" if x % 2 else "urn:photos",
+            "owner": {"id": "akhil"},
+            "uris": [f"/albums/{x}"],
+        }
+        for x in range(count)
+    ]
+
+
+@pytest.fixture()
+def fake_client(monkeypatch):
+    monkeypatch.undo()
+    fake = FakeKeycloak(resources=make_resources(5))
+    config = Config(ClientConfig(**fake.settings))
+    config.transport = fake.transport
+    with Client.create(config=config, transport=fake.transport) as kc:
+        yield fake, kc
+    config.close()
+
+
+def test_iter_resources(fake_client):
+    fake, kc = fake_client
+    token = fake.token("akhil", 60)
+    resources = kc.iter_resources(token, page_size=2)
+    assert next(resources) == fake.resources[0]
+    assert list(resources) == fake.resources[1:]
+    assert fake.requests["resource_set"] == 3
+
+
+def test_iter_resources_prefetch(fake_client):
+    fake, kc = fake_client
+    resources = kc.iter_resources(fake.token("akhil", 60), page_size=2)
+    assert next(resources) == fake.resources[0]
+    resources.close()
+    # the second page was prefetched, the third one is never requested
+    assert fake.requests["resource_set"] == 2
+
+
+def test_iter_resources_filters(fake_client):
+    fake, kc = fake_client
+    token = fake.token("akhil", 60)
+    albums = list(kc.iter_resources(token, page_size=2, type="urn:albums"))
+    assert [x["_id"] for x in albums] == ["1", "3"]
+    assert [x["_id"] for x in kc.iter_resources(token, uri="/albums/4")] == ["4"]
+    assert list(kc.iter_resources(token, name="album 2", owner="akhil")) == [
+        fake.resources[2]
+    ]
+    assert list(kc.iter_resources(token, owner="unknown")) == []
+    # resources registered without an owner
+    fake.resources.append({"_id": "9", "name": "Orphan", "uris": []})
+    assert len(list(kc.iter_resources(token, owner="akhil"))) == 5
+
+
+@patch("keycloak.core.resource.ResourceMixin.find_resource")
+@patch("keycloak.core.transport.httpx.Client.get")
+def test_iter_resources_fallback(mock_get, mock_find_resource, kc_client):
+    mock_get.return_value.json.side_effect = [["1", "2"], ["3"]]
+    mock_find_resource.side_effect = lambda x, _: {"_id": x}
+    resources = list(kc_client.iter_resources("token123456789", page_size=2))
+    assert resources == [{"_id": "1"}, {"_id": "2"}, {"_id": "3"}]
+    assert mock_get.call_args.kwargs["params"] == {
+        "deep": "true",
+        "first": 2,
+        "max": 2,
+    }
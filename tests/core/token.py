@@ -1,25 +1,106 @@
 # -*- coding: utf-8 -*-
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import MagicMock, patch
 
+import httpx
 import pytest
+from jose import JWTError
 from requests.exceptions import HTTPError
 
-from keycloak.utils import basic_auth
+from keycloak import Client
+from keycloak.cache import TTLCache
+from keycloak.config import Client as ClientConfig
+from keycloak.config import Config
+from keycloak.snapshot import Snapshot
+from keycloak.store import MemoryTokenStore
+from keycloak.testing import FakeKeycloak
+from keycloak.utils import b64encode, basic_auth
+
+
+def make_token(header):
+    header = b64encode(header, serialize=True).replace("+", "-").replace("/", "_")
+    return f"{header.rstrip('=')}.cGF5bG9hZA.c2lnbmF0dXJl"
 
 
 @patch("keycloak.core.token.jwt.decode")
 def test_decode(mock_decode, kc_client, kc_config):
     """Test case for decode"""
-    token = "header.payload.signature"
+    kid = kc_client.jwks[0]["kid"]
+    token = make_token({"alg": "RS256", "kid": kid})
+    kc_client.decode(token)
+    key = kc_client.keyset.get(kid, "RS256")
+    assert key is not None
+    mock_decode.assert_called_once_with(
+        token,
+        key,
+        algorithms="RS256",
+        issuer=kc_config.openid.issuer,
+        audience=kc_config.client.client_id,
+    )
+
+
+@patch("keycloak.core.token.jwt.decode")
+def test_decode_unknown_kid(mock_decode, kc_client, kc_config):
+    token = make_token({"alg": "RS256", "kid": "unknown"})
     kc_client.decode(token)
     mock_decode.assert_called_once_with(
         token,
         kc_client.jwks,
+        algorithms="RS256",
         issuer=kc_config.openid.issuer,
         audience=kc_config.client.client_id,
     )
 
 
+@patch("keycloak.core.token.jwt.decode")
+def test_decode_cached(mock_decode, kc_client):
+    kc_client.token_cache = TTLCache(10)
+    mock_decode.return_value = {"sub": "user", "exp": time.time() + 60}
+    token = make_token({"alg": "RS256", "kid": kc_client.jwks[0]["kid"]})
+    assert kc_client.decode(token) == mock_decode.return_value
+    assert kc_client.decode(token) == mock_decode.return_value
+    assert mock_decode.call_count == 1
+    assert kc_client.token_cache.hits == 1
+    assert kc_client.token_cache.misses == 1
+    del kc_client.token_cache
+
+
+@patch("keycloak.core.token.jwt.decode")
+def test_decode_cache_skew(mock_decode, kc_client):
+    kc_client.token_cache = TTLCache(10)
+    mock_decode.return_value = {"sub": "user", "exp": time.time() + 1}
+    token = make_token({"alg": "RS256", "kid": kc_client.jwks[0]["kid"]})
+    kc_client.decode(token)
+    kc_client.decode(token)
+    assert mock_decode.call_count == 2
+    del kc_client.token_cache
+
+
+@patch("keycloak.core.token.threading.Thread")
+def test_jwks_snapshot(mock_thread, kc_client, kc_config, monkeypatch, tmp_path):
+    snapshot = Snapshot(str(tmp_path / "snapshot.json"))
+    snapshot.put("jwks", [{"kid": "snapshot", "kty": "oct", "k": "c2VjcmV0"}])
+    monkeypatch.setitem(vars(kc_config), "snapshot", snapshot)
+    vars(kc_client).pop("jwks_manager", None)
+    assert kc_client.jwks == [{"kid": "snapshot", "kty": "oct", "k": "c2VjcmV0"}]
+    mock_thread.assert_called_once_with(
+        target=kc_client.jwks_manager.refresh, daemon=True
+    )
+    mock_thread.return_value.start.assert_called_once_with()
+    vars(kc_client).pop("jwks_manager")
+
+
+def test_keyset(kc_client):
+    kid = kc_client.jwks[0]["kid"]
+    key = kc_client.keyset.get(kid, "RS256")
+    assert kid in kc_client.keyset
+    assert kc_client.keyset.get(kid, "RS256") is key
+    assert kc_client.keyset.get(kid, "RS512") is None
+    assert kc_client.keyset.get("unknown", "RS256") is None
+
+
 def test_tokens_setter(kc_client):
     kc_client.tokens = {"name": "akhil"}
     assert kc_client._tokens == {"name": "akhil"}
@@ -40,7 +121,7 @@ def test_tokens_valid(mock_pat, kc_client):
 
 
 @patch("keycloak.core.token.log.debug")
-@patch("keycloak.core.token.httpx.post")
+@patch("keycloak.core.transport.httpx.Client.post")
 @patch("keycloak.core.token.basic_auth")
 def test_refresh_tokens_success(mock_auth, mock_post, mock_debug, kc_client, kc_config):
     headers = basic_auth(kc_config.client.client_id, kc_config.client.client_secret)
@@ -62,7 +143,7 @@ def test_refresh_tokens_success(mock_auth, mock_post, mock_debug, kc_client, kc_
 
 
 @patch("keycloak.core.token.log.exception")
-@patch("keycloak.core.token.httpx.post")
+@patch("keycloak.core.transport.httpx.Client.post")
 @patch("keycloak.core.token.basic_auth")
 def test_refresh_tokens_failure(
     mock_auth, mock_post, mock_exception, kc_client, kc_config
@@ -85,3 +166,178 @@ def test_refresh_tokens_failure(
     mock_post.assert_called_once_with(
         kc_config.uma2.token_endpoint, data=payload, headers=headers
     )
+
+
+@patch("keycloak.core.authorization.AuthorizationMixin.pat")
+@patch("keycloak.core.token.TokenMixin.refresh_tokens")
+def test_renew_tokens_with_refresh_token(mock_refresh, mock_pat, kc_client):
+    kc_client.tokens = {"refresh_token": "token0123456789", "refresh_expires_in": 60}
+    kc_client.renew_tokens()
+    mock_refresh.assert_called_once()
+    mock_pat.assert_not_called()
+
+
+@patch("keycloak.core.authorization.AuthorizationMixin.pat")
+@patch("keycloak.core.token.TokenMixin.refresh_tokens")
+def test_renew_tokens_new_grant(mock_refresh, mock_pat, kc_client):
+    mock_refresh.side_effect = HTTPError
+    mock_pat.return_value = {"access_token": "token0123456789", "expires_in": 60}
+    kc_client.tokens = {"refresh_token": "token0123456789", "refresh_expires_in": 60}
+    kc_client.renew_tokens()
+    mock_refresh.assert_called_once()
+    mock_pat.assert_called_once_with(None, None)
+    assert kc_client.access_token == "token0123456789"
+
+
+@patch("keycloak.core.authorization.AuthorizationMixin.pat")
+@patch("keycloak.core.token.TokenMixin.refresh_tokens")
+def test_renew_tokens_refresh_token_expired(mock_refresh, mock_pat, kc_client):
+    mock_pat.return_value = {"access_token": "token0123456789"}
+    kc_client.tokens = {"refresh_token": "token0123456789", "refresh_expires_in": 60}
+    kc_client._refresh_token_expires_at = time.monotonic() - 1
+    kc_client.renew_tokens()
+    mock_refresh.assert_not_called()
+    mock_pat.assert_called_once_with(None, None)
+
+
+@patch("keycloak.core.authorization.AuthorizationMixin.pat")
+def test_tokens_expired(mock_pat, kc_client):
+    mock_pat.return_value = {"access_token": "new0123456789", "expires_in": 60}
+    kc_client.tokens = {"access_token": "old0123456789", "expires_in": 60}
+    assert kc_client.access_token == "old0123456789"
+    kc_client._tokens_expire_at = time.monotonic() - 1
+    assert kc_client.tokens_expired
+    assert kc_client.access_token == "new0123456789"
+    mock_pat.assert_called_once_with(None, None)
+
+
+@patch("keycloak.core.token.threading.Timer")
+def test_auto_refresh(mock_timer, kc_client):
+    kc_client.auto_refresh = True
+    kc_client.tokens = {"access_token": "token0123456789", "expires_in": 60}
+    mock_timer.assert_called_once_with(50.0, kc_client._background_refresh)
+    mock_timer.return_value.start.assert_called_once()
+    kc_client.close()
+    mock_timer.return_value.cancel.assert_called_once()
+    kc_client.auto_refresh = False
+
+
+@pytest.fixture()
+def token_store(kc_client):
+    kc_client.token_store = MemoryTokenStore(10)
+    yield kc_client.token_store
+    del kc_client.token_store
+
+
+@patch("keycloak.core.token.TokenMixin.refresh")
+def test_load_tokens(mock_refresh, token_store, kc_client):
+    tokens = {"access_token": "a", "refresh_token": "r", "expires_in": 60}
+    kc_client.save_tokens("session", tokens)
+    assert kc_client.load_tokens("session") == tokens
+    assert kc_client.load_tokens("unknown") is None
+    kc_client.discard_tokens("session")
+    assert kc_client.load_tokens("session") is None
+    mock_refresh.assert_not_called()
+
+
+@patch("keycloak.core.token.TokenMixin.refresh")
+def test_load_tokens_expired(mock_refresh, token_store, kc_client):
+    mock_refresh.return_value = {"access_token": "b", "expires_in": 60}
+    kc_client.save_tokens("session", {"access_token": "a", "refresh_token": "r"})
+    token_store.get("session")["expires_at"] = time.time()
+    assert kc_client.load_tokens("session") == mock_refresh.return_value
+    assert kc_client.load_tokens("session") == mock_refresh.return_value
+    mock_refresh.assert_called_once_with("r")
+
+
+@patch("keycloak.core.token.TokenMixin.refresh")
+def test_load_tokens_revoked(mock_refresh, token_store, kc_client):
+    response = httpx.Response(400, request=httpx.Request("POST", "http://kc"))
+    mock_refresh.side_effect = httpx.HTTPStatusError(
+        "invalid_grant", request=response.request, response=response
+    )
+    kc_client.save_tokens("session", {"access_token": "a", "refresh_token": "r"})
+    token_store.get("session")["expires_at"] = time.time()
+    assert kc_client.load_tokens("session") is None
+    assert token_store.get("session") is None
+
+
+@patch("keycloak.core.token.TokenMixin.refresh")
+def test_load_tokens_unavailable(mock_refresh, token_store, kc_client):
+    mock_refresh.side_effect = httpx.ConnectError("connection refused")
+    kc_client.save_tokens("session", {"access_token": "a", "refresh_token": "r"})
+    token_store.get("session")["expires_at"] = time.time()
+    with pytest.raises(httpx.ConnectError):
+        kc_client.load_tokens("session")
+    assert token_store.get("session") is not None
+    kc_client.save_tokens("other", {"access_token": "a", "expires_in": 1})
+    token_store.get("other")["expires_at"] = time.time()
+    assert kc_client.load_tokens("other") is None
+
+
+@patch("keycloak.core.token.TokenMixin.refresh")
+def test_load_tokens_coalesced(mock_refresh, token_store, kc_client):
+    started = threading.Event()
+
+    def refresh(refresh_token):
+        started.set()
+        time.sleep(0.05)
+        return {"access_token": "b", "refresh_token": "r2", "expires_in": 60}
+
+    mock_refresh.side_effect = refresh
+    kc_client.save_tokens("session", {"access_token": "a", "refresh_token": "r"})
+    token_store.get("session")["expires_at"] = time.time()
+    with ThreadPoolExecutor(4) as executor:
+        results = list(executor.map(kc_client.load_tokens, ["session"] * 4))
+    assert all(x["access_token"] == "b" for x in results)
+    mock_refresh.assert_called_once_with("r")
+
+
+@pytest.fixture()
+def fake_client(monkeypatch):
+    # verify real tokens signed by the fake server
+    monkeypatch.undo()
+    fake = FakeKeycloak()
+    config = Config(ClientConfig(**fake.settings))
+    config.transport = fake.transport
+    with Client.create(config=config, transport=fake.transport) as kc:
+        yield fake, kc
+    config.close()
+
+
+def test_rpt_permissions(fake_client):
+    fake, kc = fake_client
+    permissions = [{"rsid": "1a2b", "rsname": "Album", "scopes": ["view"]}]
+    rpt = fake.tokens("akhil", permissions)["access_token"]
+    assert kc.has_permission(rpt, "Album", "view")
+    assert kc.has_permission(rpt, "1a2b")
+    assert not kc.has_permission(rpt, "Album", "delete")
+    assert not kc.rpt_permissions(fake.token("akhil", 60)).allows("Album")
+    forged = fake.token("akhil", 60, authorization={"permissions": permissions})
+    with pytest.raises(JWTError):
+        kc.has_permission(forged[:-4] + "AAAA", "Album", "view")
+
+
+def test_rpt_permissions_cached(fake_client):
+    fake, kc = fake_client
+    kc.token_cache = TTLCache(10)
+    rpt = fake.tokens("akhil", [{"rsid": "1a2b", "rsname": "Album"}])["access_token"]
+    with patch.object(kc, "decode", wraps=kc.decode) as mock_decode:
+        assert kc.has_permission(rpt, "Album")
+        assert kc.has_permission(rpt, "1a2b")
+    mock_decode.assert_called_once_with(rpt)
+
+
+def test_subject(fake_client):
+    fake, kc = fake_client
+    token = fake.token("akhil", 60, aud="account")
+    assert kc.subject(token) == "akhil"
+    with pytest.raises(JWTError):
+        kc.decode(token)
+    with pytest.raises(JWTError):
+        kc.subject(fake.token("akhil", -60))
+    kc.token_cache = TTLCache(10)
+    with patch.object(kc, "verify", wraps=kc.verify) as mock_verify:
+        assert kc.subject(token) == "akhil"
+        assert kc.subject(token) == "akhil"
+    mock_verify.assert_called_once_with(token)
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+from unittest.mock import patch
+
+import httpx
+
+
+def test_http_reused(kc_client):
+    kc_client.close()
+    http = kc_client.http
+    assert isinstance(http, httpx.Client)
+    assert kc_client.http is http
+
+
+def test_http_reopened_after_close(kc_client):
+    http = kc_client.http
+    kc_client.close()
+    assert http.is_closed
+    assert kc_client.http is not http
+    assert not kc_client.http.is_closed
+
+
+def test_http_settings(kc_client):
+    kc_client.close()
+    with patch("keycloak.core.transport.httpx.Client") as mock_client:
+        mock_client.return_value.is_closed = False
+        kc_client.http
+        mock_client.assert_called_once_with(
+            timeout=kc_client.timeout,
+            limits=kc_client.limits,
+            http2=kc_client.http2,
+            transport=kc_client.transport,
+        )
+    kc_client._http = None
+
+
+def test_custom_transport(kc_client):
+    kc_client.close()
+    kc_client.transport = httpx.MockTransport(lambda request: httpx.Response(204))
+    assert kc_client.http.get("http://keycloak/").status_code == 204
+    kc_client.close()
+    del kc_client.transport
+
+
+def test_context_manager(kc_client):
+    with kc_client as kc:
+        http = kc.http
+        assert kc is kc_client
+    assert http.is_closed
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import httpx
+import pytest
+
+from keycloak import Client
+from keycloak.cache import TTLCache
+from keycloak.config import Client as ClientConfig
+from keycloak.config import Config
+from keycloak.constants import EnforcementModes
+from keycloak.enforcer import AsyncPolicyEnforcer, PolicyEnforcer
+from keycloak.testing import FakeKeycloak
+
+settings = {
+    "enforcement-mode": "ENFORCING",
+    "paths": [
+        {
+            "path": "/albums/{id}",
+            "name": "Album",
+            "methods": [{"method": "DELETE", "scopes": ["delete"]}],
+            "scopes": ["view"],
+        },
+        {"path": "/static/*", "enforcement-mode": "DISABLED"},
+        {"path": "/reports/*", "name": "Report", "enforcement-mode": "PERMISSIVE"},
+    ],
+}
+
+
+def unauthorized():
+    request = httpx.Request("POST", "https://keycloak-server.com/token")
+    response = httpx.Response(401, request=request)
+    return httpx.HTTPStatusError("unauthorized", request=request, response=response)
+
+
+@pytest.fixture()
+def kc():
+    return MagicMock(decision_cache=None)
+
+
+def test_decision_cache(kc):
+    enforcer = PolicyEnforcer(kc, settings)
+    assert isinstance(enforcer.decision_cache, TTLCache)
+    # the cache of the client is left untouched
+    assert kc.decision_cache is None
+    assert PolicyEnforcer(kc, {}).decision_cache is None
+
+
+def test_resolve(kc):
+    enforcer = PolicyEnforcer(kc, settings)
+    mode, match = enforcer.resolve("/albums/42", "DELETE")
+    assert mode == EnforcementModes.enforcing
+    assert enforcer.permissions(match.resource, match.scopes) == [("Album", "delete")]
+    assert enforcer.permissions("Album", []) == [("Album", None)]
+    assert enforcer.resolve("/unknown", "GET") == (EnforcementModes.enforcing, None)
+    assert enforcer.disabled("/static/app.js", "GET")
+    assert not enforcer.disabled("/albums/42", "GET")
+
+
+def test_authorize(kc):
+    enforcer = PolicyEnforcer(kc, settings)
+    kc.check_permissions.return_value = {("Album", "view"): True}
+    assert enforcer.authorize("token", "/albums/42", "GET") is True
+    kc.check_permissions.assert_called_once_with(
+        "token", [("Album", "view")], decision_cache=enforcer.decision_cache
+    )
+    kc.check_permissions.return_value = {("Album", "delete"): False}
+    assert enforcer.authorize("token", "/albums/42", "DELETE") is False
+    assert enforcer.authorize("token", "/unknown", "GET") is False
+    assert enforcer.authorize("token", "/static/app.js", "GET") is True
+
+
+def test_authorize_permissive(kc):
+    enforcer = PolicyEnforcer(kc, settings)
+    kc.check_permissions.return_value = {("Report", None): False}
+    assert enforcer.authorize("token", "/reports/2024", "GET") is True
+    kc.check_permissions.assert_called_once_with(
+        "token", [("Report", None)], decision_cache=enforcer.decision_cache
+    )
+    enforcer = PolicyEnforcer(kc, {**settings, "enforcement-mode": "permissive"})
+    assert enforcer.authorize("token", "/unknown", "GET") is True
+
+
+def test_authorize_rejected(kc):
+    enforcer = PolicyEnforcer(kc, settings)
+    kc.check_permissions.side_effect = unauthorized()
+    assert enforcer.authorize("token", "/albums/42", "GET") is None
+    kc.check_permissions.side_effect = httpx.ConnectError("connection refused")
+    with pytest.raises(httpx.ConnectError):
+        enforcer.authorize("token", "/albums/42", "GET")
+
+
+def test_disabled(kc):
+    kc.config.client.policy_enforcer = {}
+    enforcer = PolicyEnforcer(kc)
+    assert not enforcer.enabled
+    assert not enforcer.disabled("/static/app.js", "GET")
+    assert enforcer.authorize("token", "/albums/42", "GET") is True
+    enforcer = PolicyEnforcer(kc, {**settings, "enforcement-mode": "DISABLED"})
+    assert not enforcer.enabled
+    kc.check_permissions.assert_not_called()
+
+
+def test_client_settings(kc):
+    kc.config.client.policy_enforcer = settings
+    enforcer = PolicyEnforcer(kc)
+    assert enforcer.enabled
+    assert enforcer.matcher is kc.path_matcher
+
+
+def test_async_authorize():
+    kc = MagicMock(decision_cache=None)
+    kc.check_permissions = AsyncMock(return_value={("Album", "delete"): False})
+    enforcer = AsyncPolicyEnforcer(kc, settings)
+    assert asyncio.run(enforcer.authorize("token", "/albums/42", "DELETE")) is False
+    assert asyncio.run(enforcer.authorize("token", "/static/app.js", "GET")) is True
+    kc.check_permissions.side_effect = unauthorized()
+    assert asyncio.run(enforcer.authorize("token", "/albums/42", "GET")) is None
+
+
+def test_authorize_fake_keycloak(monkeypatch):
+    # verify real tokens signed by the fake server
+    monkeypatch.undo()
+    album = {"_id": "1a2b", "name": "Album", "resource_scopes": ["view", "delete"]}
+    fake = FakeKeycloak(resources=[album])
+    config = Config(ClientConfig(**fake.settings))
+    config.transport = fake.transport
+    with Client.create(config=config, transport=fake.transport) as kc:
+        enforcer = PolicyEnforcer(kc, settings)
+        # user tokens often name the client in azp only
+        token = fake.token("akhil", 60, aud="account")
+        assert enforcer.authorize(token, "/albums/42", "GET") is True
+        assert enforcer.authorize(token, "/albums/42", "GET") is True
+        assert fake.requests["token"] == 1
+        assert kc.decision_cache is None
+        expired = fake.token("akhil", -60)
+        assert enforcer.authorize(expired, "/albums/42", "DELETE") is None
+    config.close()
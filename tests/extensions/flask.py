@@ -7,8 +7,15 @@ from keycloak.constants import GrantTypes
 from keycloak.extensions.flask import AuthenticationMiddleware
 from keycloak.utils import auth_header
 
+policy_enforcer = {
+    "paths": [
+        {"path": "/howdy", "name": "Howdy", "scopes": ["view"]},
+        {"path": "/static/*", "enforcement-mode": "DISABLED"},
+    ],
+}
 
-def get_app():
+
+def get_app(**kwargs):
     app = Flask(__name__)
     app.config["SECRET_KEY"] = "secret0123456789"
     app.wsgi_app = AuthenticationMiddleware(
@@ -18,6 +25,7 @@ def get_app():
         callback_url="http://testserver/kc/callback",
         login_redirect_uri="/howdy",
         logout_redirect_uri="/logout",
+        **kwargs,
     )
 
     @app.route("/howdy")
@@ -28,6 +36,10 @@ def get_app():
     def logout():
         return "Logged out!"
 
+    @app.route("/static/app.js")
+    def static_file():
+        return "app"
+
     return app
 
 
@@ -39,8 +51,8 @@ def test_login():
     assert "https://keycloak-server.com/" in response.headers["Location"]
 
 
-@patch("keycloak.core.authentication.httpx.get")
-@patch("keycloak.core.authentication.httpx.post")
+@patch("keycloak.core.transport.httpx.Client.get")
+@patch("keycloak.core.transport.httpx.Client.post")
 @patch("keycloak.core.authentication.uuid4")
 @patch.object(AuthenticationMiddleware, "session_interface", new_callable=PropertyMock)
 def test_callback(mock_session_interface, mock_uuid4, mock_post, mock_get, kc_config):
@@ -50,9 +62,9 @@ def test_callback(mock_session_interface, mock_uuid4, mock_post, mock_get, kc_co
     }
     mock_uuid4.return_value = MagicMock()
     mock_uuid4.return_value.hex.return_value = "0123456789"
-    mock_post.return_value = MagicMock()
+    mock_post.return_value = MagicMock(status_code=200)
     mock_post.return_value.json.return_value = {"access_token": "token123"}
-    mock_get.return_value = MagicMock()
+    mock_get.return_value = MagicMock(status_code=200)
     mock_get.return_value.json.return_value = {"name": "123"}
     token_endpoint_payload = {
         "code": "code123",
@@ -102,3 +114,22 @@ def test_valid_request(mock_session_interface):
     response = client.get("/howdy")
     assert response.status_code == 200
     assert response.data == b"Howdy!"
+
+
+@patch("keycloak.Client.check_permissions")
+@patch.object(AuthenticationMiddleware, "session_interface", new_callable=PropertyMock)
+def test_policy_enforcer(mock_session_interface, mock_check_permissions):
+    session = {"user": "user-data", "tokens": '{"access_token": "token123"}'}
+    mock_session_interface.return_value = MagicMock()
+    mock_session_interface.return_value.open_session.return_value = session
+    mock_check_permissions.return_value = {("Howdy", "view"): False}
+    app = get_app(policy_enforcer=policy_enforcer)
+    client = app.test_client()
+    response = client.get("/howdy")
+    assert response.status_code == 403
+    mock_check_permissions.assert_called_once()
+    assert mock_check_permissions.call_args.args == ("token123", [("Howdy", "view")])
+    mock_check_permissions.return_value = {("Howdy", "view"): True}
+    assert client.get("/howdy").data == b"Howdy!"
+    session.clear()
+    assert client.get("/static/app.js").data == b"app"
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from keycloak.instrumentation import Event
+
+pytest.importorskip("opentelemetry.sdk")
+
+from opentelemetry.sdk.trace import TracerProvider  # noqa: E402
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor  # noqa: E402
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (  # noqa: E402
+    InMemorySpanExporter,
+)
+from opentelemetry.trace import SpanKind, StatusCode  # noqa: E402
+
+from keycloak.extensions.opentelemetry import OpenTelemetryListener  # noqa: E402
+
+
+@pytest.fixture()
+def exporter():
+    return InMemorySpanExporter()
+
+
+@pytest.fixture()
+def provider(exporter):
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    return provider
+
+
+def test_span(provider, exporter):
+    listener = OpenTelemetryListener(provider)
+    event = Event("pat", "POST", "http://kc/token", 200, 512, 0.5, 1000.0)
+    listener(event)
+    (span,) = exporter.get_finished_spans()
+    assert span.name == "keycloak pat"
+    assert span.kind == SpanKind.CLIENT
+    assert span.start_time == 1000 * 10**9
+    assert span.end_time - span.start_time == 5 * 10**8
+    assert span.attributes["http.response.status_code"] == 200
+    assert span.attributes["url.full"] == "http://kc/token"
+    assert span.status.is_ok
+
+
+def test_span_error(provider, exporter):
+    listener = OpenTelemetryListener(provider)
+    listener(Event("pat", "POST", "http://kc/token", error=ValueError("boom")))
+    listener(Event("pat", "POST", "http://kc/token", 503))
+    first, second = exporter.get_finished_spans()
+    assert first.status.status_code == StatusCode.ERROR
+    assert first.events[0].name == "exception"
+    assert second.status.status_code == StatusCode.ERROR
+
+
+def test_cache_event(provider, exporter):
+    listener = OpenTelemetryListener(provider)
+    with provider.get_tracer(__name__).start_as_current_span("view"):
+        listener(Event("decode", cache="hit"))
+    (span,) = exporter.get_finished_spans()
+    assert span.events[0].attributes["keycloak.cache"] == "hit"
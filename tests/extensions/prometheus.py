@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from keycloak.instrumentation import Event
+
+prometheus_client = pytest.importorskip("prometheus_client")
+
+from keycloak.extensions.prometheus import PrometheusListener  # noqa: E402
+
+
+def test_prometheus_listener():
+    registry = prometheus_client.CollectorRegistry()
+    listener = PrometheusListener(registry=registry)
+    listener(Event("rpt", "POST", "http://kc/token", 200, 512, 0.02, retries=1))
+    listener(Event("rpt", "POST", "http://kc/token", None, error=ValueError()))
+    listener(Event("rpt", cache="hit"))
+    labels = {"operation": "rpt", "method": "POST", "status": "200"}
+    sample = registry.get_sample_value
+    assert sample("keycloak_client_request_duration_seconds_count", labels) == 1
+    assert sample("keycloak_client_request_duration_seconds_sum", labels) == 0.02
+    labels["status"] = "error"
+    assert sample("keycloak_client_request_duration_seconds_count", labels) == 1
+    assert sample("keycloak_client_response_bytes_total", {"operation": "rpt"}) == 512
+    assert sample("keycloak_client_request_retries_total", {"operation": "rpt"}) == 1
+    labels = {"operation": "rpt", "result": "hit"}
+    assert sample("keycloak_client_cache_lookups_total", labels) == 1
@@ -1,11 +1,15 @@
 # -*- coding: utf-8 -*-
-from unittest.mock import MagicMock, call, patch
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock, call, patch
 
 from starlette.applications import Starlette
 from starlette.middleware.sessions import SessionMiddleware
+from starlette.requests import Request
 from starlette.responses import PlainTextResponse
 from starlette.testclient import TestClient
 
+from keycloak import AsyncClient
 from keycloak.constants import GrantTypes
 from keycloak.extensions.starlette import AuthenticationMiddleware
 from keycloak.utils import auth_header
@@ -47,8 +51,8 @@ def test_kc_callback_invalid_state():
         assert response.content == b"Invalid state"
 
 
-@patch("keycloak.core.asynchronous.authentication.httpx.AsyncClient.get")
-@patch("keycloak.core.asynchronous.authentication.httpx.AsyncClient.post")
+@patch("keycloak.core.asynchronous.transport.httpx.AsyncClient.get")
+@patch("keycloak.core.asynchronous.transport.httpx.AsyncClient.post")
 @patch("starlette.endpoints.Request")
 def test_kc_callback(mock_request, mock_post, mock_get, kc_config):
     mock_request.return_value = MagicMock()
@@ -102,3 +106,35 @@ def test_login_success(mock_request):
         response = client.get("/howdy", follow_redirects=False)
         assert response.status_code == 200
         assert response.content == b"Howdy!"
+
+
+def test_lifespan():
+    kc = AsyncClient()
+    with TestClient(app):
+        http = kc.http
+        assert not http.is_closed
+    assert http.is_closed
+
+
+def test_enforce_rejected():
+    middleware = AuthenticationMiddleware(app, policy_enforcer={"paths": []})
+    middleware.enforcer.authorize = AsyncMock(return_value=None)
+    tokens = json.dumps({"access_token": "token123", "refresh_token": "token123"})
+    session = {"tokens": tokens, "user": "{}"}
+    request = Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/howdy",
+            "headers": [],
+            "query_string": b"",
+            "session": session,
+        }
+    )
+    url = "http://localhost:8080/auth/login"
+    with patch.object(AsyncClient, "login", AsyncMock(return_value=(url, "state123"))):
+        response = asyncio.run(middleware.enforce(request))
+    # the user logs in again instead of being redirected to the same page
+    assert response.status_code == 307
+    assert response.headers["location"] == url
+    assert session == {"state": "state123"}
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+# cold import time allowed for `import keycloak`, in seconds
+IMPORT_BUDGET = 0.05
+
+root = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+
+def run(code):
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        check=True,
+        cwd=root,
+        text=True,
+    )
+    return json.loads(result.stdout)
+
+
+def loaded_modules(statement):
+    return run(f"import json, sys; {statement}; print(json.dumps(list(sys.modules)))")
+
+
+def test_import_is_lazy():
+    modules = loaded_modules("import keycloak")
+    for name in ("httpx", "jose", "requests", "keycloak.config", "keycloak.core"):
+        assert name not in modules
+
+
+def test_sync_client_skips_async_stack():
+    modules = loaded_modules("from keycloak import Client")
+    assert "keycloak.core.client" in modules
+    assert "keycloak.core.asynchronous" not in modules
+    assert "requests" not in modules
+
+
+def test_async_client_skips_sync_stack():
+    modules = loaded_modules("from keycloak import AsyncClient")
+    assert "keycloak.core.asynchronous.client" in modules
+    assert "keycloak.core.client" not in modules
+    assert "keycloak.core.token" not in modules
+
+
+def test_import_time():
+    code = (
+        "import json, time; start = time.perf_counter(); import keycloak; "
+        "print(json.dumps(time.perf_counter() - start))"
+    )
+    elapsed = min(run(code) for _ in range(5))
+    assert elapsed < IMPORT_BUDGET
+
+
+def test_unknown_attribute():
+    import keycloak
+
+    assert "Client" in dir(keycloak)
+    with pytest.raises(AttributeError):
+        keycloak.Unknown
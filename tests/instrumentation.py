@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import time
+from unittest.mock import MagicMock, patch
+
+import httpx
+import pytest
+
+from keycloak import AsyncClient, instrumentation
+from keycloak.cache import TTLCache
+from keycloak.instrumentation import Event
+from keycloak.retry import RetryPolicy
+
+from .conftest import uma2
+
+introspection = {"active": True, "exp": int(time.time()) + 60}
+
+
+def respond(request):
+    return httpx.Response(200, json=introspection)
+
+
+@pytest.fixture()
+def events():
+    recorded = []
+    instrumentation.add_listener(recorded.append)
+    yield recorded
+    instrumentation.remove_listener(recorded.append)
+
+
+@pytest.fixture()
+def kc(kc_client):
+    kc_client.close()
+    kc_client.transport = httpx.MockTransport(respond)
+    kc_client.retry_policy = RetryPolicy(retries=0)
+    yield kc_client
+    kc_client.close()
+    del kc_client.transport
+    kc_client.retry_policy = RetryPolicy()
+
+
+def test_listeners():
+    listener = MagicMock()
+    assert not instrumentation.enabled()
+    instrumentation.add_listener(listener)
+    instrumentation.add_listener(listener)
+    assert instrumentation.enabled()
+    instrumentation.emit(Event("pat"))
+    listener.assert_called_once_with(Event("pat"))
+    instrumentation.remove_listener(listener)
+    assert not instrumentation.enabled()
+
+
+def test_listener_errors(events):
+    failing = MagicMock(side_effect=ValueError)
+    instrumentation.add_listener(failing)
+    instrumentation.emit(Event("pat"))
+    instrumentation.remove_listener(failing)
+    assert events == [Event("pat")]
+
+
+@patch("keycloak.instrumentation.Event")
+def test_disabled(mock_event, kc):
+    assert kc.introspect("rpt") == introspection
+    mock_event.assert_not_called()
+
+
+def test_request(events, kc):
+    kc.introspect("rpt")
+    (event,) = events
+    assert event.operation == "introspect"
+    assert event.method == "POST"
+    assert event.endpoint == uma2.introspection_endpoint
+    assert event.status == 200
+    assert event.bytes == len(httpx.Response(200, json=introspection).content)
+    assert event.duration >= 0
+    assert event.started <= time.time()
+    assert event.cache is None
+    assert event.error is None
+
+
+def test_request_error(events, kc):
+    error = httpx.ConnectError("connection refused")
+    kc.close()
+    kc.transport = httpx.MockTransport(MagicMock(side_effect=error))
+    with pytest.raises(httpx.ConnectError):
+        kc.introspect("rpt")
+    (event,) = events
+    assert event.status is None
+    assert event.error is error
+
+
+def test_cache(events, kc):
+    kc.introspection_cache = TTLCache(10)
+    try:
+        kc.introspect("rpt")
+        kc.introspect("rpt")
+    finally:
+        del kc.introspection_cache
+    miss, hit = events
+    assert (miss.method, miss.cache) == ("POST", "miss")
+    assert (hit.operation, hit.method, hit.cache) == ("introspect", None, "hit")
+
+
+def test_async_request(events):
+    async def run():
+        kc = AsyncClient()
+        await kc.aclose()
+        kc.transport = httpx.MockTransport(respond)
+        try:
+            return await kc.introspect("rpt")
+        finally:
+            await kc.aclose()
+            del kc.transport
+
+    assert asyncio.run(run()) == introspection
+    (event,) = events
+    assert (event.operation, event.method, event.status) == ("introspect", "POST", 200)
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from keycloak.jwks import AsyncJWKSManager, JWKSManager, KeySet
+
+from .conftest import jwks
+
+
+def test_keyset():
+    kid = jwks[0]["kid"]
+    keyset = KeySet(jwks)
+    key = keyset.get(kid, "RS256")
+    assert key is not None
+    assert kid in keyset
+    assert keyset.get(kid, "RS256") is key
+    assert keyset.get(kid, "RS512") is None
+    assert keyset.get("unknown", "RS256") is None
+
+
+def test_manager_ttl():
+    fetch = MagicMock(return_value=(jwks, None))
+    manager = JWKSManager(fetch, ttl=0)
+    manager.get_keyset()
+    manager.get_keyset()
+    assert fetch.call_count == 2
+
+
+def test_manager_max_age():
+    fetch = MagicMock(return_value=(jwks, 0.0))
+    manager = JWKSManager(fetch, ttl=300)
+    manager.get_keyset()
+    manager.get_keyset()
+    assert fetch.call_count == 2
+
+
+def test_manager_cached():
+    fetch = MagicMock(return_value=(jwks, None))
+    manager = JWKSManager(fetch)
+    keyset = manager.get_keyset()
+    assert manager.get_keyset() is keyset
+    assert fetch.call_count == 1
+
+
+def test_manager_unknown_kid():
+    fetch = MagicMock(return_value=(jwks, None))
+    manager = JWKSManager(fetch, min_refresh_interval=0)
+    assert manager.get_key("unknown", "RS256") is None
+    assert fetch.call_count == 2
+
+
+def test_manager_unknown_kid_throttled():
+    fetch = MagicMock(return_value=(jwks, None))
+    manager = JWKSManager(fetch)
+    assert manager.get_key("unknown", "RS256") is None
+    assert manager.get_key("unknown", "RS256") is None
+    assert fetch.call_count == 1
+
+
+def test_manager_keeps_stale_keys():
+    fetch = MagicMock(side_effect=[(jwks, None), ValueError("unavailable")])
+    manager = JWKSManager(fetch, ttl=0)
+    keyset = manager.get_keyset()
+    assert manager.get_keyset() is keyset
+    assert not manager.expired
+
+
+def test_manager_failure():
+    fetch = MagicMock(side_effect=ValueError("unavailable"))
+    manager = JWKSManager(fetch)
+    with pytest.raises(ValueError):
+        manager.get_keyset()
+
+
+def test_manager_single_flight():
+    def fetch():
+        time.sleep(0.05)
+        return jwks, None
+
+    mock_fetch = MagicMock(side_effect=fetch)
+    manager = JWKSManager(mock_fetch)
+    threads = [threading.Thread(target=manager.get_keyset) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert mock_fetch.call_count == 1
+
+
+def test_async_manager_single_flight():
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return jwks, None
+
+    async def run():
+        manager = AsyncJWKSManager(fetch)
+        return await asyncio.gather(*[manager.get_keyset() for _ in range(10)])
+
+    keysets = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(x is keysets[0] for x in keysets)
+
+
+def test_manager_stale_while_revalidate():
+    release = threading.Event()
+
+    def fetch():
+        if mock_fetch.call_count > 1:
+            release.wait(1)
+        return jwks, None
+
+    mock_fetch = MagicMock(side_effect=fetch)
+    manager = JWKSManager(mock_fetch, ttl=0, stale_ttl=60)
+    keyset = manager.get_keyset()
+    assert manager.expired and manager.stale
+    assert manager.get_keyset() is keyset
+    release.set()
+    manager._revalidation.join()
+    assert mock_fetch.call_count == 2
+    assert manager._keyset is not keyset
+
+
+def test_manager_stale_expired():
+    fetch = MagicMock(return_value=(jwks, None))
+    manager = JWKSManager(fetch, ttl=0, stale_ttl=0)
+    manager.get_keyset()
+    assert not manager.stale
+    manager.get_keyset()
+    assert fetch.call_count == 2
+
+
+def test_async_manager_stale_while_revalidate():
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return jwks, None
+
+    async def run():
+        manager = AsyncJWKSManager(fetch, ttl=0, stale_ttl=60)
+        keyset = await manager.get_keyset()
+        assert await manager.get_keyset() is keyset
+        await manager._revalidation
+        return await manager.get_keyset() is not keyset
+
+    assert asyncio.run(run())
+    assert len(calls) == 3
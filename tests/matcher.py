@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+import threading
+
+import pytest
+
+from keycloak.constants import EnforcementModes
+from keycloak.matcher import PathConfig, PathMatcher
+
+settings = {
+    "paths": [
+        {
+            "name": "Album",
+            "path": "/albums/{id}",
+            "methods": [
+                {"method": "GET", "scopes": ["view"]},
+                {"method": "delete", "scopes": ["delete"]},
+            ],
+        },
+        {"name": "Albums", "path": "/albums/*"},
+        {"name": "Mine", "path": "/albums/mine"},
+        {"name": "Photo", "path": "/albums/{album}/photos/{photo}", "scopes": ["view"]},
+        {"name": "Static", "path": "/static/*", "enforcement-mode": "disabled"},
+    ]
+}
+
+
+@pytest.fixture()
+def matcher():
+    return PathMatcher.from_settings(settings)
+
+
+@pytest.mark.parametrize(
+    "path, method, resource, scopes",
+    [
+        ("/albums/42", "GET", "Album", ["view"]),
+        ("/albums/42", "DELETE", "Album", ["delete"]),
+        ("/albums/42", "PUT", "Album", []),
+        ("/albums/mine", "GET", "Mine", []),
+        ("/albums/42/photos/7", "GET", "Photo", ["view"]),
+        ("/albums/42/photos", "GET", "Albums", []),
+        ("/albums", "GET", "Albums", []),
+        ("/albums/42?page=2", "GET", "Album", ["view"]),
+    ],
+)
+def test_match(matcher, path, method, resource, scopes):
+    match = matcher.match(path, method)
+    assert (match.resource, match.scopes) == (resource, scopes)
+
+
+def test_match_params(matcher):
+    assert matcher.match("/albums/42/photos/7").params == {"album": "42", "photo": "7"}
+    assert matcher.match("/static/css/app.css").config.enforcement_mode == (
+        EnforcementModes.disabled
+    )
+    assert matcher.match("/") is None
+    assert matcher.match("/users/42") is None
+
+
+def test_add_remove(matcher):
+    config = PathConfig("/users/*/profile", name="Profile")
+    matcher.add(config)
+    assert matcher.match("/users/42/profile").resource == "Profile"
+    matcher.add(PathConfig("/users/*/profile", name="Account"))
+    assert matcher.match("/users/42/profile").resource == "Account"
+    matcher.remove(config)
+    assert matcher.match("/users/42/profile") is None
+    matcher.remove(PathConfig("/unknown/path"))
+
+
+def test_update_resources(matcher):
+    default = {"_id": "1a2b", "name": "Default Resource", "uris": ["/*"]}
+    album = {"_id": "3c4d", "name": "Album", "uris": ["/albums/{id}", "/covers/*"]}
+    matcher.update_resources([default, album])
+    assert matcher.match("/users/42").resource == "1a2b"
+    assert matcher.match("/covers/42.png").resource == "3c4d"
+    # the policy enforcer settings take precedence
+    assert matcher.match("/albums/42").resource == "Album"
+    assert matcher.match("/albums/42").config.resource_id is None
+
+    matcher.update_resources([{**album, "uris": ["/covers/{id}"]}])
+    assert matcher.match("/users/42") is None
+    assert matcher.match("/covers/42.png").params == {"id": "42.png"}
+    assert matcher.match("/covers/42/small") is None
+
+
+def test_match_during_update(matcher):
+    resources = [
+        {"_id": str(x), "name": f"Resource {x}", "uris": ["/*", f"/files/{x}/*"]}
+        for x in range(50)
+    ]
+    errors = []
+    done = threading.Event()
+
+    def match():
+        while not done.is_set():
+            try:
+                matcher.match("/files/7/report.pdf")
+                matcher.match("/anything")
+            except Exception as ex:  # pragma: nocover
+                errors.append(ex)
+
+    readers = [threading.Thread(target=match) for _ in range(4)]
+    for thread in readers:
+        thread.start()
+    try:
+        for x in range(100):
+            matcher.update_resources(resources[: x % 50 + 1])
+            matcher.update_resources([])
+    finally:
+        done.set()
+        for thread in readers:
+            thread.join()
+    assert errors == []
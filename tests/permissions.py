@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+from keycloak.permissions import PermissionSet, permission_param
+
+
+def test_permission_param():
+    assert permission_param(("res", "view")) == "res#view"
+    assert permission_param(("res", None)) == "res"
+
+
+def test_permission_set():
+    granted = PermissionSet(
+        [
+            {"rsid": "1a2b", "rsname": "Album", "scopes": ["view", "edit"]},
+            {"rsid": "3c4d", "rsname": "Photo"},
+        ]
+    )
+    assert granted.allows("Album", "view")
+    assert granted.allows("1a2b", "edit")
+    assert granted.allows("Photo")
+    assert ("3c4d", None) in granted
+    assert not granted.allows("Photo", "view")
+    assert not granted.allows("Album", "delete")
+    assert not granted.allows("unknown")
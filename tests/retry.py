@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+import asyncio
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from keycloak import AsyncClient, instrumentation
+from keycloak.breaker import CircuitBreaker
+from keycloak.retry import RetryBudget, RetryPolicy
+
+from .conftest import openid
+
+
+def transport(*statuses, headers=None):
+    responses = iter(statuses)
+
+    def respond(request):
+        status = next(responses)
+        if isinstance(status, Exception):
+            raise status
+        return httpx.Response(status, json={"active": True}, headers=headers)
+
+    return respond
+
+
+@pytest.fixture()
+def kc(kc_client):
+    kc_client.close()
+    kc_client.retry_policy = RetryPolicy()
+    yield kc_client
+    kc_client.close()
+    vars(kc_client).pop("transport", None)
+    kc_client.retry_policy = RetryPolicy()
+
+
+def test_budget():
+    budget = RetryBudget(tokens=2, ratio=0.5)
+    assert budget.failure()
+    assert budget.failure()
+    assert not budget.failure()
+    budget.success()
+    assert not budget.failure()
+    budget.success()
+    assert budget.failure()
+    for _ in range(10):
+        budget.success()
+    assert budget.tokens == 2
+
+
+def test_budget_not_refilled_by_server_errors():
+    budget = RetryBudget(tokens=2, ratio=0.5)
+    assert budget.failure()
+    policy = RetryPolicy(budget=budget)
+    assert policy.delay("callback", "post", 0, httpx.Response(503)) is None
+    assert policy.delay("pat", "post", 0, httpx.Response(500)) is None
+    assert policy.delay("pat", "post", 3, httpx.Response(429)) is None
+    assert budget.tokens == 1
+    assert policy.delay("callback", "post", 0, httpx.Response(400)) is None
+    assert budget.tokens == 1.5
+
+
+def test_retryable():
+    policy = RetryPolicy()
+    unavailable = httpx.Response(503)
+    assert policy.retryable("fetch_userinfo", "get", unavailable)
+    assert policy.retryable("refresh_tokens", "post", unavailable)
+    assert not policy.retryable("callback", "post", unavailable)
+    assert not policy.retryable("fetch_userinfo", "get", httpx.Response(401))
+    assert policy.retryable("callback", "post", error=httpx.ConnectError("refused"))
+    assert not policy.retryable("callback", "post", error=httpx.ReadTimeout("slow"))
+    assert policy.retryable("pat", "post", error=httpx.ReadTimeout("slow"))
+    assert not policy.retryable("pat", "post", error=ValueError())
+
+
+@patch("keycloak.retry.random.uniform", lambda low, high: high)
+def test_delay():
+    policy = RetryPolicy(retries=3, backoff=0.1, max_backoff=0.3)
+    response = httpx.Response(503)
+    assert policy.delay("pat", "post", 0, response) == 0.1
+    assert policy.delay("pat", "post", 1, response) == 0.2
+    assert policy.delay("pat", "post", 2, response) == 0.3
+    assert policy.delay("pat", "post", 3, response) is None
+    assert policy.delay("pat", "post", 0, httpx.Response(200)) is None
+
+
+def test_retry_after():
+    policy = RetryPolicy(retry_after_limit=10)
+    response = httpx.Response(429, headers={"Retry-After": "7"})
+    assert policy.delay("pat", "post", 0, response) == 7
+    response = httpx.Response(429, headers={"Retry-After": "60"})
+    assert policy.delay("pat", "post", 0, response) is None
+
+
+def test_budget_exhausted():
+    policy = RetryPolicy(budget=RetryBudget(tokens=1))
+    assert policy.delay("pat", "post", 0, httpx.Response(503)) is not None
+    assert policy.delay("pat", "post", 0, httpx.Response(503)) is None
+
+
+def test_budget_not_spent_without_retry():
+    budget = RetryBudget(tokens=2)
+    policy = RetryPolicy(retries=1, budget=budget)
+    response = httpx.Response(503)
+    assert policy.delay("pat", "post", 1, response) is None
+    assert policy.delay("callback", "post", 0, response) is None
+    assert budget.tokens == 2
+
+
+@patch("keycloak.core.transport.time.sleep")
+def test_request_retried(mock_sleep, kc):
+    events = []
+    instrumentation.add_listener(events.append)
+    kc.transport = httpx.MockTransport(transport(503, httpx.ConnectError("x"), 200))
+    try:
+        response = kc.request("refresh_tokens", "post", openid.token_endpoint)
+    finally:
+        instrumentation.remove_listener(events.append)
+    assert response.status_code == 200
+    assert mock_sleep.call_count == 2
+    (event,) = events
+    assert (event.status, event.retries) == (200, 2)
+
+
+@patch("keycloak.core.transport.time.sleep")
+def test_request_retried_after_failing_call(mock_sleep, kc):
+    kc.transport = httpx.MockTransport(transport(*[503] * 8))
+    kc.circuit_breaker = CircuitBreaker(threshold=0)
+    try:
+        for _ in range(2):
+            response = kc.request("pat", "post", openid.token_endpoint)
+            assert response.status_code == 503
+    finally:
+        del kc.circuit_breaker
+    # both calls are retried, the final attempts do not spend the budget
+    assert mock_sleep.call_count == 6
+    assert kc.retry_policy.budget.tokens == 4
+
+
+@patch("keycloak.core.transport.time.sleep")
+def test_request_not_idempotent(mock_sleep, kc):
+    kc.transport = httpx.MockTransport(transport(503, 200))
+    response = kc.request("callback", "post", openid.token_endpoint)
+    assert response.status_code == 503
+    mock_sleep.assert_not_called()
+
+
+@patch("keycloak.core.transport.time.sleep")
+def test_request_retries_exhausted(mock_sleep, kc):
+    kc.retry_policy = RetryPolicy(retries=1)
+    kc.transport = httpx.MockTransport(transport(*[httpx.ReadTimeout("slow")] * 2))
+    with pytest.raises(httpx.ReadTimeout):
+        kc.request("fetch_jwks", "get", openid.jwks_uri)
+    assert mock_sleep.call_count == 1
+
+
+@patch("keycloak.core.asynchronous.transport.asyncio.sleep")
+def test_async_request_retried(mock_sleep):
+    async def run():
+        kc = AsyncClient()
+        await kc.aclose()
+        kc.transport = httpx.MockTransport(
+            transport(429, 200, headers={"Retry-After": "1"})
+        )
+        try:
+            return await kc.request("fetch_jwks", "get", openid.jwks_uri)
+        finally:
+            await kc.aclose()
+            del kc.transport
+
+    assert asyncio.run(run()).status_code == 200
+    mock_sleep.assert_awaited_once()
+    assert mock_sleep.await_args.args[0] >= 1
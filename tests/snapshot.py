@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+import json
+import time
+
+from keycloak.snapshot import Snapshot
+
+
+def test_put_get(tmp_path):
+    snapshot = Snapshot(str(tmp_path / "snapshot.json"))
+    snapshot.put("openid", {"issuer": "http://localhost"})
+    snapshot.put("jwks", [{"kid": "1"}])
+    data, expires_in = snapshot.get("openid")
+    assert data == {"issuer": "http://localhost"}
+    assert 0 < expires_in <= snapshot.ttl
+    assert snapshot.get("jwks")[0] == [{"kid": "1"}]
+    assert snapshot.get("uma2") is None
+    assert [x.name for x in tmp_path.iterdir()] == ["snapshot.json"]
+
+
+def test_get_expired(tmp_path):
+    path = tmp_path / "snapshot.json"
+    documents = {"openid": {"saved_at": time.time() - 61, "data": {}}}
+    path.write_text(json.dumps(documents))
+    assert Snapshot(str(path), ttl=60).get("openid") is None
+    assert Snapshot(str(path), ttl=120).get("openid") is not None
+
+
+def test_get_missing_or_corrupt(tmp_path):
+    path = tmp_path / "snapshot.json"
+    assert Snapshot(str(path)).get("openid") is None
+    path.write_text("{not json")
+    assert Snapshot(str(path)).get("openid") is None
+    Snapshot(str(path)).put("openid", {})
+    assert Snapshot(str(path)).get("openid")[0] == {}
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+import time
+
+from keycloak.store import MemoryTokenStore, record_expired, record_expiry, token_record
+
+
+def test_token_record():
+    record = token_record(
+        {"refresh_token": "r", "expires_in": 60, "refresh_expires_in": 1800}
+    )
+    assert 59 < record["expires_at"] - time.time() <= 60
+    assert record_expiry(record) == record["refresh_expires_at"]
+    assert not record_expired(record)
+    assert record_expired(record, skew=60)
+
+
+def test_token_record_unknown_lifetimes():
+    record = token_record({"access_token": "a"})
+    assert record["expires_at"] is record["refresh_expires_at"] is None
+    assert record_expiry(record) == float("inf")
+    assert not record_expired(record, skew=60)
+    record = token_record({"access_token": "a", "expires_in": 60})
+    assert record_expiry(record) == record["expires_at"]
+
+
+def test_memory_store():
+    store = MemoryTokenStore(maxsize=2)
+    for key in ("a", "b", "c"):
+        store.set(key, {"key": key}, time.time() + 60)
+    assert len(store) == 2
+    assert store.get("a") is None
+    assert store.get("c") == {"key": "c"}
+    store.set("d", {"key": "d"}, time.time() - 1)
+    store.delete("c")
+    assert store.get("c") is store.get("d") is None
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import time
+from urllib.parse import parse_qs, urlparse
+
+import httpx
+import pytest
+from jose import jwt
+
+from keycloak.constants import GrantTypes, TokenTypeHints, UmaResponseModes
+from keycloak.testing import FakeKeycloak
+from keycloak.utils import auth_header, basic_auth
+
+
+@pytest.fixture(scope="module")
+def fake():
+    return FakeKeycloak(users={"akhil": "p@$$w0rd"})
+
+
+@pytest.fixture()
+def http(fake):
+    fake.latency = 0.0
+    fake.error_rate = 0.0
+    fake.failures.clear()
+    with httpx.Client(transport=fake.transport) as client:
+        yield client
+
+
+def token_request(http, fake, headers=None, **payload):
+    headers = headers or basic_auth(fake.client_id, fake.client_secret)
+    return http.post(
+        fake.endpoint("/protocol/openid-connect/token"), data=payload, headers=headers
+    )
+
+
+def test_discovery(http, fake):
+    openid = http.get(fake.endpoint("/.well-known/openid-configuration")).json()
+    uma2 = http.get(fake.endpoint("/.well-known/uma2-configuration")).json()
+    assert openid["issuer"] == uma2["issuer"] == fake.issuer
+    assert uma2["resource_registration_endpoint"].startswith(fake.issuer)
+
+
+def test_password_grant(http, fake):
+    response = token_request(
+        http,
+        fake,
+        grant_type=GrantTypes.password,
+        username="akhil",
+        password="p@$$w0rd",
+    )
+    tokens = response.json()
+    jwks = http.get(fake.endpoint("/protocol/openid-connect/certs")).json()["keys"]
+    claims = jwt.decode(
+        tokens["access_token"],
+        jwks[0],
+        algorithms="RS256",
+        issuer=fake.issuer,
+        audience=fake.client_id,
+    )
+    assert claims["sub"] == "akhil"
+    response = token_request(
+        http, fake, grant_type=GrantTypes.password, username="akhil", password="wrong"
+    )
+    assert response.status_code == 401
+
+
+def test_client_credentials_grant(http, fake):
+    response = token_request(http, fake, grant_type=GrantTypes.client_credentials)
+    assert response.status_code == 200
+    response = token_request(
+        http,
+        fake,
+        headers=basic_auth(fake.client_id, "wrong"),
+        grant_type=GrantTypes.client_credentials,
+    )
+    assert response.status_code == 401
+
+
+def test_refresh_token_grant(http, fake):
+    tokens = token_request(http, fake, grant_type=GrantTypes.client_credentials).json()
+    response = token_request(
+        http,
+        fake,
+        grant_type=GrantTypes.refresh_token,
+        refresh_token=tokens["refresh_token"],
+    )
+    assert response.status_code == 200
+    response = token_request(
+        http,
+        fake,
+        grant_type=GrantTypes.refresh_token,
+        refresh_token=tokens["access_token"],
+    )
+    assert response.status_code == 400
+
+
+def test_authorization_code_grant(http, fake):
+    params = {
+        "client_id": fake.client_id,
+        "redirect_uri": "http://localhost/kc/callback",
+        "state": "state123",
+    }
+    response = http.get(fake.endpoint("/protocol/openid-connect/auth"), params=params)
+    assert response.status_code == 302
+    location = urlparse(response.headers["Location"])
+    query = parse_qs(location.query)
+    assert query["state"] == ["state123"]
+    payload = {"grant_type": GrantTypes.authorization_code, "code": query["code"][0]}
+    assert token_request(http, fake, **payload).status_code == 200
+    assert token_request(http, fake, **payload).status_code == 400
+
+
+def test_uma_ticket_grant(http, fake):
+    tokens = token_request(http, fake, grant_type=GrantTypes.client_credentials).json()
+    headers = auth_header(tokens["access_token"])
+    resource = fake.resources[0]
+    response = token_request(
+        http,
+        fake,
+        headers=headers,
+        grant_type=GrantTypes.uma_ticket,
+        audience=fake.client_id,
+        permission=f"{resource['name']}#view",
+    )
+    rpt = response.json()["access_token"]
+    assert fake.verify(rpt)["authorization"]["permissions"] == [
+        {"rsid": resource["_id"], "rsname": resource["name"]}
+    ]
+    response = token_request(
+        http,
+        fake,
+        headers=headers,
+        grant_type=GrantTypes.uma_ticket,
+        permission="unknown#view",
+    )
+    assert response.status_code == 403
+
+
+def test_introspect(http, fake):
+    tokens = token_request(http, fake, grant_type=GrantTypes.client_credentials).json()
+    endpoint = fake.endpoint("/protocol/openid-connect/token/introspect")
+    headers = basic_auth(fake.client_id, fake.client_secret)
+    payload = {"token_type_hint": TokenTypeHints.rpt, "token": tokens["access_token"]}
+    assert http.post(endpoint, data=payload, headers=headers).json()["active"]
+    payload["token"] = "invalid"
+    assert not http.post(endpoint, data=payload, headers=headers).json()["active"]
+
+
+def test_resources(http, fake):
+    tokens = token_request(http, fake, grant_type=GrantTypes.client_credentials).json()
+    headers = auth_header(tokens["access_token"])
+    endpoint = fake.endpoint("/authz/protection/resource_set")
+    resource_ids = http.get(endpoint, headers=headers).json()
+    assert resource_ids == [x["_id"] for x in fake.resources]
+    resource = http.get(f"{endpoint}/{resource_ids[0]}", headers=headers).json()
+    assert resource == fake.resources[0]
+    assert http.get(endpoint, params={"deep": "true"}, headers=headers).json() == [
+        resource
+    ]
+    assert http.get(endpoint).status_code == 401
+    userinfo = http.get(
+        fake.endpoint("/protocol/openid-connect/userinfo"), headers=headers
+    ).json()
+    assert userinfo["sub"] == f"service-account-{fake.client_id}"
+
+
+def test_injected_failures(http, fake):
+    fake.fail("certs", status=500, times=2)
+    endpoint = fake.endpoint("/protocol/openid-connect/certs")
+    assert [http.get(endpoint).status_code for _ in range(3)] == [500, 500, 200]
+    fake.error_rate = 1.0
+    assert http.get(endpoint).status_code == fake.error_status
+    assert http.get(fake.endpoint("/unknown")).status_code == 404
+
+
+def test_latency(http, fake):
+    fake.latency = 0.05
+    start = time.perf_counter()
+    http.get(fake.endpoint("/.well-known/openid-configuration"))
+    assert time.perf_counter() - start >= 0.05
+
+
+def test_async_transport(fake):
+    async def fetch():
+        async with httpx.AsyncClient(transport=fake.async_transport) as client:
+            return await client.get(fake.endpoint("/.well-known/uma2-configuration"))
+
+    assert asyncio.run(fetch()).json()["issuer"] == fake.issuer
+
+
+def test_asgi(fake):
+    async def fetch():
+        transport = httpx.ASGITransport(app=fake)
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await client.get(fake.endpoint("/.well-known/openid-configuration"))
+
+    assert asyncio.run(fetch()).json()["issuer"] == fake.issuer
+
+
+def test_uma_response_modes(http, fake):
+    tokens = token_request(http, fake, grant_type=GrantTypes.client_credentials).json()
+    headers = auth_header(tokens["access_token"])
+    resource = {**fake.resources[0], "_id": "album", "name": "Album"}
+    resource["resource_scopes"] = [{"name": "view"}, {"name": "edit"}]
+    fake.resources.append(resource)
+    try:
+        response = token_request(
+            http,
+            fake,
+            headers=headers,
+            grant_type=GrantTypes.uma_ticket,
+            response_mode=UmaResponseModes.permissions,
+            permission=["Album#view", "Album#delete"],
+        )
+        assert response.json() == [
+            {"rsid": "album", "rsname": "Album", "scopes": ["view"]}
+        ]
+        response = token_request(
+            http,
+            fake,
+            headers=headers,
+            grant_type=GrantTypes.uma_ticket,
+            response_mode=UmaResponseModes.decision,
+            permission="album#delete",
+        )
+        assert response.status_code == 403
+    finally:
+        fake.resources.remove(resource)